@@ -6,6 +6,82 @@
 import numpy as np
 import Elements
 
+def _points(coordinates, indices, width):
+    """
+        Return, for each of the width columns of indices, the x, y and
+        z coordinates of its atoms: arrays of shape (..., M) for
+        (..., N, 3) coordinates and (M, width) indices.
+    """
+    xyz = np.moveaxis( np.asarray(coordinates, dtype=float), -1, 0 )
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1, width)
+    return [ xyz[..., indices[:, k]] for k in range(width) ]
+
+#
+# Vector arithmetic on (x, y, z) arrays, which is faster than on
+#   (..., 3) arrays because each operation works on whole arrays
+#
+def _dot(u, v):
+    return u[0]*v[0] + u[1]*v[1] + u[2]*v[2]
+
+def _cross(u, v):
+    return ( u[1]*v[2] - u[2]*v[1], u[2]*v[0] - u[0]*v[2], u[0]*v[1] - u[1]*v[0] )
+
+def distances(coordinates, pairs):
+    """
+        distances(coordinates, pairs)
+
+        args:    coordinates is an (N,3) array of atomic coordinates, or
+                 an (F,N,3) array of the coordinates of F frames
+                 pairs is an (M,2) array of atom indices
+        returns: (M,) array of the distance between the atoms of each
+                 pair in Angstroms, or (F,M) array for F frames
+    """
+    p1, p2 = _points(coordinates, pairs, 2)
+    diff = p2 - p1
+    return np.sqrt( _dot(diff, diff) )
+
+def angles(coordinates, triples):
+    """
+        angles(coordinates, triples)
+
+        args:    coordinates is an (N,3) or (F,N,3) array, as for distances
+                 triples is an (M,3) array of atom indices
+        returns: (M,) or (F,M) array of the angles atom1-atom2-atom3 in
+                 degrees, between 0 and 180
+    """
+    p1, p2, p3 = _points(coordinates, triples, 3)
+    v1 = p1 - p2
+    v2 = p3 - p2
+    #
+    # atan2 of |v1 x v2| and v1.v2 is accurate near 0 and 180 degrees,
+    #   where arccos of the cosine is not
+    #
+    n = _cross(v1, v2)
+    return np.rad2deg( np.arctan2(np.sqrt(_dot(n, n)), _dot(v1, v2)) )
+
+def dihedrals(coordinates, quads):
+    """
+        dihedrals(coordinates, quads)
+
+        args:    coordinates is an (N,3) or (F,N,3) array, as for distances
+                 quads is an (M,4) array of atom indices
+        returns: (M,) or (F,M) array of the dihedral angles
+                 atom1-atom2-atom3-atom4 in degrees, between -180 and
+                 180, positive when atom4 is turned clockwise from atom1
+                 looking from atom2 to atom3
+    """
+    p1, p2, p3, p4 = _points(coordinates, quads, 4)
+    b1 = p2 - p1
+    b2 = p3 - p2
+    b3 = p4 - p3
+    n2 = _cross(b2, b3)
+    #
+    # atan2(|b2| b1.n2, n1.n2): well defined for every angle, with no
+    #   normalization of n1 and n2, which are zero for linear atoms
+    #
+    y = np.sqrt(_dot(b2, b2)) * _dot(b1, n2)
+    return np.rad2deg( np.arctan2(y, _dot(_cross(b1, b2), n2)) )
+
 def atomDistance(a1, a2):
     """
         atomDistance(atom1, atom2)
@@ -24,12 +100,8 @@ def atomAngle(a1, a2, a3):
         args:     atom1, atom2, and atom3 are instances of class Atom
         returns:  the angle atom1-atom2-atom3 in degrees
     """
-    v1 = (a2.coordinates - a1.coordinates)
-    v2 = (a3.coordinates - a2.coordinates)
-    lenv1 = atomDistance(a1, a2)
-    lenv2 = atomDistance(a3, a2)
-    angle = np.arccos( v1.T@v2/(lenv1*lenv2) )  # angle in radians
-    return np.rad2deg(angle)                    # angle converted to degrees
+    coordinates = [a1.coordinates, a2.coordinates, a3.coordinates]
+    return float( angles(coordinates, [0, 1, 2])[0] )
 
 def atomDihedral(a1, a2, a3, a4):
     """
@@ -38,20 +110,8 @@ def atomDihedral(a1, a2, a3, a4):
         args:    atom1, atom2, atom3 and atom4 are instances of class Atom
         returns: the dihedral angle atom1-atom2-atom3-atom4 in degrees
     """
-    v1 = (a2.coordinates - a1.coordinates)
-    v2 = (a3.coordinates - a2.coordinates)
-    v3 = (a4.coordinates - a3.coordinates)
-    v4 = np.cross(v1, v2)
-    v5 = np.cross(v2, v3)
-    lenv4 = np.linalg.norm(v4)
-    lenv5 = np.linalg.norm(v5)
-    angle = np.arccos( v4.T@v5/(lenv4*lenv5) )  # angle in radians
-    d = np.rad2deg(angle)
-    if (v4 * v3) < 0:
-        d = -d
-    if d <= -180:
-        d = d + 360.0
-    return d
+    coordinates = [a1.coordinates, a2.coordinates, a3.coordinates, a4.coordinates]
+    return float( dihedrals(coordinates, [0, 1, 2, 3])[0] )
 
 
 def sumOfSingleBondRadii(a1, a2):
@@ -65,7 +125,10 @@ class Atom:
 	Base classes:  none
 	Subclasses:    none
 
-	Bonding information is stored in atoms
+	Bonding information is stored in atoms. Once an atom is added to
+	a Molecule, its atomic number and coordinates are views into the
+	molecule's arrays rather than separate per-atom arrays, and its
+	bonds are those of the molecule's adjacency arrays.
     """
 
     _instanceVariableDoc = {
@@ -73,10 +136,14 @@ class Atom:
         'coordinates': """(x,y,z) coordinates of this atom, in Angstroms, as np.array""",
         'coordpixels': """(x,y,z) coordinates of this atom, in pixels, as np.array""",
         'radiuspixels': """van der Waal's radius of this atom in pixels (integer)""",
-        'bondedAtoms': """a list of the atoms bonded to this atom (list of Atom)""",
+        'bondedAtoms': """a list of the atoms bonded to this atom (list of Atom);
+                       read from the molecule's adjacency arrays""",
         'bondOrder': """a dictionary of the bond orders to each atom in bondedAtoms
                      (dictionary of Atom : Float)""",
-        'bondCount': """the total number of atoms bonded to this atom (integer)""",
+        'bondCount': """the total number of atoms bonded to this atom (integer);
+                     read from the molecule's adjacency arrays""",
+        'molecule': """the Molecule whose arrays hold this atom's data, or None""",
+        'index': """row of this atom in the arrays of its molecule (integer)""",
     }
 
     _methodCategory = {
@@ -107,15 +174,106 @@ class Atom:
           	   x,y,z become the coordinates of the new atom
 	    returns:  a new instance of class Atom
         """
-        self.atomicNumber = atomicNumber
-        self.coordinates = np.array([x, y, z])
-        self.coordpixels = np.zeros( (3,), dtype=float )
-        self.radiuspixels = 0
-        self.bondedAtoms = []
+        self.molecule = None
+        self.index = None
+        self._atomicNumber = atomicNumber
+        self._coordinates = np.array([x, y, z], dtype=float)
+        self._coordpixels = np.zeros( (3,), dtype=float )
+        self._radiuspixels = 0
+        self._bondedAtoms = []
         self.bondOrder = {}
-        self.bondCount = 0
         return
 
+    @classmethod
+    def _view(cls, molecule, index):
+        """
+            Atom._view(molecule, index)
+
+            args:     molecule is an instance of class Molecule
+                      index is a row of the molecule's atom arrays
+            returns:  a new instance of class Atom whose data live in
+                      the molecule's arrays, without allocating any
+                      per-atom arrays
+        """
+        atom = cls.__new__(cls)
+        atom.molecule = molecule
+        atom.index = index
+        atom._atomicNumber = None
+        atom._coordinates = None
+        atom._coordpixels = None
+        atom._radiuspixels = None
+        atom._bondedAtoms = []
+        atom.bondOrder = {}
+        return atom
+
+    ### Properties stored in the owning molecule's arrays
+
+    @property
+    def atomicNumber(self):
+        if self.molecule is None:
+            return self._atomicNumber
+        return int(self.molecule.atomicNumbers[self.index])
+
+    @atomicNumber.setter
+    def atomicNumber(self, value):
+        if self.molecule is None:
+            self._atomicNumber = value
+        else:
+            self.molecule.atomicNumbers[self.index] = value
+
+    @property
+    def coordinates(self):
+        if self.molecule is None:
+            return self._coordinates
+        return self.molecule.coordinates[self.index]
+
+    @coordinates.setter
+    def coordinates(self, value):
+        if self.molecule is None:
+            self._coordinates = value
+        else:
+            self.molecule.coordinates[self.index] = value
+            self.molecule.coordinatesChanged()
+
+    @property
+    def coordpixels(self):
+        if self.molecule is None:
+            return self._coordpixels
+        return self.molecule.coordpixels[self.index]
+
+    @coordpixels.setter
+    def coordpixels(self, value):
+        if self.molecule is None:
+            self._coordpixels = value
+        else:
+            self.molecule.coordpixels[self.index] = value
+
+    @property
+    def bondedAtoms(self):
+        if self.molecule is None:
+            return self._bondedAtoms
+        atoms = self.molecule.atoms
+        return [atoms[k] for k in self.molecule.neighbors(self.index).tolist()]
+
+    @property
+    def bondCount(self):
+        if self.molecule is None:
+            return len(self._bondedAtoms)
+        return self.molecule.degree(self.index)
+
+    @property
+    def radiuspixels(self):
+        if self.molecule is None:
+            return self._radiuspixels
+        return self.molecule.radiuspixels[self.index]
+
+    @radiuspixels.setter
+    def radiuspixels(self, value):
+        if self.molecule is None:
+            self._radiuspixels = value
+        else:
+            self.molecule.radiuspixels[self.index] = value
+
     def __repr__(self):
         """
             `anAtom`
@@ -138,6 +296,8 @@ class Atom:
             Delete all bonding information associated with this atom and
             reset all instance variables to their default values.
         """
+        if self.molecule is not None:
+            self.molecule.removeAtom(self)
         for batom in self.bondedAtoms[:]:
             self.deleteBondTo(batom)
         self.atomicNumber = None
@@ -165,7 +325,9 @@ class Atom:
 
             Set the x coordinate of this atom to number
         """
-        self.coordinates.array[0] = val
+        self.coordinates[0] = val
+        if self.molecule is not None:
+            self.molecule.coordinatesChanged()
         return
 
     def setY(self, val):
@@ -177,7 +339,9 @@ class Atom:
 
             Set the x coordinate of this atom to number
         """
-        self.coordinates.array[1] = val
+        self.coordinates[1] = val
+        if self.molecule is not None:
+            self.molecule.coordinatesChanged()
         return
 
     def setZ(self, val):
@@ -189,7 +353,9 @@ class Atom:
 
             Set the x coordinate of this atom to number
         """
-        self.coordinates.array[2] = val
+        self.coordinates[2] = val
+        if self.molecule is not None:
+            self.molecule.coordinatesChanged()
         return
 
     def setXYZ(self, x=0, y=0, z=0):
@@ -201,8 +367,7 @@ class Atom:
 
             Set the x, y, and z coordinates of this atom
         """
-        del self.coordinates
-        self.coordinates = np.array([x, y, z])
+        self.coordinates = np.array([x, y, z], dtype=float)
         return
 
     ### Methods which return properties of this Atom
@@ -297,13 +462,15 @@ class Atom:
             returns:  1 if a bond is created, 0 if not
 
             side effects:  Both this atom and anotherAtom are changed to
-                           reflect the bonding information.
+                           reflect the bonding information; atoms of
+                           the same molecule are bonded by the molecule.
         """
-        if atom in self.bondedAtoms:
+        if self.molecule is not None and atom.molecule is self.molecule:
+            return self.molecule.bondAtoms(self, atom)
+        if atom in self._bondedAtoms:
             return 0
         else:
-            self.bondedAtoms.append(atom)
-            self.bondCount = self.bondCount + 1
+            self._bondedAtoms.append(atom)
             atom.createBondTo(self)
             return 1
 
@@ -319,10 +486,11 @@ class Atom:
             side effects:  The bonding information in both this atom and
                            anotherAtom are changed.
         """
-        if atom in self.bondedAtoms:
-            self.bondedAtoms.remove(atom)
+        if self.molecule is not None and atom.molecule is self.molecule:
+            return self.molecule.unbondAtoms(self, atom)
+        if atom in self._bondedAtoms:
+            self._bondedAtoms.remove(atom)
             atom.deleteBondTo(self)
-            self.bondCount = self.bondCount - 1
             return 1
         else:
             return 0
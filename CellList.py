@@ -0,0 +1,474 @@
+# File name: CellList.py
+"""
+	CellList module file documentation
+
+	A cell list sorts atoms into cubic cells so that only atoms in
+	nearby cells need to be compared when searching for close
+	contacts. Building the list and generating candidate pairs are
+	both done with NumPy array operations, so the cost grows
+	almost linearly with the number of atoms rather than with the
+	number of atom pairs.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+
+# Fewer atoms than this are searched in one process
+PARALLEL_MIN_ATOMS = 100000
+
+def findBondPairs(coordinates, radii, factor=1.2, progress=None, skin=0.0, cells=None):
+    """
+        findBondPairs(coordinates, radii, factor=1.2, progress=None, skin=0.0, cells=None)
+
+        args:    coordinates is an (N,3) array of atom coordinates
+                 radii is an (N,) array of single bond radii
+                 factor scales the sum of single bond radii
+                 progress, if given, is called with the number of
+                 pairs found so far after each group of candidates;
+                 an exception it raises stops the search
+                 skin is a distance added to every bond cutoff, to
+                 find the candidate pairs of a NeighborList
+                 cells is a CellList of coordinates to search (e.g.,
+                 Molecule.spatialIndex()); one is built if not given
+        returns: an (M,2) integer array of atom index pairs (i, j),
+                 i < j, sorted by i and then j, for every pair with
+
+                     distance(i, j) <= factor * (radii[i] + radii[j]) + skin
+
+        The cell edge is factor times the largest radius present
+        (plus half the skin), so a bonded neighbor may lie up to two
+        cells away.
+    """
+    coordinates = np.asarray(coordinates, dtype=float)
+    radii = np.asarray(radii, dtype=float)
+    if len(coordinates) < 2:
+        return np.zeros( (0, 2), dtype=np.int64 )
+
+    maxRadius = radii.max()
+    if maxRadius <= 0:
+        return np.zeros( (0, 2), dtype=np.int64 )
+    cellEdge = factor * maxRadius + skin / 2
+    maxCutoff = factor * 2 * maxRadius + skin
+    if cells is None:
+        cells = CellList(coordinates, cellEdge)
+
+    pairs = []
+    found = 0
+    for i, j in cells.candidatePairs(maxCutoff):
+        diff = coordinates[j] - coordinates[i]
+        d = np.sqrt( np.einsum('ij,ij->i', diff, diff) )
+        s = radii[i] + radii[j]
+        bonded = d <= factor * s + skin
+        pairs.append( np.column_stack( (i[bonded], j[bonded]) ) )
+        if progress is not None:
+            found += len(pairs[-1])
+            progress(found)
+
+    return _sortedPairs(np.concatenate(pairs))
+
+def findBondPairsParallel(coordinates, radii, factor=1.2, workers=None,
+                          progress=None, slabsPerWorker=4):
+    """
+        findBondPairsParallel(coordinates, radii, factor=1.2, workers=None,
+                              progress=None, slabsPerWorker=4)
+
+        args:    coordinates, radii, factor, and progress are as for
+                 findBondPairs; progress is called as each slab is done
+                 workers is the number of processes (default: number
+                 of CPUs)
+                 slabsPerWorker is the number of slabs per process
+        returns: the same pairs as findBondPairs
+
+        Atoms are sorted along the longest axis of the system and cut
+        into slabs of equal numbers of atoms, and the slabs are
+        searched by a pool of processes. Each slab is searched
+        together with a halo, the atoms of the following slabs lying
+        within the largest bond length of its last atom. A pair is
+        kept only by the slab holding its atom which comes first
+        along the axis, so each pair is found exactly once. Sorted
+        coordinates and radii are passed to the processes in shared
+        memory, not pickled. Systems of fewer than PARALLEL_MIN_ATOMS
+        atoms, or a single worker, are searched in this process.
+    """
+    coordinates = np.asarray(coordinates, dtype=float)
+    radii = np.asarray(radii, dtype=float)
+    natoms = len(coordinates)
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or natoms < max(PARALLEL_MIN_ATOMS, 2):
+        return findBondPairs(coordinates, radii, factor, progress)
+    maxRadius = radii.max()
+    if maxRadius <= 0:
+        return np.zeros( (0, 2), dtype=np.int64 )
+
+    # Halo is widened by a little to allow for rounding of distances
+    halo = factor * 2 * maxRadius * (1 + 1e-9)
+    axis = int(np.argmax(np.ptp(coordinates, axis=0)))
+    order = np.argsort(coordinates[:, axis], kind='stable')
+    along = coordinates[order, axis]
+    nslabs = min(workers * slabsPerWorker, natoms)
+    starts = np.linspace(0, natoms, nslabs + 1).astype(np.int64)
+    ends = np.searchsorted(along, along[starts[1:] - 1] + halo, side='right')
+
+    # Each row: x, y, z, and radius, in sorted order
+    block = shared_memory.SharedMemory(create=True, size=natoms * 4 * 8)
+    try:
+        table = np.ndarray( (natoms, 4), dtype=float, buffer=block.buf )
+        table[:, :3] = coordinates[order]
+        table[:, 3] = radii[order]
+        del table
+
+        pairs = []
+        found = 0
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=_processContext())
+        try:
+            slabs = [ pool.submit(_slabPairs, block.name, natoms, int(starts[k]),
+                                  int(starts[k+1]), int(ends[k]), factor)
+                      for k in range(nslabs) ]
+            for slab in as_completed(slabs):
+                pairs.append(slab.result())
+                if progress is not None:
+                    found += len(pairs[-1])
+                    progress(found)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    finally:
+        block.close()
+        block.unlink()
+
+    return _sortedPairs(order[np.concatenate(pairs)])
+
+def _slabPairs(name, natoms, start, stop, end, factor):
+    """
+        Search one slab for findBondPairsParallel, in a worker process.
+        Atoms start:stop (in sorted order) are the slab and stop:end
+        its halo; returns pairs of sorted positions whose first atom
+        is in the slab.
+    """
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        table = np.ndarray( (natoms, 4), dtype=float, buffer=block.buf )
+        pairs = findBondPairs(table[start:end, :3], table[start:end, 3], factor)
+        del table
+    finally:
+        block.close()
+    pairs += start
+    return pairs[pairs[:, 0] < stop]
+
+def _processContext():
+    """
+        Start worker processes without fork, which is unsafe in a
+        process running other threads (e.g., a Qt application).
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _sortedPairs(pairs):
+    """
+        Put each pair in (lower index, higher index) order and sort
+        the pairs the same way a double loop over i < j visits them.
+    """
+    pairs = np.sort(pairs, axis=1)
+    order = np.lexsort( (pairs[:, 1], pairs[:, 0]) )
+    return pairs[order]
+
+def _ranges(start, stop):
+    """
+        Return the concatenation of the ranges [start[k], stop[k]).
+    """
+    counts = np.maximum(stop - start, 0)
+    # Running index within each [start, stop) range
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(start, counts) + offsets
+
+
+class CellList:
+    """
+	Class for sorting atoms into a grid of cubic cells.
+
+	Base classes:  none
+	Subclasses:    none
+    """
+
+    _instanceVariableDoc = {
+        'coordinates': """(N,3) array of the indexed coordinates""",
+        'cellEdge': """edge length of each cubic cell (float)""",
+        'origin': """corner of cell (0,0,0), the lowest x, y, and z (np.array)""",
+        'cells': """(N,3) integer array of the cell of each point""",
+        'dimensions': """number of cells along x, y, and z (np.array)""",
+        'order': """point indices sorted by cell key""",
+        'sortedKeys': """cell keys of the points in sorted order""",
+    }
+
+    def __init__(self, coordinates, cellEdge):
+        """
+            CellList(coordinates, cellEdge)
+
+            args:     coordinates is an (N,3) array of coordinates
+                      cellEdge is the edge length of each cubic cell
+            returns:  a new instance of class CellList
+        """
+        self.coordinates = np.asarray(coordinates, dtype=float)
+        self.cellEdge = float(cellEdge)
+
+        if len(self.coordinates):
+            self.origin = self.coordinates.min(axis=0)
+        else:
+            self.origin = np.zeros(3)
+        self.cells = np.floor( (self.coordinates - self.origin) / self.cellEdge ).astype(np.int64)
+        self.dimensions = self.cells.max(axis=0, initial=0) + 1
+
+        keys = self._cellKeys(self.cells)
+        self.order = np.argsort(keys, kind='stable')
+        self.sortedKeys = keys[self.order]
+        return
+
+    def _cellKeys(self, cells):
+        """
+            Return one integer key per cell from its (x,y,z) cell indices.
+        """
+        ny, nz = self.dimensions[1], self.dimensions[2]
+        return (cells[:, 0] * ny + cells[:, 1]) * nz + cells[:, 2]
+
+    def _halfShell(self, reach):
+        """
+            Return the cell offsets within reach cells which come
+            after (0,0,0) in lexicographic order. Visiting only these
+            offsets finds every pair of cells exactly once.
+        """
+        r = np.arange(-reach, reach + 1)
+        offsets = np.stack( np.meshgrid(r, r, r, indexing='ij'), axis=-1 ).reshape(-1, 3)
+        after = ( (offsets[:, 0] > 0) |
+                  ((offsets[:, 0] == 0) & (offsets[:, 1] > 0)) |
+                  ((offsets[:, 0] == 0) & (offsets[:, 1] == 0) & (offsets[:, 2] > 0)) )
+        return offsets[after]
+
+    def candidatePairs(self, cutoff):
+        """
+            candidatePairs(cutoff)
+
+            args:     cutoff is the largest separation of interest
+            returns:  a generator of (i, j) index arrays. Every pair of
+                      points closer than cutoff appears in exactly one
+                      chunk, once, with i != j. Pairs farther apart
+                      may also appear and must be filtered by the caller.
+        """
+        reach = int(np.ceil(cutoff / self.cellEdge))
+        position = np.arange(len(self.order))
+
+        # Pairs within the same cell, each taken once
+        stop = np.searchsorted(self.sortedKeys, self.sortedKeys, side='right')
+        yield self._expand(position, position + 1, stop)
+
+        # Pairs between a cell and each neighboring cell in the half shell
+        sortedCells = self.cells[self.order]
+        for offset in self._halfShell(reach):
+            neighbor = sortedCells + offset
+            inside = np.all( (neighbor >= 0) & (neighbor < self.dimensions), axis=1 )
+            if not inside.any():
+                continue
+            keys = self._cellKeys(neighbor[inside])
+            start = np.searchsorted(self.sortedKeys, keys, side='left')
+            stop = np.searchsorted(self.sortedKeys, keys, side='right')
+            yield self._expand(position[inside], start, stop)
+
+    def _expand(self, position, start, stop):
+        """
+            For each sorted position p, pair p with every sorted
+            position in [start, stop) and return original indices.
+        """
+        counts = np.maximum(stop - start, 0)
+        first = np.repeat(position, counts)
+        return self.order[first], self.order[_ranges(start, stop)]
+
+    def pointsWithin(self, point, radius):
+        """
+            pointsWithin(point, radius)
+
+            args:     point is an (x,y,z) position
+                      radius is the largest distance of interest
+            returns:  (indices, distances): integer array of the indices
+                      of the points within radius of point, in
+                      increasing order, and their distances from point
+        """
+        point = np.asarray(point, dtype=float)
+        low = np.floor( (point - radius - self.origin) / self.cellEdge ).astype(np.int64)
+        high = np.floor( (point + radius - self.origin) / self.cellEdge ).astype(np.int64)
+        low = np.maximum(low, 0)
+        high = np.minimum(high, self.dimensions - 1)
+        if radius < 0 or np.any(low > high):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        # Test every point if the cells to search hold most of them
+        if np.prod(high - low + 1) >= len(self.order):
+            candidates = np.arange(len(self.coordinates))
+        else:
+            axes = [ np.arange(l, h + 1) for l, h in zip(low, high) ]
+            cells = np.stack( np.meshgrid(*axes, indexing='ij'), axis=-1 ).reshape(-1, 3)
+            keys = self._cellKeys(cells)
+            start = np.searchsorted(self.sortedKeys, keys, side='left')
+            stop = np.searchsorted(self.sortedKeys, keys, side='right')
+            candidates = np.sort( self.order[_ranges(start, stop)] )
+
+        diff = self.coordinates[candidates] - point
+        d = np.sqrt( np.einsum('ij,ij->i', diff, diff) )
+        inside = d <= radius
+        return candidates[inside], d[inside]
+
+    def nearest(self, point, k):
+        """
+            nearest(point, k)
+
+            args:     point is an (x,y,z) position
+                      k is the number of points wanted
+            returns:  (indices, distances) of the k points nearest to
+                      point (all points, if there are fewer), nearest
+                      first; points equally near are in index order
+
+            Searches within one cell edge of point, then twice as far,
+              and so on, until at least k points are found.
+        """
+        k = min(int(k), len(self.coordinates))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        radius = self.cellEdge
+        while True:
+            indices, distances = self.pointsWithin(point, radius)
+            if len(indices) >= k:
+                break
+            radius = 2 * radius
+        order = np.lexsort( (indices, distances) )[:k]
+        return indices[order], distances[order]
+
+    def pairsWithin(self, cutoff):
+        """
+            pairsWithin(cutoff)
+
+            args:     cutoff is the largest distance of interest
+            returns:  an (M,2) integer array of the index pairs (i, j),
+                      i < j, of the points within cutoff of each other,
+                      sorted by i and then j
+        """
+        pairs = [ np.zeros( (0, 2), dtype=np.int64 ) ]
+        for i, j in self.candidatePairs(cutoff):
+            diff = self.coordinates[j] - self.coordinates[i]
+            close = np.einsum('ij,ij->i', diff, diff) <= cutoff * cutoff
+            pairs.append( np.column_stack( (i[close], j[close]) ) )
+        return _sortedPairs(np.concatenate(pairs))
+
+
+class NeighborList:
+    """
+	Class for keeping the bonds of moving atoms up to date, e.g.,
+	while a trajectory is played back.
+
+	The list holds every pair of atoms within their bond cutoff plus
+	a skin distance. While no atom has moved more than half the skin
+	since the list was built, no other pair can have come within its
+	cutoff, and a pair farther than the skin from its cutoff (either
+	way) cannot have crossed it, so only the pairs near the cutoff
+	are tested again. Once an atom moves farther, the list is built
+	again with a cell list.
+
+	Base classes:  none
+	Subclasses:    none
+    """
+
+    _instanceVariableDoc = {
+        'radii': """(N,) array of single bond radii""",
+        'factor': """scale of the sum of single bond radii (float)""",
+        'skin': """distance added to the bond cutoffs (float)""",
+        'reference': """(N,3) coordinates when the list was built, or None""",
+        'pairs': """(K,2) integer array of the candidate pairs (i, j), i < j""",
+        'cutoffs': """(K,) bond cutoff of each candidate pair""",
+        'bonded': """(K,) boolean array, True for each bonded pair""",
+        'marginal': """indices of the pairs which may cross their cutoff""",
+        'builds': """number of times the list has been built (integer)""",
+    }
+
+    def __init__(self, radii, factor=1.2, skin=0.3, bonds=None):
+        """
+            NeighborList(radii, factor=1.2, skin=0.3, bonds=None)
+
+            args:     radii is an (N,) array of single bond radii
+                      factor scales the sum of single bond radii
+                      skin is the distance added to the bond cutoffs
+                      bonds is an (M,2) array of the atom pairs taken
+                      to be bonded before the first update
+            returns:  a new instance of class NeighborList
+        """
+        self.radii = np.asarray(radii, dtype=float)
+        self.factor = float(factor)
+        self.skin = float(skin)
+        self.reference = None
+        self.pairs = np.zeros( (0, 2), dtype=np.int64 )
+        if bonds is not None and len(bonds):
+            self.pairs = _sortedPairs(np.asarray(bonds, dtype=np.int64).reshape(-1, 2))
+        self.cutoffs = np.zeros(len(self.pairs))
+        self.bonded = np.ones(len(self.pairs), dtype=bool)
+        self.marginal = np.zeros(0, dtype=np.int64)
+        self.builds = 0
+        return
+
+    def bondPairs(self):
+        """
+            bondPairs()
+
+            args:     none
+            returns:  (M,2) integer array of the currently bonded pairs
+        """
+        return self.pairs[self.bonded]
+
+    def update(self, coordinates):
+        """
+            update(coordinates)
+
+            args:     coordinates is an (N,3) array of the new atom
+                      coordinates
+            returns:  (added, removed), (A,2) and (R,2) integer arrays
+                      of the pairs (i, j), i < j, which became bonded
+                      and which stopped being bonded
+        """
+        coordinates = np.asarray(coordinates, dtype=float)
+        if self.reference is None or len(self.reference) != len(coordinates):
+            return self._build(coordinates)
+        moved = coordinates - self.reference
+        if np.einsum('ij,ij->i', moved, moved).max(initial=0.0) > (self.skin / 2)**2:
+            return self._build(coordinates)
+
+        # Only pairs near their cutoff can have been made or broken
+        pairs = self.pairs[self.marginal]
+        bonded = self._distances(coordinates, pairs) <= self.cutoffs[self.marginal]
+        changed = bonded != self.bonded[self.marginal]
+        changedPairs = pairs[changed]
+        self.bonded[self.marginal] = bonded
+        bonded = bonded[changed]
+        return changedPairs[bonded], changedPairs[~bonded]
+
+    def _build(self, coordinates):
+        """
+            Find the candidate pairs around coordinates and return the
+            pairs bonded and unbonded since the previous list.
+        """
+        before = self.bondPairs()
+        self.pairs = findBondPairs(coordinates, self.radii, self.factor, skin=self.skin)
+        self.cutoffs = self.factor * self.radii[self.pairs].sum(axis=1)
+        d = self._distances(coordinates, self.pairs)
+        self.bonded = d <= self.cutoffs
+        self.marginal = np.flatnonzero( np.abs(d - self.cutoffs) <= self.skin )
+        self.reference = coordinates.copy()
+        self.builds = self.builds + 1
+
+        after = self.bondPairs()
+        n = len(coordinates)
+        beforeKeys = before[:, 0] * n + before[:, 1]
+        afterKeys = after[:, 0] * n + after[:, 1]
+        added = after[~np.isin(afterKeys, beforeKeys)]
+        removed = before[~np.isin(beforeKeys, afterKeys)]
+        return added, removed
+
+    def _distances(self, coordinates, pairs):
+        diff = coordinates[pairs[:, 1]] - coordinates[pairs[:, 0]]
+        return np.sqrt( np.einsum('ij,ij->i', diff, diff) )
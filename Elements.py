@@ -1,6 +1,7 @@
 # File name: Elements.py
 
 import re
+import numpy as np
 
 AtomicSymbol = {  0: 'X',
                   1: 'H' ,   2: 'He',   3: 'Li',   4: 'Be',   5: 'B' ,
@@ -21,8 +22,8 @@ AtomicSymbol = {  0: 'X',
                  76: 'Os',  77: 'Ir',  78: 'Pt',  79: 'Au',  80: 'Hg',
                  81: 'Tl',  82: 'Pb',  83: 'Bi',  84: 'Po',  85: 'At',
                  86: 'Rn',  87: 'Fr',  88: 'Ra',  89: 'Ac',  90: 'Th',
-                 96: 'Pa',  92: 'U' ,  93: 'Np',  94: 'Pu',  95: 'Am',
-                 91: 'Cm',  97: 'Bk',  98: 'Cf',  99: 'Es', 100: 'Fm',
+                 91: 'Pa',  92: 'U' ,  93: 'Np',  94: 'Pu',  95: 'Am',
+                 96: 'Cm',  97: 'Bk',  98: 'Cf',  99: 'Es', 100: 'Fm',
                 101: 'Md', 102: 'No', 103: 'Lw' }
 
 AtomicNumber = {'X' :   0, 'Cp':   0, 'D' :   1,
@@ -43,10 +44,10 @@ AtomicNumber = {'X' :   0, 'Cp':   0, 'D' :   1,
                 'Lu':  71, 'Hf':  72, 'Ta':  73, 'W' :  74, 'Re':  75,
                 'Os':  76, 'Ir':  77, 'Pt':  78, 'Au':  79, 'Hg':  80,
                 'Tl':  81, 'Pb':  82, 'Bi':  83, 'Po':  84, 'At':  85,
-                'Rn':  81, 'Fr':  87, 'Ra':  88, 'Ac':  89, 'Th':  90,
-                'Pa':  96, 'U' :  92, 'Np':  93, 'Pu':  94, 'Am':  95,
-                'Cm':  91, 'Bk':  97, 'Cf':  98, 'Es':  99, 'Fm': 100,
-                'Md': 101, 'No': 102, 'Lw': 103 }
+                'Rn':  86, 'Fr':  87, 'Ra':  88, 'Ac':  89, 'Th':  90,
+                'Pa':  91, 'U' :  92, 'Np':  93, 'Pu':  94, 'Am':  95,
+                'Cm':  96, 'Bk':  97, 'Cf':  98, 'Es':  99, 'Fm': 100,
+                'Md': 101, 'No': 102, 'Lw': 103, 'Lr': 103 }
 
 # SingleBondRadius is from the radii found on the Wikipedia page:
 #        https://en.wikipedia.org/wiki/Covalent_radius
@@ -468,6 +469,38 @@ AtomColor[84] = [   5,   0, 255] # Po
 AtomColor[85] = [   5,   0, 255] # At
 AtomColor[86] = [   5,   0, 255] # Rn
 
+# Color of the elements after Rn, which have none of their own
+DefaultAtomColor = [ 255, 20, 147]
+for _z in range(87, 104):
+    AtomColor[_z] = DefaultAtomColor
+
+#
+# The tables above as arrays indexed by atomic number (0-103), to look
+#   up values for every atom of a molecule at once, e.g.,
+#       radii = Elements.SingleBondRadii[molecule.atomicNumbers]
+#   The arrays are read-only; change the dictionaries and call
+#   makeArrays() to change them.
+#
+ElementCount = 104
+
+def _tableArray(table, dtype=float):
+    array = np.array([table[z] for z in range(ElementCount)], dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+def makeArrays():
+    """
+        Make the arrays of element data from the dictionaries
+    """
+    global AtomicSymbols, SingleBondRadii, VdwRadii, AtomicMasses, AtomColors
+    AtomicSymbols = _tableArray(AtomicSymbol, dtype=object)
+    SingleBondRadii = _tableArray(SingleBondRadius)
+    VdwRadii = _tableArray(VdwRadius)
+    AtomicMasses = _tableArray(AtomicMass)
+    AtomColors = _tableArray(AtomColor, dtype=np.uint8)
+
+makeArrays()
+
 LigatingElements = [6, 7, 8, 14, 15, 16]  # C, N, O, Si, P, S
 NobleElements = [2, 10, 18, 36, 54, 86]   # He, Ne, Ar, Kr, Xe, Rn
 
@@ -477,7 +510,7 @@ HillOrder = [  6,   1,  89,  47,  13,  95,  18,  33,  85,  79,
  	       9,  26, 100,  87,  31,  64,  32,   2,  72,  80,
 	      67,  53,  49,  77,  19,  36,  57,   3,  71, 103,
 	     101,  12,  25,  42,   7,  11,  41,  60,  10,  28,
-	      93, 102,   8,  76,  15,  91,  82,  46,  61,  84,
+	     102,  93,   8,  76,  15,  91,  82,  46,  61,  84,
 	      59,  78,  94,  88,  37,  75,  45,  86,  44,  16,
 	      51,  21,  34,  14,  62,  50,  38,  73,  65,  43,
 	      52,  90,  22,  81,  69,  92,  23,  74,  54,  39,
@@ -489,7 +522,7 @@ AlphaOrder = [ 89,  47,  13,  95,  18,  33,  85,  79,   5,  56,
 	       26, 100,  87,  31,  64,  32,   1,   2,  72,  80,
 	       67,  53,  49,  77,  19,  36,  57,   3,  71, 103,
 	      101,  12,  25,  42,   7,  11,  41,  60,  10,  28,
-	       93, 102,   8,  76,  15,  91,  82,  46,  61,  84,
+	      102,  93,   8,  76,  15,  91,  82,  46,  61,  84,
 	       59,  78,  94,  88,  37,  75,  45,  86,  44,  16,
 	       51,  21,  34,  14,  62,  50,  38,  73,  65,  43,
 	       52,  90,  22,  81,  69,  92,  23,  74,  54,  39,
@@ -530,3 +563,47 @@ def atomicMass(arg):
     """
     return AtomicMass[atomicNumber(arg)]
 
+def checkTables():
+    """
+        Check that the element tables agree with each other
+
+        returns: list of the problems found, empty if there are none
+    """
+    problems = []
+    for z, symbol in AtomicSymbol.items():
+        if AtomicNumber.get(symbol) != z:
+            problems.append("AtomicSymbol[%d] is %s, but AtomicNumber[%s] is %s" %
+                            (z, symbol, symbol, AtomicNumber.get(symbol)))
+    for symbol, z in AtomicNumber.items():
+        if AtomicSymbol.get(z) != symbol and symbol not in ("Cp", "D", "Lr"):
+            problems.append("AtomicNumber[%s] is %d, but AtomicSymbol[%d] is %s" %
+                            (symbol, z, z, AtomicSymbol.get(z)))
+    tables = [("AtomicSymbol", AtomicSymbol), ("SingleBondRadius", SingleBondRadius),
+              ("VdwRadius", VdwRadius), ("AtomicMass", AtomicMass), ("AtomColor", AtomColor)]
+    for name, table in tables:
+        missing = [z for z in range(ElementCount) if z not in table]
+        if missing:
+            problems.append("%s has no entry for %s" % (name, missing))
+    arrays = [("AtomicSymbols", AtomicSymbols, AtomicSymbol), ("SingleBondRadii", SingleBondRadii, SingleBondRadius),
+              ("VdwRadii", VdwRadii, VdwRadius), ("AtomicMasses", AtomicMasses, AtomicMass),
+              ("AtomColors", AtomColors, AtomColor)]
+    for name, array, table in arrays:
+        if any(z in table and list(np.atleast_1d(array[z])) != list(np.atleast_1d(table[z]))
+               for z in range(ElementCount)):
+            problems.append("%s does not match its dictionary; call makeArrays()" % name)
+    for name, order in (("HillOrder", HillOrder), ("AlphaOrder", AlphaOrder)):
+        if sorted(order) != list(range(ElementCount)):
+            problems.append("%s is not an order of atomic numbers 0-%d" % (name, ElementCount - 1))
+    # Dummy atom last; Hill order is C, H, then the rest alphabetically
+    symbols = [AtomicSymbol.get(z, "") for z in AlphaOrder[:-1]]
+    if symbols != sorted(symbols):
+        problems.append("AlphaOrder is not in alphabetical order of symbols")
+    if HillOrder[:2] != [6, 1] or [z for z in AlphaOrder if z not in (1, 6)] != HillOrder[2:]:
+        problems.append("HillOrder is not C, H, then AlphaOrder")
+    return problems
+
+
+if __name__ == '__main__':
+    problems = checkTables()
+    print("\n".join(problems) if problems else "Element tables are consistent")
+    raise SystemExit(1 if problems else 0)
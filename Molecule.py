@@ -5,6 +5,7 @@
 """
 
 import Atom
+import CellList
 import Elements
 import numpy as np
 
@@ -25,6 +26,21 @@ class Molecule:
         'atoms': """a list of the atoms in this molecule""",
         'bonds': """a list of tuples: (atomA, atomB, bond length)""",
         'scaler': """a number to scale size of molecule (real)""",
+        'transform': """4x4 orientation and scale applied to the coordinates for display""",
+        'coordinates': """(N,3) array of atom coordinates, in Angstroms""",
+        'atomicNumbers': """(N,) integer array of atomic numbers""",
+        'coordpixels': """(N,3) array of atom coordinates, in pixels""",
+        'radiuspixels': """(N,) array of van der Waal's radii, in pixels""",
+        'bondIndices': """(M,2) integer array of the atom indices of each bond""",
+        'neighborList': """CellList.NeighborList used by updateBonds, or None""",
+    }
+
+    # Per-atom arrays owned by the molecule: name -> (shape of one row, dtype)
+    _atomArrays = {
+        'coordinates':   ((3,), float),
+        'atomicNumbers': ((),   np.int64),
+        'coordpixels':   ((3,), float),
+        'radiuspixels':  ((),   float),
     }
 
     ### Private methods - standard
@@ -41,12 +57,94 @@ class Molecule:
         self.atoms = []
         self.bonds = []
         self.scaler = 1.0
+        self.transform = Matrix.makeIdentity()
+        self._worldCoordinates = None
+        self._spatialIndex = None
+        self._allocate(0)
+        self._bondIndices = np.zeros( (0, 2), dtype=np.int64 )
+        self._bondKeys = None
+        self._incident = None
+        self._adjacency = None
+        self.neighborList = None
         if atoms:
             for atom in atoms:
                 self.addAtom(atom)
 
         return
 
+    @classmethod
+    def fromArrays(cls, atomicNumbers, coordinates):
+        """
+            Molecule.fromArrays(atomicNumbers, coordinates)
+
+            args:     atomicNumbers is a sequence of N atomic numbers
+                      coordinates is an (N,3) array of coordinates
+            returns:  a new instance of class Molecule whose atoms
+                      are views into copies of the given arrays
+        """
+        molecule = cls()
+        natoms = len(atomicNumbers)
+        molecule._allocate(natoms)
+        molecule._buffers['atomicNumbers'][:natoms] = atomicNumbers
+        molecule._buffers['coordinates'][:natoms] = coordinates
+        molecule.atoms = [Atom.Atom._view(molecule, i) for i in range(natoms)]
+        molecule.atomCount = natoms
+        return molecule
+
+    ### Per-atom and per-bond arrays
+
+    @property
+    def coordinates(self):
+        return self._buffers['coordinates'][:self.atomCount]
+
+    @coordinates.setter
+    def coordinates(self, value):
+        self._buffers['coordinates'][:self.atomCount] = value
+        self.coordinatesChanged()
+
+    @property
+    def atomicNumbers(self):
+        return self._buffers['atomicNumbers'][:self.atomCount]
+
+    @atomicNumbers.setter
+    def atomicNumbers(self, value):
+        self._buffers['atomicNumbers'][:self.atomCount] = value
+        self.neighborList = None
+        self._spatialIndex = None
+
+    @property
+    def coordpixels(self):
+        return self._buffers['coordpixels'][:self.atomCount]
+
+    @coordpixels.setter
+    def coordpixels(self, value):
+        self._buffers['coordpixels'][:self.atomCount] = value
+
+    @property
+    def radiuspixels(self):
+        return self._buffers['radiuspixels'][:self.atomCount]
+
+    @radiuspixels.setter
+    def radiuspixels(self, value):
+        self._buffers['radiuspixels'][:self.atomCount] = value
+
+    @property
+    def bondIndices(self):
+        return self._bondIndices[:len(self.bonds)]
+
+    def _allocate(self, capacity):
+        """
+            Create (or enlarge) the per-atom arrays so they can hold
+            capacity atoms, keeping the data of the current atoms.
+        """
+        buffers = {}
+        for name, (shape, dtype) in self._atomArrays.items():
+            buffers[name] = np.zeros( (capacity,) + shape, dtype=dtype )
+            if self.atomCount:
+                buffers[name][:self.atomCount] = self._buffers[name][:self.atomCount]
+        self._buffers = buffers
+        return
+
     ### Housekeeping methods
 
     def clear(self):
@@ -60,8 +158,7 @@ class Molecule:
               information associated with this atomCollection and reset
               all instance variables to their default values.
         """
-        for atom in self.atoms[:]:
-            self.deleteAtom(atom)
+        self.deleteAtoms()
         self.atomCount = 0
         self.bondCount = 0
 
@@ -81,9 +178,11 @@ class Molecule:
     def printCoordinates(self, atomList=None, indent=0):
         if atomList is None:
             atomList = self.atoms
+        world = self.worldCoordinates()
         for atom in atomList:
+            x, y, z = world[atom.index]
             print("%s%-7s %-10s % 6.2f % 6.2f % 6.2f" % (
-                " " * indent, self.atomString(atom), id(atom), atom.x(), atom.y(), atom.z()))
+                " " * indent, self.atomString(atom), id(atom), x, y, z))
         return
 
     ### Methods which return molecular or substructure properties
@@ -93,9 +192,9 @@ class Molecule:
             self.atomString(a1), self.atomString(a2), self.atomString(a3), Atom.atomAngle(a1, a2, a3))
 
     def atomCoordinateString(self, atom):
+        world = self.worldCoordinates()[atom.index]
         return '%s(%d) at (% 5.2f, % 5.2f, % 5.2f)' % (
-            atom.atomicSymbol(), 1 + self.atoms.index(atom), atom.coordinates[0], atom.coordinates[1],
-            atom.coordinates[2])
+            atom.atomicSymbol(), 1 + atom.index, world[0], world[1], world[2])
 
     def atomDihedralString(self, a1, a2, a3, a4):
         return "Dihedral %s-%s-%s-%s = %.1f" % (
@@ -103,40 +202,170 @@ class Molecule:
             Atom.atomDihedral(a1, a2, a3, a4))
 
     def atomDistanceString(self, a1, a2):
-        return "Distance %s-%s = %.3f" % (self.atomString(a1), self.atomString(a2), Atom.atomDistance(a1, a2))
+        world = self.worldCoordinates()
+        distance = np.linalg.norm(world[a2.index] - world[a1.index])
+        return "Distance %s-%s = %.3f" % (self.atomString(a1), self.atomString(a2), distance)
 
     def atomName(self, atom):
-        return "%s%d" % (atom.atomicSymbol(), 1 + self.atoms.index(atom))
+        return "%s%d" % (atom.atomicSymbol(), 1 + atom.index)
 
     def atomString(self, atom):
-        return "%s(%d)" % (atom.atomicSymbol(), 1 + self.atoms.index(atom))
+        return "%s(%d)" % (atom.atomicSymbol(), 1 + atom.index)
 
     def countAtoms(self):
         self.atomCount = len(self.atoms)
         return self.atomCount
 
     def countBonds(self, atomList=None):
+        """
+            countBonds(atomList=None)
+
+            args:     atomList is a list of atoms of this molecule
+                      (default: all atoms)
+            returns:  the number of bonds between atoms in atomList
+        """
         if atomList is None:
-            atomList = self.atoms
-        count = 0
-        for atom in atomList:
-            for batom in atom.bondedAtoms:
-                if batom in atomList:
-                    count = count + 1
-        if atomList == self.atoms:
-            self.bondCount = count / 2
-        return count / 2
+            self.bondCount = len(self.bonds)
+            return self.bondCount
+        selected = np.zeros(self.atomCount, dtype=bool)
+        selected[[atom.index for atom in atomList if atom.molecule is self]] = True
+        bondIndices = self.bondIndices
+        return int( np.count_nonzero(selected[bondIndices[:, 0]] & selected[bondIndices[:, 1]]) )
+
+    def adjacency(self):
+        """
+            adjacency()
+
+            args:     none
+            returns:  (offsets, neighbors), integer arrays of N+1 and
+                      2M elements: atom i is bonded to the atoms
+                      neighbors[offsets[i]:offsets[i+1]], in the order
+                      the bonds were made
+
+            The arrays are built from bondIndices when first needed
+              after the bonds change, and should not be modified.
+        """
+        if self._adjacency is None:
+            pairs = self.bondIndices
+            # Bond k adds atom j to atom i's neighbors, then i to j's
+            owners = pairs.reshape(-1)
+            neighbors = pairs[:, ::-1].reshape(-1)
+            order = np.argsort(owners, kind='stable')
+            offsets = np.zeros(self.atomCount + 1, dtype=np.int64)
+            np.cumsum(np.bincount(owners, minlength=self.atomCount), out=offsets[1:])
+            self._adjacency = (offsets, neighbors[order])
+        return self._adjacency
+
+    def neighbors(self, index):
+        """
+            neighbors(index)
+
+            args:     index is the index of an atom of this molecule
+            returns:  integer array of the indices of the atoms bonded to it
+        """
+        offsets, neighbors = self.adjacency()
+        return neighbors[offsets[index]:offsets[index+1]]
+
+    def degree(self, index):
+        """
+            degree(index)
+
+            args:     index is the index of an atom of this molecule
+            returns:  the number of atoms bonded to it (integer)
+        """
+        offsets = self.adjacency()[0]
+        return int(offsets[index+1] - offsets[index])
+
+    def degrees(self):
+        """
+            degrees()
+
+            args:     none
+            returns:  (N,) integer array of the number of atoms bonded
+                      to each atom
+        """
+        return np.diff(self.adjacency()[0])
+
+    def _neighborRows(self, atoms):
+        """
+            Return (rows, neighbors): for each k, atom neighbors[k] is
+              bonded to atom atoms[rows[k]].
+        """
+        offsets, neighbors = self.adjacency()
+        counts = offsets[atoms + 1] - offsets[atoms]
+        rows = np.repeat(np.arange(len(atoms)), counts)
+        first = np.cumsum(counts) - counts
+        return rows, neighbors[np.repeat(offsets[atoms] - first, counts) + np.arange(counts.sum())]
+
+    def angleTriples(self):
+        """
+            angleTriples()
+
+            args:     none
+            returns:  (M,3) integer array of the bonded triples of
+                      atoms (i, j, k), i < k, for each angle i-j-k
+        """
+        offsets, neighbors = self.adjacency()
+        centers = np.repeat(np.arange(self.atomCount), np.diff(offsets))
+        rows, others = self._neighborRows(centers)
+        triples = np.stack([neighbors[rows], centers[rows], others], axis=1)
+        return triples[triples[:, 0] < triples[:, 2]]
+
+    def dihedralQuads(self):
+        """
+            dihedralQuads()
+
+            args:     none
+            returns:  (M,4) integer array of the bonded quadruples of
+                      atoms (i, j, k, l) for each dihedral i-j-k-l,
+                      each listed once
+        """
+        pairs = self.bondIndices
+        rows, first = self._neighborRows(pairs[:, 0])
+        keep = first != pairs[rows, 1]
+        quads = np.column_stack([first[keep], pairs[rows[keep]]])
+        rows, last = self._neighborRows(quads[:, 2])
+        quads = np.column_stack([quads[rows], last])
+        return quads[ (quads[:, 3] != quads[:, 1]) & (quads[:, 3] != quads[:, 0]) ]
+
+    def distances(self, pairs):
+        """
+            distances(pairs)
+
+            args:     pairs is an (M,2) array of atom indices
+            returns:  (M,) array of the distances between the atoms of
+                      each pair in Angstroms (see Atom.distances)
+        """
+        return Atom.distances(self.coordinates, pairs)
+
+    def angles(self, triples=None):
+        """
+            angles(triples=None)
+
+            args:     triples is an (M,3) array of atom indices
+                      (default: angleTriples())
+            returns:  (M,) array of the angles in degrees (see Atom.angles)
+        """
+        return Atom.angles(self.coordinates, self.angleTriples() if triples is None else triples)
+
+    def dihedrals(self, quads=None):
+        """
+            dihedrals(quads=None)
+
+            args:     quads is an (M,4) array of atom indices
+                      (default: dihedralQuads())
+            returns:  (M,) array of the dihedral angles in degrees
+                      (see Atom.dihedrals)
+        """
+        return Atom.dihedrals(self.coordinates, self.dihedralQuads() if quads is None else quads)
 
     def extrema(self):
         """
             Return a tuple of two Vector's containing 
               the min and max x y z values.
         """
-        vl = self.atoms[0].coordinates
-        vh = self.atoms[0].coordinates
-        for atom in self.atoms:
-            vl = np.minimum(vl, atom.coordinates)
-            vh = np.maximum(vh, atom.coordinates)
+        vl = self.coordinates.min(axis=0)
+        vh = self.coordinates.max(axis=0)
         return vl, vh
 
     def bounding_box_center(self):
@@ -170,56 +399,381 @@ class Molecule:
             returns:  atom coordinates and corresponding van der Waal
                       radius in pixel units
         """
-        for atom in self.atoms:
-            # Use np.rint to round floating point pixel 
-            #   values to nearest integers
-            ###atom.coordpixels = np.rint(atom.coordinates * ang_to_pix)
-            ###atom.radiuspixels = round(atom.vdwRadius() * ang_to_pix)
-            atom.coordpixels = atom.coordinates * ang_to_pix
-            atom.radiuspixels = atom.vdwRadius() * ang_to_pix
+        # Use np.rint to round floating point pixel 
+        #   values to nearest integers
+        ###self.coordpixels = np.rint(self.coordinates * ang_to_pix)
+        ###self.radiuspixels = np.rint(vdwRadii * ang_to_pix)
+        vdwRadii = Elements.VdwRadii[self.atomicNumbers]
+        self.coordpixels = self.worldCoordinates() * ang_to_pix
+        self.radiuspixels = vdwRadii * ang_to_pix
         return
 
     ### Methods which change molecular structure
 
     def addAtom(self, newAtom):
-        if not newAtom in self.atoms:
-            self.atoms.append(newAtom)
-            self.atomCount = self.atomCount + 1
+        if newAtom.molecule is self:
+            return
+        if newAtom.molecule is not None:
+            # An atom belongs to one molecule at a time
+            newAtom.molecule.removeAtom(newAtom)
+        capacity = len(self._buffers['coordinates'])
+        if self.atomCount == capacity:
+            # Grow by doubling so that adding atoms one at a time
+            #   copies each atom's data only a constant number of times
+            self._allocate(max(2 * capacity, 16))
+        i = self.atomCount
+        self._buffers['coordinates'][i] = newAtom.coordinates
+        self._buffers['atomicNumbers'][i] = newAtom.atomicNumber
+        self._buffers['coordpixels'][i] = newAtom.coordpixels
+        self._buffers['radiuspixels'][i] = newAtom.radiuspixels
+        newAtom.molecule = self
+        newAtom.index = i
+        newAtom._atomicNumber = None
+        newAtom._coordinates = None
+        newAtom._coordpixels = None
+        newAtom._radiuspixels = None
+        self.atoms.append(newAtom)
+        self.atomCount = self.atomCount + 1
+        if self._incident is not None:
+            self._incident.append(set())
+        self._adjacency = None
+        self.neighborList = None
+        self.coordinatesChanged()
+
+        #
+        # Bonds made with createBondTo while the atom was free become
+        #   bonds of this molecule once both atoms belong to it; the
+        #   partner not yet added keeps its entry for when it is.
+        #
+        for partner in newAtom._bondedAtoms:
+            if partner.molecule is self:
+                self.bondAtoms(newAtom, partner)
+        newAtom._bondedAtoms = []
         return
 
     def bondAtoms(self, bondFromAtom, bondToAtom):
         """
-            newBond is 1 if a bond is created, 0 if not
+            bondAtoms(bondFromAtom, bondToAtom)
+
+            args:     bondFromAtom and bondToAtom are atoms of this molecule
+            returns:  1 if a bond is created, 0 if the atoms are
+                      already bonded or are the same atom
+        """
+        i, j = bondFromAtom.index, bondToAtom.index
+        key = (i, j) if i < j else (j, i)
+        bondKeys = self._bondKeySet()
+        if i == j or key in bondKeys:
+            return 0
+        bondKeys.add(key)
+        nbonds = len(self.bonds)
+        self._reserveBonds(nbonds + 1)
+        self._bondIndices[nbonds] = (i, j)
+        self.bonds.append( (bondFromAtom, bondToAtom) )
+        self.bondCount = self.bondCount + 1
+        if self._incident is not None:
+            self._incident[i].add(nbonds)
+            self._incident[j].add(nbonds)
+        self._adjacency = None
+        return 1
+
+    def bondAtomPairs(self, pairs):
+        """
+            bondAtomPairs(pairs)
+
+            args:     pairs is an (M,2) array of atom indices
+            returns:  None
+
+            Bond the two atoms of each pair, e.g., pairs found by a
+              bond search or read from a binary molecule file. Bonds
+              and bonded atoms are listed in the same order as if
+              bondAtoms were called for each pair in turn.
         """
-        newBond = bondFromAtom.createBondTo(bondToAtom)
-        if newBond:
-            bond = (bondFromAtom, bondToAtom)
-            self.bonds.append(bond)
-            self.bondCount = self.bondCount + newBond
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+
+        # Drop self bonds and repeated pairs, keeping the first of each pair
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+        unique, first = np.unique(np.sort(pairs, axis=1), axis=0, return_index=True)
+        pairs = pairs[np.sort(first)]
+
+        # Drop pairs which are already bonded
+        if self.bonds and len(pairs):
+            bondKeys = self._bondKeySet()
+            low, high = np.sort(pairs, axis=1).T.tolist()
+            new = [key not in bondKeys for key in zip(low, high)]
+            pairs = pairs[np.array(new, dtype=bool)]
+        if len(pairs) == 0:
+            return
+
+        nbonds = len(self.bonds)
+        self._reserveBonds(nbonds + len(pairs))
+        self._bondIndices[nbonds:nbonds+len(pairs)] = pairs
+        atoms = self.atoms
+        self.bonds.extend( (atoms[i], atoms[j]) for i, j in pairs.tolist() )
+        self.bondCount = len(self.bonds)
+        if self._bondKeys is not None:
+            self._bondKeys.update( map(tuple, np.sort(pairs, axis=1).tolist()) )
+        if self._incident is not None:
+            incident = self._incident
+            for row, (i, j) in enumerate(pairs.tolist(), nbonds):
+                incident[i].add(row)
+                incident[j].add(row)
+        self._adjacency = None
         return
 
     def unbondAtoms(self, bondFromAtom, bondToAtom):
-        self.bondCount = self.bondCount - bondFromAtom.deleteBondTo(bondToAtom)
+        """
+            unbondAtoms(bondFromAtom, bondToAtom)
+
+            args:     bondFromAtom and bondToAtom are atoms of this molecule
+            returns:  1 if a bond is deleted, 0 if not
+        """
+        i, j = bondFromAtom.index, bondToAtom.index
+        key = (i, j) if i < j else (j, i)
+        bondKeys = self._bondKeySet()
+        if key not in bondKeys:
+            return 0
+        bondKeys.discard(key)
+        bondIndices = self._bondIndices
+        match = [row for row in self._incidentRows()[i] if j in bondIndices[row]]
+        self._swapRemoveBondRows(match)
+        return 1
+
+    def unbondAtomPairs(self, pairs):
+        """
+            unbondAtomPairs(pairs)
+
+            args:     pairs is an (M,2) array of atom indices
+            returns:  None
+
+            Delete the bond, if any, between the two atoms of each pair.
+        """
+        pairs = np.sort(np.asarray(pairs, dtype=np.int64).reshape(-1, 2), axis=1)
+        if len(pairs) == 0 or len(self.bonds) == 0:
+            return
+        n = self.atomCount
+        bondIndices = np.sort(self.bondIndices, axis=1)
+        rows = np.flatnonzero( np.isin(bondIndices[:, 0] * n + bondIndices[:, 1],
+                                       pairs[:, 0] * n + pairs[:, 1]) )
+        if len(rows) == 0:
+            return
+        if self._bondKeys is not None:
+            self._bondKeys.difference_update( map(tuple, bondIndices[rows].tolist()) )
+        self._removeBondRows(rows)
+        return
+
+    def _removeBondRows(self, rows):
+        """
+            Remove the given rows from self.bonds and self.bondIndices.
+            Keys of the removed bonds must be dropped by the caller.
+        """
+        keep = np.ones(len(self.bonds), dtype=bool)
+        keep[rows] = False
+        kept = np.flatnonzero(keep)
+        self.bonds = [self.bonds[k] for k in kept.tolist()]
+        self._bondIndices[:len(kept)] = self._bondIndices[kept]
+        self.bondCount = len(self.bonds)
+        self._incident = None
+        self._adjacency = None
+        return
+
+    def _reserveBonds(self, nbonds):
+        """
+            Enlarge self._bondIndices, by doubling, to hold nbonds bonds.
+        """
+        capacity = len(self._bondIndices)
+        if nbonds > capacity:
+            bondIndices = np.zeros( (max(2 * capacity, nbonds, 16), 2), dtype=np.int64 )
+            bondIndices[:len(self.bonds)] = self.bondIndices
+            self._bondIndices = bondIndices
+        return
+
+    def _bondKeySet(self):
+        """
+            Return the set of (i, j), i < j, of every bond, built when
+            first needed after the atoms were renumbered.
+        """
+        if self._bondKeys is None:
+            pairs = np.sort(self.bondIndices, axis=1)
+            self._bondKeys = set( map(tuple, pairs.tolist()) )
+        return self._bondKeys
+
+    def _incidentRows(self):
+        """
+            Return a list of the set of bond rows of each atom, built
+            when first needed after many atoms or bonds were removed,
+            so a single atom or bond is removed in time proportional
+            to its number of bonds.
+        """
+        if self._incident is None:
+            incident = [set() for k in range(self.atomCount)]
+            for row, (i, j) in enumerate(self.bondIndices.tolist()):
+                incident[i].add(row)
+                incident[j].add(row)
+            self._incident = incident
+        return self._incident
+
+    def _swapRemoveBondRows(self, rows):
+        """
+            Remove the given rows from self.bonds and self.bondIndices
+            by moving the last bonds into their places, so the time
+            taken does not depend on the number of bonds. Keys of the
+            removed bonds must be dropped by the caller.
+        """
+        bonds = self.bonds
+        bondIndices = self._bondIndices
+        incident = self._incident
+        for row in sorted(rows, reverse=True):
+            last = len(bonds) - 1
+            if incident is not None:
+                i, j = bondIndices[row].tolist()
+                incident[i].discard(row)
+                incident[j].discard(row)
+            if row != last:
+                bonds[row] = bonds[last]
+                bondIndices[row] = bondIndices[last]
+                if incident is not None:
+                    for k in bondIndices[row].tolist():
+                        incident[k].discard(last)
+                        incident[k].add(row)
+            bonds.pop()
+        self.bondCount = len(bonds)
+        self._adjacency = None
         return
 
     def deleteAtom(self, atom):
-        for batom in atom.bondedAtoms:
-            self.unbondAtoms(atom, batom)
         self.removeAtom(atom)
         atom.clear()
         del atom
         return
 
-    def deleteAtoms(self):
-        for atom in self.atoms:
-            self.deleteAtom(atom)
+    def deleteAtoms(self, selection=None):
+        """
+            deleteAtoms(selection=None)
+
+            args:     selection is an (N,) boolean mask or a sequence
+                      of the indices of the atoms to delete (default:
+                      all atoms)
+            returns:  None
+
+            Delete many atoms, e.g., a solvent shell, in one pass: the
+              per-atom arrays and bonds of the remaining atoms are
+              compacted, keeping their order, and the bonds renumbered.
+        """
+        n = self.atomCount
+        if selection is None:
+            remove = np.ones(n, dtype=bool)
+        else:
+            selection = np.asarray(selection)
+            if selection.dtype == bool:
+                if selection.shape != (n,):
+                    raise ValueError("Mask of %d atoms for molecule of %d atoms" % (len(selection), n))
+                remove = selection
+            else:
+                remove = np.zeros(n, dtype=bool)
+                remove[selection.astype(np.int64)] = True
+        removed = np.flatnonzero(remove)
+        if len(removed) == 0:
+            return
+        kept = np.flatnonzero(~remove)
+
+        # Bonds between remaining atoms, renumbered
+        newIndex = np.full(n, -1, dtype=np.int64)
+        newIndex[kept] = np.arange(len(kept))
+        bondIndices = newIndex[self.bondIndices]
+        keepBonds = np.flatnonzero( np.all(bondIndices >= 0, axis=1) )
+        self.bonds = [self.bonds[k] for k in keepBonds.tolist()]
+        self._bondIndices[:len(keepBonds)] = bondIndices[keepBonds]
+        self.bondCount = len(self.bonds)
+        self._bondKeys = None
+        self._incident = None
+
+        atoms = self.atoms
+        deleted = [atoms[k] for k in removed.tolist()]
+        for atom in deleted:
+            self._detach(atom)
+        for buffer in self._buffers.values():
+            buffer[:len(kept)] = buffer[kept]
+        self.atoms = [atoms[k] for k in kept.tolist()]
+        for index, atom in enumerate(self.atoms):
+            atom.index = index
+
+        self.atomCount = len(kept)
+        self._structureChanged()
+        for atom in deleted:
+            atom.clear()
         return
 
     def removeAtom(self, atom):
-        if atom not in self.atoms:
+        """
+            removeAtom(atom)
+
+            args:     atom is an atom of this molecule
+            returns:  None
+
+            Remove atom, and its bonds, from this molecule; the last
+              atom takes the removed atom's place (and index), so no
+              other atom is renumbered. Use deleteAtoms to remove many
+              atoms and keep the order of the others.
+        """
+        if atom.molecule is not self:
             return
-        self.atoms.remove(atom)
-        self.atomCount = self.atomCount - 1
+        i = atom.index
+        last = self.atomCount - 1
+        self._detach(atom)
+
+        # Drop bonds to the removed atom
+        incident = self._incidentRows()
+        bondIndices = self.bondIndices
+        rows = sorted(incident[i])
+        if self._bondKeys is not None:
+            self._bondKeys.difference_update( map(tuple, np.sort(bondIndices[rows], axis=1).tolist()) )
+        self._swapRemoveBondRows(rows)
+
+        # Move the last atom into the gap and renumber its bonds
+        if i != last:
+            for buffer in self._buffers.values():
+                buffer[i] = buffer[last]
+            moved = self.atoms[last]
+            self.atoms[i] = moved
+            moved.index = i
+            bondIndices = self.bondIndices
+            rows = sorted(incident[last])
+            if self._bondKeys is not None:
+                self._bondKeys.difference_update( map(tuple, np.sort(bondIndices[rows], axis=1).tolist()) )
+            renumbered = bondIndices[rows]
+            renumbered[renumbered == last] = i
+            bondIndices[rows] = renumbered
+            if self._bondKeys is not None:
+                self._bondKeys.update( map(tuple, np.sort(renumbered, axis=1).tolist()) )
+            incident[i] = incident[last]
+        incident.pop()
+        self.atoms.pop()
+
+        self.atomCount = last
+        self._structureChanged()
+        return
+
+    def _detach(self, atom):
+        """
+            Give atom back its own copy of its data, leaving it in no
+            molecule.
+        """
+        i = atom.index
+        atom._atomicNumber = int(self._buffers['atomicNumbers'][i])
+        atom._coordinates = self._buffers['coordinates'][i].copy()
+        atom._coordpixels = self._buffers['coordpixels'][i].copy()
+        atom._radiuspixels = self._buffers['radiuspixels'][i]
+        atom.molecule = None
+        atom.index = None
+        return
+
+    def _structureChanged(self):
+        """
+            Discard everything computed from the atoms' indices.
+        """
+        self._adjacency = None
+        self.neighborList = None
+        self.coordinatesChanged()
         return
 
     def xyzRotate(self, deltaX, deltaY, deltaZ):
@@ -263,16 +817,61 @@ class Molecule:
         cs12 = cs3 * sineat
 
         # apply rotation matrix to coordinates
-        for atom in self.atoms:
-            x = atom.coordpixels[0]
-            y = atom.coordpixels[1]
-            z = atom.coordpixels[2]
-            atom.coordpixels[0] = (x * cs1) - (y * cs2) - (z * sineat)
-            atom.coordpixels[1] = x * (cs3 - cs9) + y * (cs4 + cs10) - (z * cs5)
-            atom.coordpixels[2] = x * (cs6 + cs11) + y * (cs7 - cs12) + (z * cs8)
+        x = self.coordpixels[:, 0].copy()
+        y = self.coordpixels[:, 1].copy()
+        z = self.coordpixels[:, 2].copy()
+        self.coordpixels[:, 0] = (x * cs1) - (y * cs2) - (z * sineat)
+        self.coordpixels[:, 1] = x * (cs3 - cs9) + y * (cs4 + cs10) - (z * cs5)
+        self.coordpixels[:, 2] = x * (cs6 + cs11) + y * (cs7 - cs12) + (z * cs8)
+
+        return
+
+    def applyMatrix(self, matrix):
+        """
+            Compose a transformation with the molecule's orientation
+            and scale. The input coordinates are left unchanged; the
+            transformed (world) coordinates are only computed when
+            worldCoordinates() is called.
+
+            matrix == 3x3 linear or 4x4 affine transformation matrix
+        """
+        matrix = np.asarray(matrix, dtype=float)
+        if matrix.shape == (3, 3):
+            affine = Matrix.makeIdentity()
+            affine[0:3, 0:3] = matrix
+            matrix = affine
+
+        # Transformations are applied in the order they were requested
+        self.transform = matrix @ self.transform
+        self._worldCoordinates = None
 
         return
 
+    def worldCoordinates(self):
+        """
+            worldCoordinates()
+            args:     none
+            returns:  (N,3) array of the atomic coordinates after the
+                      molecule's transform has been applied. The result
+                      is cached until the transform or the coordinates
+                      change, and should not be modified.
+        """
+        if self._worldCoordinates is None:
+            rotation = self.transform[0:3, 0:3]
+            translation = self.transform[0:3, 3]
+            self._worldCoordinates = self.coordinates @ rotation.T + translation
+        return self._worldCoordinates
+
+    def coordinatesChanged(self):
+        """
+            Discard anything computed from the coordinates. Called by
+            the coordinate setters; call it after modifying
+            self.coordinates in place.
+        """
+        self._worldCoordinates = None
+        self._spatialIndex = None
+        return
+
     def rotateXYZ(self, deltaX, deltaY, deltaZ):
         """
             Using matrix multiplication, rotate the molecule. 
@@ -281,20 +880,14 @@ class Molecule:
             deltaY == rotation angle about Y axis (radians)
             deltaZ == rotation angle about Z axis (radians)
 
-            Returns altered xyz coordinates resulting from 
-            rotating xyz coordinates (Angstroms).
+            Updates the molecule's transform; see worldCoordinates()
+            for the rotated xyz coordinates (Angstroms).
         """
         transform = (Matrix.makeRotationZ(deltaZ) @
                      Matrix.makeRotationY(deltaY) @
                      Matrix.makeRotationX(deltaX))
-        # Get 3x3 submatrix with just rotation part
-        transform = np.array( [ transform[0][0:3],
-                                transform[1][0:3],
-                                transform[2][0:3] ] )
 
-        # Apply tranform matrix to atomic coordinates
-        for atom in self.atoms:
-            atom.coordinates = transform @ atom.coordinates
+        self.applyMatrix(transform)
 
         return
 
@@ -305,35 +898,174 @@ class Molecule:
          
             factor == scaling factor (real number)
 
-            Returns:
-              • altered xyz coordinates resulting from scaling 
-                xyz coordinates (Angstroms).
-              • updated scaler for molecule
+            Updates:
+              • the molecule's transform; see worldCoordinates()
+                for the scaled xyz coordinates (Angstroms).
+              • scaler for molecule
         """
-        transform = Matrix.makeScale(factor)
-        # Get 3x3 submatrix with just scaling part
-        transform = np.array( [ transform[0][0:3],
-                                transform[1][0:3],
-                                transform[2][0:3] ] )
-
-        # Apply tranform matrix to atomic coordinates
-        for atom in self.atoms:
-            atom.coordinates = transform @ atom.coordinates
+        self.applyMatrix(Matrix.makeScale(factor))
 
         # Update scaler with 'factor'
         self.scaler = self.scaler * factor
 
         return
 
+    ### Methods to find nearby atoms
+
+    def spatialIndex(self):
+        """
+            spatialIndex()
+
+            args:     none
+            returns:  a CellList of the atom coordinates, with cells as
+                      large as the longest bond cutoff (1.2 times the
+                      largest single bond radius)
+
+            The cell list is built when first needed after the atoms
+              or their coordinates change, and is shared by bond
+              perception and the queries below. It should not be
+              modified.
+        """
+        if self._spatialIndex is None:
+            radii = Elements.SingleBondRadii[self.atomicNumbers]
+            cellEdge = 1.2 * radii.max(initial=Elements.SingleBondRadii[0])
+            self._spatialIndex = CellList.CellList(self.coordinates.copy(), cellEdge)
+        return self._spatialIndex
+
+    def _queryPoint(self, center):
+        """
+            Return (point, index) for center, an atom index or an
+            (x,y,z) position; index is None for a position.
+        """
+        if np.ndim(center) == 0:
+            index = int(center)
+            return self.coordinates[index], index
+        return np.asarray(center, dtype=float), None
+
+    def atomsWithin(self, center, radius):
+        """
+            atomsWithin(center, radius)
+
+            args:     center is the index of an atom, or an (x,y,z)
+                      position in Angstroms
+                      radius is a distance in Angstroms
+            returns:  (indices, distances): integer array of the indices
+                      of the atoms within radius of center, in
+                      increasing order, and their distances; an atom
+                      given as center is not included
+        """
+        point, index = self._queryPoint(center)
+        indices, distances = self.spatialIndex().pointsWithin(point, radius)
+        keep = indices != index
+        return indices[keep], distances[keep]
+
+    def nearestAtoms(self, center, k=1):
+        """
+            nearestAtoms(center, k=1)
+
+            args:     center is the index of an atom, or an (x,y,z)
+                      position in Angstroms
+                      k is the number of atoms wanted
+            returns:  (indices, distances) of the k atoms nearest to
+                      center, nearest first; an atom given as center
+                      is not included
+        """
+        point, index = self._queryPoint(center)
+        extra = 0 if index is None else 1
+        indices, distances = self.spatialIndex().nearest(point, k + extra)
+        keep = np.flatnonzero(indices != index)[:k]
+        return indices[keep], distances[keep]
+
+    def contacts(self, cutoff):
+        """
+            contacts(cutoff)
+
+            args:     cutoff is a distance in Angstroms
+            returns:  an (M,2) integer array of the atom pairs (i, j),
+                      i < j, within cutoff of each other, sorted by i
+                      and then j (see distances() for their distances)
+        """
+        cells = self.spatialIndex()
+        #
+        # A cutoff of many cells would visit too many neighboring cells;
+        #   search a cell list with cells as large as the cutoff instead
+        #
+        if cutoff > 2 * cells.cellEdge:
+            cells = CellList.CellList(cells.coordinates, cutoff)
+        return cells.pairsWithin(cutoff)
+
     ### Methods to find bonds
 
-    def findBonds(self):
-        self._computeBonds()
+    def findBonds(self, progress=None, workers=None):
+        """
+            findBonds(progress=None, workers=None)
+
+            args:     progress, if given, is called with the number of
+                      bonds found so far while searching; an exception
+                      it raises stops the search before any bond is made
+                      workers, if more than 1, is the number of processes
+                      searching slabs of a large molecule in parallel
+                      (see CellList.findBondPairsParallel)
+            returns:  None
+        """
+        self._computeBonds(progress=progress, workers=workers)
         return
 
+    def updateBonds(self, skin=0.3, factor=1.2):
+        """
+            updateBonds(skin=0.3, factor=1.2)
+
+            args:     skin is the distance added to the bond cutoffs of
+                      the neighbor list (see CellList.NeighborList)
+                      factor scales the sum of single bond radii
+            returns:  (added, removed), (A,2) and (R,2) integer arrays
+                      of the atom pairs bonded and unbonded
+
+            Make and break bonds after the coordinates have changed,
+              e.g., for each frame of a trajectory, testing only the
+              atom pairs near their bond cutoff. The pairs returned
+              can be passed to a structure model, which then changes
+              only those bonds. The first call after atoms are added
+              or removed searches all pairs.
+        """
+        neighborList = self.neighborList
+        if ( neighborList is None or neighborList.skin != skin or
+             neighborList.factor != factor ):
+            radii = Elements.SingleBondRadii[self.atomicNumbers]
+            neighborList = CellList.NeighborList(radii, factor, skin, self.bondIndices)
+            self.neighborList = neighborList
+        added, removed = neighborList.update(self.coordinates)
+        self.unbondAtomPairs(removed)
+        self.bondAtomPairs(added)
+        return added, removed
+
     ### Private methods - bond order
 
-    def _computeNonTransitionMetalBonds(self, factor=1.2):
+    def _computeNonTransitionMetalBonds(self, factor=1.2, progress=None, workers=None):
+        """
+            Bond every pair of atoms closer than factor times the
+            sum of their single bond radii. Candidate pairs come
+            from a cell list, so the search is close to linear in
+            the number of atoms.
+        """
+        if self.atomCount < 2:
+            return 0
+        radii = Elements.SingleBondRadii[self.atomicNumbers]
+        if workers is not None and workers > 1:
+            pairs = CellList.findBondPairsParallel(self.coordinates, radii, factor,
+                                                   workers, progress)
+        else:
+            pairs = CellList.findBondPairs(self.coordinates, radii, factor, progress,
+                                           cells=self.spatialIndex())
+        self.bondAtomPairs(pairs)
+
+        return len(pairs)
+
+    def _computeNonTransitionMetalBondsPairwise(self, factor=1.2):
+        """
+            Reference version of _computeNonTransitionMetalBonds which
+            tests every atom pair. Kept for checking and benchmarking.
+        """
         delta = 0
         for i in range(self.atomCount - 1):
             a1 = self.atoms[i]
@@ -347,6 +1079,5 @@ class Molecule:
 
         return delta
 
-    def _computeBonds(self, factor=1.2):
-        return self._computeNonTransitionMetalBonds(factor)
-
+    def _computeBonds(self, factor=1.2, progress=None, workers=None):
+        return self._computeNonTransitionMetalBonds(factor, progress, workers)
@@ -9,7 +9,6 @@ import numpy as np
 from math import pi
 
 # Need following for molecular objects
-import Atom
 import Elements
 
 # Import any needed third party library
@@ -22,41 +21,18 @@ from core.renderer import Renderer
 from core.scene    import Scene
 from core.group    import Group
 from core.camera   import Camera
-from core.matrix   import Matrix
 from core.mesh     import Mesh
+from core.pickBuffer import PickBuffer
 from geometry.bondGeometry    import BondGeometry
+from geometry.bondInstances   import BondInstances
 from geometry.sphereGeometry  import SphereGeometry
+from geometry.geometryCache   import geometryCache
 from light.ambientLight       import AmbientLight
 from light.directionalLight   import DirectionalLight
 from material.lambertMaterial import LambertMaterial
-from material.flatMaterial    import FlatMaterial
-from material.phongMaterial   import PhongMaterial
-
-def bondDirection(point1, point2):
-    """
-       A bond between an atom at point1 and an atom at point2
-       has a particular direction in space. The initial 
-       drawing of a bond is along the y axis and centered at
-       the xyz origin. It is then necessary to determine the
-       rotation matrix for the actual bond direction for 
-       application to the drawn bond. The code below was
-       adopted from pp.221-222 in Computer Graphics: Principles
-       and Practice, 2nd ed., 1990.
-    """
-    vz = np.array([1,0,1])
-    v12 = point2 - point1
-    PD = v12/np.linalg.norm(v12) # normalize preferred direction
-    xp = np.cross(vz, PD)
-    zp = np.cross(PD, xp)
-    nxp = np.linalg.norm(xp)
-    nzp = np.linalg.norm(zp)
-    XP = xp/nxp if nxp > 1e-6 else xp
-    ZP = zp/nzp if nzp > 1e-6 else zp
-    R = np.array( [[XP[0], PD[0], ZP[0], 0],        
-                   [XP[1], PD[1], ZP[1], 0],        
-                   [XP[2], PD[2], ZP[2], 0],        
-                   [    0,      0,     0, 1]] ).astype(float)
-    return R
+from material.instancedFlatMaterial import InstancedFlatMaterial
+from material.instancedPhongMaterial import InstancedPhongMaterial
+from material.pickMaterial import PickMaterial, BOND_PICK_ID, pickedAtom
 
 #
 # Establish this structure model as a QOpenGLWidget with 
@@ -97,6 +73,10 @@ class BallStickModel(GLBase):
         self.bondRadius = 0.10
         self.ballRadius = 0.30
 
+        # Per-bond data and pick buffer, created with the scene in initializeGL
+        self.bondInstances = None
+        self.pickBuffer = None
+
     def initializeGL(self):
         super().initializeGL()
 
@@ -117,98 +97,142 @@ class BallStickModel(GLBase):
         # Use Flat lighting model for bonds and 
         #   Phong lighting model for spheres.
         #
-        flatMat = FlatMaterial( properties={ "useVertexColors" : True } )
-        phongMat = PhongMaterial( properties={ "useVertexColors" : True,
-                                               "shininess" : 64,
-                                               "specularStrength" : 1.5} )
-
-        # Update bondRadius to represent current molecular size
-        self.bondRadius = self.bondRadius * self.molecule.scaler
-
-        # Draw each bond of molecule
-        for bond in self.molecule.bonds:
-            atom1, atom2 = bond[0], bond[1]
-            bondLength = Atom.atomDistance(atom1, atom2)
-            bondMidpoint = (atom1.coordinates + atom2.coordinates)/2
-            rgb1 = (np.array(Elements.AtomColor[atom1.atomicNumber]))/255
-            rgb2 = (np.array(Elements.AtomColor[atom2.atomicNumber]))/255
-            # Convert numpy arrays, rgb1 and rgb2, to Python lists
-            c1, c2 = rgb1.tolist(), rgb2.tolist()
-            #
-            # Draw a 2-color bond with radius and length along the y-axis
-            #   and centered at the origin
-            #
-            bondGeometry = BondGeometry(radius=self.bondRadius, height=bondLength,
-                                        radialSegments=32,
-                                        color1=c1, color2=c2)
-            #
-            # Transform bondGeometry such that it has same direction vector 
-            #   as that between the 2 atoms of the bond.
-            #
-            bondGeometry.applyMatrix( bondDirection(atom1.coordinates, atom2.coordinates) )
-            #
-            # Translate center (0,0,0) of drawn bondGeometry to actual bond
-            #   center (x,y,z) between the 2 atoms.
-            #
-            x, y, z = bondMidpoint.tolist()
-            bondGeometry.applyMatrix( Matrix.makeTranslation(x,y,z) )
-            #
-            # Apply shading model to bond
-            #
-            bondObject = Mesh(bondGeometry, flatMat)
-            self.ballstick.add(bondObject)
-
-        # Update ballRadius to represent current molecular size
-        self.ballRadius = self.ballRadius * self.molecule.scaler
-
-        # Draw each atom of molecule as a shaded sphere
-        for atom in self.molecule.atoms:
-            atom_coord = atom.coordinates
-            rgb = (np.array(Elements.AtomColor[atom.atomicNumber]))/255
-            # Convert numpy array, rgb, to Python list
-            color = rgb.tolist()
-            #
-            # Draw a single-color sphere/ball with radius and centered at the origin
-            #
-            sphereGeometry = SphereGeometry(radius=self.ballRadius, color1=color, color2=color)
-            #
-            # Apply shading model to sphere/ball
-            # 
-            sphereObject = Mesh(sphereGeometry, phongMat)
-            #
-            # Translate center (0,0,0) of sphere/ball to actual atom coordinates
-            #
-            sphereObject.setPosition(atom_coord)
-            self.ballstick.add(sphereObject)
+        flatMat = InstancedFlatMaterial( properties={ "useVertexColors" : True } )
+        phongMat = InstancedPhongMaterial( properties={ "useVertexColors" : True,
+                                                        "shininess" : 64,
+                                                        "specularStrength" : 1.5} )
+
+        #
+        # Draw all bonds of molecule with a single instanced draw call:
+        #   one 2-color capped cylinder with radius 1 and length 1 along
+        #   the y-axis is stored on the GPU, and each bond supplies the
+        #   positions and colors of its 2 atoms. The vertex colors of
+        #   the shared cylinder (black and white halves) select which
+        #   atom color each half of a bond receives.
+        #   Bonds made or broken as the molecule moves only change
+        #   their own rows of the per-bond data (see moleculeChanged).
+        #
+        colors = Elements.AtomColors[self.molecule.atomicNumbers]/255
+        bondGeometry = geometryCache.get(self.context().shareGroup(), BondGeometry,
+                                         radius=1, height=1, radialSegments=32,
+                                         color1=[0, 0, 0], color2=[1, 1, 1])
+        self.bondInstances = BondInstances(bondGeometry, self.molecule, colors, self.bondRadius)
+        #
+        # Apply shading model to bonds
+        #
+        bondObject = Mesh(bondGeometry, flatMat)
+        self.ballstick.add(bondObject)
+
+        #
+        # Draw all atoms of molecule as shaded spheres with a single
+        #   instanced draw call: one unit sphere/ball is stored on the
+        #   GPU, and each atom supplies its position, radius, and color.
+        #
+        natoms = self.molecule.atomCount
+        colors = Elements.AtomColors[self.molecule.atomicNumbers]/255
+        sphereGeometry = geometryCache.get(self.context().shareGroup(), SphereGeometry, radius=1)
+        sphereGeometry.addInstanceAttribute("vec3", "instancePosition", self.molecule.coordinates.copy(),
+                                            dynamic=True)
+        sphereGeometry.addInstanceAttribute("float", "instanceRadius", np.full(natoms, self.ballRadius))
+        sphereGeometry.addInstanceAttribute("vec3", "instanceColor", colors)
+        sphereGeometry.countInstances()
+        self.sphereGeometry = sphereGeometry
+        self.atomsMoved = False
+        #
+        # Apply shading model to spheres/balls
+        # 
+        sphereObject = Mesh(sphereGeometry, phongMat)
+        self.ballstick.add(sphereObject)
 
         self.scene.add(self.ballstick)
 
+        #
+        # Draw the same bonds and spheres with atom IDs in place of colors, to
+        #   pick the atom under the mouse (see pickAtom)
+        #
+        self.pickScene = Scene()
+        self.pickGroup = Group()
+        bondPickMat = PickMaterial(InstancedFlatMaterial.vertexShaderCode, BOND_PICK_ID)
+        spherePickMat = PickMaterial(InstancedPhongMaterial.vertexShaderCode)
+        self.pickGroup.add( Mesh(bondGeometry, bondPickMat) )
+        self.pickGroup.add( Mesh(sphereGeometry, spherePickMat) )
+        self.pickScene.add(self.pickGroup)
+        self.pickBuffer = PickBuffer()
+
+    def moleculeChanged(self, added=(), removed=()):
+        """
+           Show the molecule's new coordinates, e.g., the next frame of
+           a trajectory, with the bonds made (added) and broken
+           (removed) as returned by Molecule.updateBonds. Only the
+           per-instance data changes; no mesh is rebuilt.
+        """
+        if self.bondInstances is not None:
+            coordinates = self.molecule.coordinates
+            self.bondInstances.setCoordinates(coordinates)
+            self.bondInstances.applyChanges(added, removed, coordinates)
+            self.sphereGeometry.attributes["instancePosition"].data[:] = coordinates
+            self.atomsMoved = True
+        self.update()
+
+    def uploadInstances(self):
+        """
+           Upload the bonds and atom positions changed by
+           moleculeChanged; the OpenGL context must be current.
+        """
+        self.bondInstances.upload()
+        if self.atomsMoved:
+            self.sphereGeometry.attributes["instancePosition"].updateData(0, self.molecule.atomCount)
+            self.atomsMoved = False
+
     def paintGL(self):
         super().paintGL()
 
         self.setFocus()
-        localCoord = False
 
-        # Rotation actions upon mouse presses and movements
+        #
+        # Rotation actions upon mouse presses and movements. Only the
+        #   molecule's transform changes; atom coordinates are untouched.
+        #
         if self.xy_rotation:
-            self.ballstick.rotateX( self.phi, localCoord )
-            self.ballstick.rotateY( self.theta, localCoord )
             self.molecule.rotateXYZ(self.phi, self.theta, 0)
         elif self.z_rotation:
-            self.ballstick.rotateZ( self.chi, localCoord )
             self.molecule.rotateXYZ(0, 0, self.chi)
        
         # Scaling actions upon key presses
         if self.input.isKeyDown(Qt.Key_L):
-            self.ballstick.scale( 1.1, localCoord )
             self.molecule.scaleXYZ(1.1)
         if self.input.isKeyDown(Qt.Key_S):
-            self.ballstick.scale( 0.9, localCoord )
             self.molecule.scaleXYZ(0.9)
 
+        # Upload bonds and atoms moved by moleculeChanged
+        self.uploadInstances()
+
+        # Orient and scale the whole model with the molecule's transform
+        self.ballstick.transform = self.molecule.transform.copy()
+
         # Render molecular structure
         self.renderer.render( self.scene, self.camera )
 
+    def pickAtom(self, x, y):
+        """
+           Return the index of the atom drawn at widget position (x, y),
+           or None if there is none. The bonds and spheres are drawn once, with
+           atom IDs for colors, into the pick buffer, only at (x, y).
+        """
+        if self.pickBuffer is None:
+            return None
+        ratio = self.devicePixelRatio()
+        width = int(self.width() * ratio)
+        height = int(self.height() * ratio)
+        self.makeCurrent()
+        self.uploadInstances()
+        self.pickGroup.transform = self.molecule.transform.copy()
+        pickID = self.pickBuffer.pick(self.renderer, self.pickScene, self.camera,
+                                      int(x * ratio), height - 1 - int(y * ratio),
+                                      width, height)
+        self.doneCurrent()
+        return pickedAtom(pickID, self.bondInstances.pairs)
+
     def mousePressEvent(self, event):
         """ 
            Left mouse press initiates xy rotation.
@@ -258,10 +282,19 @@ class BallStickModel(GLBase):
         self.prev_x = curr_x
         self.prev_y = curr_y
 
-        # Pass mouse_pos coords to mouse_track_label to
-        #   display in status bar.
+        #
+        # Show the atom under the mouse in the status bar, or the
+        #   mouse coordinates if there is none. Atoms are only picked
+        #   while the molecule is not being rotated.
+        #
+        atom = None
+        if not (self.xy_rotation or self.z_rotation):
+            atom = self.pickAtom(curr_x, curr_y)
         self.mouse_track_label.setVisible(True)
-        sb_text = f"""<p>Mouse Coordinates: ({curr_x},
+        if atom is not None:
+            sb_text = f"""<p>{self.molecule.atomCoordinateString(self.molecule.atoms[atom])}<p>"""
+        else:
+            sb_text = f"""<p>Mouse Coordinates: ({curr_x},
                          {curr_y})<p>"""
         self.mouse_track_label.setText(sb_text)
         self.parent.status_bar.addWidget(self.mouse_track_label)
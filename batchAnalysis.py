@@ -0,0 +1,249 @@
+# File: batchAnalysis.py
+"""
+   Find the bonds of many .xyz files without a window, e.g., to
+   screen a directory of structures overnight, and write the bonds
+   and statistics of each molecule as JSON or CSV. Qt and OpenGL are
+   not imported.
+
+   Each file's first frame is read, its bonds found, and the molecule
+   centered at the origin, just as when the file is opened in the
+   window (see processMolecule.prepareMolecule). Files are processed
+   by a pool of processes, one per CPU by default, and the number of
+   files processed per second is reported when done.
+
+   For each file, the statistics are:
+
+     • file, title, and numbers of atoms and bonds
+     • formula, in Hill order
+     • center: center of the bounding box of the atoms as read
+     • extent: length of the diagonal of the bounding box
+     • minBond, meanBond, maxBond: bond lengths, in Angstroms
+     • seconds: time taken to read and process the file
+     • error: why the file could not be read, if it could not
+
+   and with --bonds, each bond is listed as the numbers of its 2
+   atoms (counting from 1, as in atom labels) and its length.
+
+   Usage, from the main moleql directory:
+
+       python batchAnalysis.py structures/ -o stats.json
+       python batchAnalysis.py structures/ --recursive --format csv -o stats.csv
+       python batchAnalysis.py water.xyz pyrimidine.xyz --bonds --workers 1
+"""
+# Import needed standard libraries
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Need following for molecular objects
+import Elements
+import mqlbFile
+from processMolecule import prepareMolecule
+
+# Columns of the CSV file of statistics, and of bonds (with --bonds)
+STATISTICS_COLUMNS = ["file", "title", "atoms", "bonds", "formula", "centerX", "centerY", "centerZ",
+                      "extent", "minBond", "meanBond", "maxBond", "seconds", "error"]
+BOND_COLUMNS = ["file", "atom1", "atom2", "length"]
+
+def formula(atomicNumbers):
+    """
+        formula(atomicNumbers)
+
+        args:    atomicNumbers is an array of atomic numbers
+        returns: the molecular formula in Hill order, e.g., "C4H4N2"
+    """
+    counts = np.bincount(np.asarray(atomicNumbers, dtype=np.int64), minlength=len(Elements.HillOrder))
+    parts = []
+    for z in Elements.HillOrder:
+        if z < len(counts) and counts[z]:
+            parts.append( Elements.AtomicSymbol[z] + (str(counts[z]) if counts[z] > 1 else "") )
+    return "".join(parts)
+
+def analyzeFile(fileName, withBonds=False, useCache=False):
+    """
+        analyzeFile(fileName, withBonds=False, useCache=False)
+
+        args:    fileName is the name of an .xyz file
+                 withBonds is True to list the bonds
+                 useCache is True to read and write .mqlb cache files
+                 (see mqlbFile.readCachedMolecule)
+        returns: dictionary of the statistics of the molecule, and its
+                 bonds as [atom1, atom2, length] lists under "bondList"
+                 if withBonds is True; or of the file name and error
+                 if the file could not be read
+    """
+    start = time.perf_counter()
+    try:
+        molecule, title = mqlbFile.readCachedMolecule(fileName, useCache=useCache)
+    except (OSError, ValueError) as error:
+        return { "file": fileName, "error": str(error) }
+    if molecule.atomCount == 0:
+        return { "file": fileName, "title": title, "atoms": 0, "bonds": 0,
+                 "error": "no atoms" }
+    center = molecule.bounding_box_center()
+    minvec, maxvec = molecule.extrema()
+    prepareMolecule(molecule)
+
+    bondIndices = molecule.bondIndices
+    diff = molecule.coordinates[bondIndices[:, 1]] - molecule.coordinates[bondIndices[:, 0]]
+    lengths = np.sqrt( np.einsum('ij,ij->i', diff, diff) )
+    result = { "file": fileName,
+               "title": title,
+               "atoms": molecule.atomCount,
+               "bonds": molecule.bondCount,
+               "formula": formula(molecule.atomicNumbers),
+               "center": [round(float(x), 6) for x in center],
+               "extent": round(float(molecule.maxExtension(minvec, maxvec)), 6),
+               "minBond": round(float(lengths.min()), 6) if len(lengths) else None,
+               "meanBond": round(float(lengths.mean()), 6) if len(lengths) else None,
+               "maxBond": round(float(lengths.max()), 6) if len(lengths) else None }
+    if withBonds:
+        result["bondList"] = [ [i + 1, j + 1, round(length, 6)] for (i, j), length
+                               in zip(bondIndices.tolist(), lengths.tolist()) ]
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    return result
+
+def _analyzeFile(arguments):
+    return analyzeFile(*arguments)
+
+def findFiles(paths, recursive=False):
+    """
+        findFiles(paths, recursive=False)
+
+        args:    paths is a list of .xyz files and directories
+                 recursive is True to search subdirectories too
+        returns: sorted list of the .xyz files given or in the
+                 directories given
+    """
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+        elif recursive:
+            for directory, subdirectories, names in os.walk(path):
+                subdirectories.sort()
+                files.extend(os.path.join(directory, name) for name in sorted(names)
+                             if name.lower().endswith(".xyz"))
+        else:
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith(".xyz") and
+                            os.path.isfile(os.path.join(path, name)))
+    return files
+
+def analyzeFiles(files, withBonds=False, useCache=False, workers=None):
+    """
+        analyzeFiles(files, withBonds=False, useCache=False, workers=None)
+
+        args:    files is a list of .xyz file names
+                 withBonds and useCache are as for analyzeFile
+                 workers is the number of processes (default: number
+                 of CPUs); 1 processes files in this process
+        returns: a generator of the result of analyzeFile for each
+                 file, in the order of files
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = [(fileName, withBonds, useCache) for fileName in files]
+    if workers == 1 or len(files) < 2:
+        yield from map(_analyzeFile, tasks)
+        return
+    # Start workers without fork, as in CellList.findBondPairsParallel
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    chunkSize = max(1, min(64, len(files) // (8 * workers)))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        yield from pool.map(_analyzeFile, tasks, chunksize=chunkSize)
+
+def writeJson(results, output):
+    """
+        Write results as a JSON list, one molecule per line, as they
+        arrive.
+    """
+    output.write("[")
+    for n, result in enumerate(results):
+        output.write(",\n" if n else "\n")
+        json.dump(result, output)
+    output.write("\n]\n")
+
+def writeCsv(results, output, withBonds=False):
+    """
+        Write statistics, or bonds if withBonds is True, as CSV rows
+        as results arrive.
+    """
+    writer = csv.writer(output)
+    writer.writerow(BOND_COLUMNS if withBonds else STATISTICS_COLUMNS)
+    for result in results:
+        if withBonds:
+            for i, j, length in result.get("bondList", []):
+                writer.writerow([result["file"], i, j, length])
+            continue
+        center = result.get("center", [None, None, None])
+        row = dict(result, centerX=center[0], centerY=center[1], centerZ=center[2])
+        writer.writerow([ "" if row.get(name) is None else row[name]
+                          for name in STATISTICS_COLUMNS ])
+
+class Totals(object):
+    """
+       Count the files, failures, atoms, and bonds of results passed
+       through count().
+    """
+    def __init__(self):
+        self.files = 0
+        self.failed = 0
+        self.atoms = 0
+        self.bonds = 0
+
+    def count(self, results):
+        for result in results:
+            self.files += 1
+            self.failed += "error" in result
+            self.atoms += result.get("atoms", 0)
+            self.bonds += result.get("bonds", 0)
+            yield result
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Find bonds of .xyz files without a window "
+                                                 "and write bonds and statistics of each molecule.")
+    parser.add_argument("paths", nargs="+", help=".xyz files, or directories of .xyz files")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="also search subdirectories of directories")
+    parser.add_argument("-f", "--format", choices=["json", "csv"], default="json",
+                        help="output format (default: json)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="output file (default: standard output)")
+    parser.add_argument("-b", "--bonds", action="store_true",
+                        help="list the bonds of each molecule (CSV: one row per bond)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="number of processes (default: number of CPUs)")
+    parser.add_argument("--cache", action="store_true",
+                        help="read and write .mqlb cache files beside the .xyz files")
+    options = parser.parse_args(arguments)
+
+    files = findFiles(options.paths, options.recursive)
+    start = time.perf_counter()
+    totals = Totals()
+    results = totals.count( analyzeFiles(files, options.bonds, options.cache, options.workers) )
+    output = sys.stdout if options.output == "-" else open(options.output, "w", newline="")
+    try:
+        if options.format == "json":
+            writeJson(results, output)
+        else:
+            writeCsv(results, output, options.bonds)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    print("%d files (%d failed), %d atoms, %d bonds in %.2f s: %.1f files/s" % (
+          totals.files, totals.failed, totals.atoms, totals.bonds, elapsed,
+          totals.files / elapsed if elapsed else 0.0), file=sys.stderr)
+    return 1 if totals.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
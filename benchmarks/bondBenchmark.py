@@ -0,0 +1,101 @@
+# File: bondBenchmark.py
+"""
+   Compare the cell-list bond search in Molecule.findBonds with
+   the original loop over every atom pair, and report the number
+   of atoms at which the cell list becomes faster. Then time the
+   search of a large system split into slabs searched by 1, 2,
+   4, ... processes, up to the number of CPUs, and report the
+   speedup over a single process.
+
+   Run from the main moleql directory:
+
+       python -m benchmarks.bondBenchmark
+"""
+# Import needed standard libraries
+import os
+import time
+import numpy as np
+
+# Need following for molecular objects
+import Atom
+import CellList
+import Elements
+import Molecule
+
+def makeAtoms(natoms, seed=0):
+    """
+       Return atomic numbers and coordinates of carbon and hydrogen
+       atoms on a jittered cubic lattice with a 1.5 Angstrom spacing,
+       which gives each atom a handful of bonded neighbors.
+    """
+    rng = np.random.default_rng(seed)
+    side = int(np.ceil(natoms ** (1/3)))
+    grid = np.stack( np.meshgrid(*[np.arange(side)]*3, indexing='ij'), axis=-1 )
+    points = grid.reshape(-1, 3)[:natoms] * 1.5
+    points = points + rng.normal(scale=0.15, size=points.shape)
+    atnums = rng.choice([1, 6], size=natoms, p=[0.4, 0.6])
+    return atnums, points
+
+def makeMolecule(natoms, seed=0):
+    """
+       Build a molecule of the atoms of makeAtoms.
+    """
+    atnums, points = makeAtoms(natoms, seed)
+    molecule = Molecule.Molecule()
+    for atnum, (x, y, z) in zip(atnums.tolist(), points.tolist()):
+        molecule.addAtom(Atom.Atom(atnum, x, y, z))
+    return molecule
+
+def bondSet(molecule):
+    return [ (a1.index, a2.index) for a1, a2 in molecule.bonds ]
+
+def timeBonds(natoms, method):
+    molecule = makeMolecule(natoms)
+    start = time.perf_counter()
+    getattr(molecule, method)()
+    return time.perf_counter() - start, molecule
+
+def main(sizes=(10, 20, 50, 100, 200, 500, 1000, 2000), largeSizes=(10000, 50000)):
+    print("%8s %12s %12s %8s %s" % ("atoms", "pairwise(s)", "cells(s)", "speedup", "same bonds"))
+    crossover = None
+    for natoms in sizes:
+        tPair, mPair = timeBonds(natoms, "_computeNonTransitionMetalBondsPairwise")
+        tCell, mCell = timeBonds(natoms, "_computeNonTransitionMetalBonds")
+        same = bondSet(mPair) == bondSet(mCell)
+        print("%8d %12.4f %12.4f %8.1f %s" % (natoms, tPair, tCell, tPair/tCell, same))
+        if crossover is None and tCell < tPair:
+            crossover = natoms
+    for natoms in largeSizes:
+        tCell, mCell = timeBonds(natoms, "_computeNonTransitionMetalBonds")
+        print("%8d %12s %12.4f" % (natoms, "-", tCell))
+    if crossover is None:
+        print("Cell list was not faster for any size tested")
+    else:
+        print("Cell list is faster from %d atoms on" % crossover)
+    print()
+    parallelScaling()
+
+def parallelScaling(natoms=1000000):
+    """
+       Time CellList.findBondPairsParallel with 1, 2, 4, ... worker
+       processes, up to the number of CPUs, on natoms atoms.
+    """
+    atnums, points = makeAtoms(natoms)
+    radii = Elements.SingleBondRadii[atnums]
+    start = time.perf_counter()
+    serial = CellList.findBondPairs(points, radii)
+    tSerial = time.perf_counter() - start
+    print("%8s %8s %12s %8s %s" % ("atoms", "workers", "time(s)", "speedup", "same bonds"))
+    print("%8d %8d %12.4f %8.1f %s" % (natoms, 1, tSerial, 1.0, True))
+    workers = 2
+    while workers <= (os.cpu_count() or 1):
+        start = time.perf_counter()
+        pairs = CellList.findBondPairsParallel(points, radii, workers=workers)
+        elapsed = time.perf_counter() - start
+        print("%8d %8d %12.4f %8.1f %s" % (natoms, workers, elapsed, tSerial/elapsed,
+              np.array_equal(pairs, serial)))
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
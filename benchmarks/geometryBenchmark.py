@@ -0,0 +1,209 @@
+# File: geometryBenchmark.py
+"""
+   Compare the NumPy tessellation of parametric surfaces used by
+   ParametricGeometry with the original implementation, which
+   evaluated the surface function once per sample (and three more
+   times per vertex for finite-difference normals) and built the
+   triangle lists in Python loops, with 6 separate vertices per
+   rectangle. Each mesh is timed at its default resolution and at a
+   finer one, the triangles from both implementations are compared,
+   and the GPU buffer sizes of the old duplicated vertices and of the
+   new shared (indexed) vertices are reported.
+
+   Only the tessellation is timed, so no OpenGL context is needed.
+   Run from the main moleql directory:
+
+       python -m benchmarks.geometryBenchmark
+"""
+# Import needed standard libraries
+import time
+import numpy as np
+from math import sin, cos, pi
+
+# Import needed local libraries
+from geometry.parametricGeometry  import tessellate
+from geometry.ellipsoidGeometry   import ellipsoidSurface
+from geometry.cylindricalGeometry import cylindricalSurface
+from geometry.hemisphereGeometry  import sphereSurface
+
+def tessellatePointwise(uStart, uEnd, uResolution,
+                        vStart, vEnd, vResolution,
+                        surfaceFunction, color1, color2):
+    """
+       Original ParametricGeometry tessellation, kept for comparison.
+       surfaceFunction takes scalar u and v and returns [x, y, z].
+    """
+    deltaU = (uEnd - uStart) / uResolution
+    deltaV = (vEnd - vStart) / vResolution
+    vHalfResolution = vResolution/2
+
+    positions = []
+    for uIndex in range(uResolution+1):
+        vArray = []
+        for vIndex in range(vResolution+1):
+            u = uStart + uIndex * deltaU
+            v = vStart + vIndex * deltaV
+            vArray.append( surfaceFunction(u,v) )
+        positions.append(vArray)
+
+    def calcNormal(P0, P1, P2):
+        v1 = np.array(P1) - np.array(P0)
+        v2 = np.array(P2) - np.array(P0)
+        orthogonal_vector = np.cross(v1, v2)
+        norm = np.linalg.norm(orthogonal_vector)
+        normal_vector = orthogonal_vector / norm if norm > 1e-6 \
+            else np.array(P0) / np.linalg.norm(P0)
+        return normal_vector
+
+    vertexNormals = []
+    for uIndex in range(uResolution+1):
+        vArray = []
+        for vIndex in range(vResolution+1):
+            u = uStart + uIndex * deltaU
+            v = vStart + vIndex * deltaV
+            h = 0.0001
+            P0 = surfaceFunction(u, v)
+            P1 = surfaceFunction(u+h, v)
+            P2 = surfaceFunction(u, v+h)
+            vArray.append( calcNormal(P0, P1, P2) )
+        vertexNormals.append(vArray)
+
+    positionData = []
+    colorData = []
+    C1, C2, C3 = [1, 0, 0], [0, 1, 0], [0, 0, 1]
+    C4, C5, C6 = [0, 1, 1], [1, 0, 1], [1, 1, 0]
+    vertexNormalData = []
+    faceNormalData = []
+    for xIndex in range(uResolution):
+        for yIndex in range(vResolution):
+            pA = positions[xIndex+0][yIndex+0]
+            pB = positions[xIndex+1][yIndex+0]
+            pD = positions[xIndex+0][yIndex+1]
+            pC = positions[xIndex+1][yIndex+1]
+            positionData += [pA.copy(), pB.copy(), pC.copy(),
+                             pA.copy(), pC.copy(), pD.copy()]
+            if color1 == None:
+                colorData += [C1,C2,C3, C4,C5,C6]
+            else:
+                if yIndex < vHalfResolution:
+                    colorData += [color1]*6
+                else:
+                    colorData += [color2]*6
+            nA = vertexNormals[xIndex+0][yIndex+0]
+            nB = vertexNormals[xIndex+1][yIndex+0]
+            nD = vertexNormals[xIndex+0][yIndex+1]
+            nC = vertexNormals[xIndex+1][yIndex+1]
+            vertexNormalData += [nA,nB,nC, nA,nC,nD]
+            fn0 = calcNormal(pA, pB, pC)
+            fn1 = calcNormal(pA, pC, pD)
+            faceNormalData += [fn0,fn0,fn0, fn1,fn1,fn1]
+
+    return positionData, colorData, vertexNormalData, faceNormalData
+
+#
+# Original scalar surface functions of each geometry
+#
+def ellipsoidPoint(width, height, depth):
+    return lambda u, v: [  width/2 * sin(u) * cos(v),
+                          height/2 * sin(v),
+                           depth/2 * cos(u) * cos(v) ]
+
+def cylindricalPoint(radiusTop, radiusBottom, height):
+    return lambda u, v: [ (v*radiusTop+(1-v)*radiusBottom)*sin(u),
+                          height*(v-0.5),
+                          (v*radiusTop+(1-v)*radiusBottom)*cos(u) ]
+
+def spherePoint(radius, position):
+    x, y, z = position
+    return lambda u, v: [ x + radius * sin(u) * cos(v),
+                          y + radius * sin(v),
+                          z + radius * cos(u) * cos(v) ]
+
+def meshes(scale):
+    """
+       Return (name, pieces) for each geometry, where pieces lists
+       the arguments of every parametric surface making up the mesh
+       as (domain, new surface function, old surface function,
+       color1, color2), at scale times the default resolution.
+    """
+    r, h = 32*scale, 16*scale
+    sphere = ( (0, 2*pi, r, -pi/2, pi/2, h),
+               ellipsoidSurface(2, 2, 2), ellipsoidPoint(2, 2, 2), None, None )
+    ellipsoid = ( (0, 2*pi, r, -pi/2, pi/2, h),
+                  ellipsoidSurface(1, 2, 3), ellipsoidPoint(1, 2, 3), None, None )
+    cylindrical = ( (0, 2*pi, r, 0, 1, 4*scale),
+                    cylindricalSurface(0.5, 1, 2), cylindricalPoint(0.5, 1, 2), None, None )
+    hemisphere = ( (0, 2*pi, r, 0, pi/2, 32*scale),
+                   sphereSurface(1, [0,0,0]), spherePoint(1, [0,0,0]), None, None )
+    c1, c2 = [0.5,0.5,1.0], [1.0,0.5,0.5]
+    bond = [ ( (0, 2*pi, r, 0, 1, 4*scale),
+               cylindricalSurface(0.3, 0.3, 1), cylindricalPoint(0.3, 0.3, 1), c1, c2 ),
+             ( (0, 2*pi, r, 0, pi/2, 4*scale),
+               sphereSurface(0.3, [0,0.5,0]), spherePoint(0.3, [0,0.5,0]), c2, c2 ),
+             ( (0, 2*pi, r, -pi/2, 0, 4*scale),
+               sphereSurface(0.3, [0,-0.5,0]), spherePoint(0.3, [0,-0.5,0]), c1, c1 ) ]
+    return [ ("SphereGeometry", [sphere]),
+             ("EllipsoidGeometry", [ellipsoid]),
+             ("CylindricalGeometry", [cylindrical]),
+             ("HemisphereGeometry", [hemisphere]),
+             ("BondGeometry", bond) ]
+
+def timeMesh(pieces, pointwise, repeats):
+    best = None
+    for n in range(repeats):
+        start = time.perf_counter()
+        result = []
+        for domain, surface, point, color1, color2 in pieces:
+            if pointwise:
+                result.append( tessellatePointwise(*domain, point, color1, color2) )
+            else:
+                result.append( tessellate(*domain, surface, color1, color2) )
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def sameData(old, new, pieces):
+    """
+       Compare the triangles drawn: positions, and colors where a
+       mesh has them, of the old vertex lists against those of the
+       new shared vertices looked up through the index list. Vertex
+       normals are not compared: the old finite-difference steps of
+       1e-4 give cross products below the 1e-6 threshold, so the old
+       code fell back to the direction from the origin, which is only
+       correct for spheres centered at the origin. The analytic
+       normals are exact. Face normals are now found on the GPU.
+    """
+    for oldPiece, newPiece, piece in zip(old, new, pieces):
+        positions, colors, normals, indices = newPiece
+        if not np.allclose(np.array(oldPiece[0], dtype=float), positions[indices], rtol=0, atol=1e-9):
+            return False
+        if piece[3] is not None and not np.array_equal(np.array(oldPiece[1], dtype=float), colors[indices]):
+            return False
+    return True
+
+def bufferBytes(pieces, pointwise):
+    """
+       Bytes uploaded to the GPU: 32-bit floats for 4 vec3 attributes
+       (position, color, vertex normal, face normal) per duplicated
+       vertex before, or 3 vec3 attributes per shared vertex plus a
+       32-bit unsigned integer per index now.
+    """
+    if pointwise:
+        return sum(4 * 3 * 4 * len(piece[0]) for piece in pieces)
+    return sum(3 * 3 * 4 * len(piece[0]) + 4 * len(piece[3]) for piece in pieces)
+
+def main(scales=(1, 4), repeats=3):
+    print("%-20s %6s %10s %12s %10s %8s %10s %10s %s" % ("mesh", "scale", "triangles",
+          "pointwise(s)", "numpy(s)", "speedup", "old bytes", "new bytes", "same data"))
+    for scale in scales:
+        for name, pieces in meshes(scale):
+            tOld, old = timeMesh(pieces, True, repeats)
+            tNew, new = timeMesh(pieces, False, repeats)
+            triangles = sum(len(piece[3]) for piece in new) // 3
+            print("%-20s %6d %10d %12.4f %10.4f %8.1f %10d %10d %s" % (name, scale, triangles,
+                  tOld, tNew, tOld/tNew, bufferBytes(old, True), bufferBytes(new, False),
+                  sameData(old, new, pieces)))
+
+
+if __name__ == '__main__':
+    main()
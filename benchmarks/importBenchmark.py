@@ -0,0 +1,94 @@
+# File: importBenchmark.py
+"""
+   Time the import of each module in a fresh Python interpreter and
+   check the chemistry core against an import-time budget: the core
+   modules (atoms, molecules, elements, bond search, file reading,
+   and processing) must import within CORE_BUDGET seconds and must
+   not load PySide6 or PyOpenGL. The window and structure models are
+   timed too, if PySide6 is installed; the structure models are
+   imported by the window only when first selected.
+
+   The element tables of the core are also checked against each
+   other (Elements.checkTables), and any disagreement is reported
+   and fails the run, like an import over budget.
+
+   Each module is imported REPEATS times, each in a new interpreter,
+   and the fastest time is reported.
+
+   Run from the main moleql directory:
+
+       python -m benchmarks.importBenchmark
+"""
+# Import needed standard libraries
+import json
+import subprocess
+import sys
+
+# Modules which must import quickly without Qt or OpenGL
+CORE_MODULES = ["Elements", "Atom", "CellList", "Molecule", "xyzReader",
+                "mqlbFile", "processMolecule", "batchAnalysis"]
+
+# Modules of the window and the structure models
+GUI_MODULES = ["mainWindow", "stickModel", "ballStickModel", "cpkModel"]
+
+# Largest time (s) to import all core modules, numpy included
+CORE_BUDGET = 0.3
+
+REPEATS = 5
+
+# Run in a new interpreter: import modules, report time and GUI modules loaded
+_probe = """
+import json, sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+elapsed = time.perf_counter() - start
+loaded = sorted(name for name in sys.modules
+                if name.split(".")[0] in ("PySide6", "OpenGL"))
+print(json.dumps([elapsed, loaded[:3], len(loaded)]))
+"""
+
+def timeImport(modules, repeats=REPEATS):
+    """
+       Return (fastest time, some GUI modules loaded, number of GUI
+       modules loaded) of importing modules in a new interpreter, or
+       None if they could not be imported.
+    """
+    best = None
+    for n in range(repeats):
+        run = subprocess.run([sys.executable, "-c", _probe, *modules],
+                             capture_output=True, text=True)
+        if run.returncode != 0:
+            return None
+        elapsed, loaded, count = json.loads(run.stdout)
+        if best is None or elapsed < best[0]:
+            best = (elapsed, loaded, count)
+    return best
+
+def main():
+    print("%-18s %10s %s" % ("module", "import(s)", "Qt/GL modules loaded"))
+    for name in CORE_MODULES + GUI_MODULES:
+        result = timeImport([name])
+        if result is None:
+            print("%-18s %10s %s" % (name, "-", "cannot be imported (is PySide6 installed?)"))
+            continue
+        elapsed, loaded, count = result
+        print("%-18s %10.4f %d %s" % (name, elapsed, count, " ".join(loaded)))
+
+    elapsed, loaded, count = timeImport(CORE_MODULES)
+    within = elapsed <= CORE_BUDGET and count == 0
+    print()
+    print("core modules: %.4f s (budget %.2f s), %d Qt/GL modules loaded: %s" % (
+          elapsed, CORE_BUDGET, count, "within budget" if within else "OVER BUDGET"))
+
+    # Imported here, after timing, so the import is not counted above
+    import Elements
+    problems = Elements.checkTables()
+    print("element tables: %s" % ("consistent" if not problems else "%d PROBLEMS" % len(problems)))
+    for problem in problems:
+        print("    " + problem)
+    return 0 if within and not problems else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
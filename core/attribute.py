@@ -10,14 +10,29 @@ import numpy as np
 
 class Attribute(object):
 
-    def __init__(self, dataType, data):
+    def __init__(self, dataType, data, divisor=0, usage=GL_STATIC_DRAW):
         # Type of elements in data array:
-        #    int | float | vec2 | vec3 | vec4
+        #    int | float | vec2 | vec3 | vec4 | index
+        #    (index == vertex indices of an element buffer)
         self.dataType = dataType
 
         # Array of data to be stored in buffer
         self.data = data
 
+        #
+        # Number of instances drawn before advancing to next
+        #   element of data: 0 == per-vertex data,
+        #   1 == per-instance data (instanced rendering)
+        #
+        self.divisor = divisor
+
+        #
+        # Expected use of buffer:
+        #   • GL_STATIC_DRAW == contents uploaded once
+        #   • GL_DYNAMIC_DRAW == contents changed often, with updateData
+        #
+        self.usage = usage
+
         # Reference of available buffer from GPU
         self.bufferRef = glGenBuffers(1) # return 1 buffer reference
 
@@ -29,18 +44,48 @@ class Attribute(object):
            Upload data to a GPU buffer.
         """
         # Convert data to numpy array format ... convert 
-        #   numbers to 32-bit floats
-        data = np.array(self.data).astype(np.float32)
+        #   numbers to 32-bit floats, or vertex indices
+        #   to 32-bit unsigned integers
+        if self.dataType == "index":
+            data = np.asarray(self.data, dtype=np.uint32)
+        else:
+            data = np.array(self.data).astype(np.float32)
 
+        #
         # Select buffer used by following functions
         #   • GL_ARRAY_BUFFER == for vertex attributes
+        #   Index data is also uploaded through GL_ARRAY_BUFFER, so
+        #   that no vertex array object is changed; the buffer is
+        #   bound as GL_ELEMENT_ARRAY_BUFFER later, in Mesh.
+        #
         glBindBuffer(GL_ARRAY_BUFFER, self.bufferRef)
 
         # Store data in currently bound buffer
-        #   • GL_STATIC_DRAW == buffer contents modified once
+        #   • self.usage == how often buffer contents are modified
         #   • data.ravel() == a numpy function to return a 
         #                     contiguous flattened array
-        glBufferData(GL_ARRAY_BUFFER, data.ravel(), GL_STATIC_DRAW)
+        glBufferData(GL_ARRAY_BUFFER, data.ravel(), self.usage)
+
+    def updateData(self, start, stop):
+        """
+           Upload elements start:stop of data to the same place in the
+           GPU buffer, after changing them in place. The buffer keeps
+           its size; call uploadData after replacing data with a
+           longer array.
+        """
+        if stop <= start:
+            return
+        data = np.ascontiguousarray(self.data[start:stop], dtype=np.float32)
+        rowBytes = data.nbytes // (stop - start)
+        glBindBuffer(GL_ARRAY_BUFFER, self.bufferRef)
+        glBufferSubData(GL_ARRAY_BUFFER, start * rowBytes, data.nbytes, data.ravel())
+
+    def associateIndices(self):
+        """
+           Use this buffer as element (index) buffer of the
+           currently bound vertex array object.
+        """
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.bufferRef)
 
     def associateVariable(self, programRef, variableName):
         """
@@ -75,3 +120,6 @@ class Attribute(object):
         # Indicate that data will be streamed to this variable
         glEnableVertexAttribArray(variableRef)
 
+        # Per-instance data advances once per instance, not per vertex
+        glVertexAttribDivisor(variableRef, self.divisor)
+
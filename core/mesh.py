@@ -30,6 +30,9 @@ class Mesh(Object3D):
         glBindVertexArray(self.vaoRef)
         for variableName, attributeObject in geometry.attributes.items():
             attributeObject.associateVariable(material.programRef, variableName)
+        # Indexed geometry: element buffer is stored in vertex array object
+        if geometry.indices is not None:
+            geometry.indices.associateIndices()
 
         # Unbind this vertex array object
         glBindVertexArray(0)
@@ -0,0 +1,86 @@
+# File: pickBuffer.py
+"""
+   Offscreen framebuffer for picking: a scene of PickMaterial meshes
+   is drawn into a 32-bit integer color attachment (with its own
+   depth buffer), so each pixel holds the ID of the nearest object
+   drawn there, and the pixel under the mouse is read back.
+
+   Only that pixel is drawn (by the scissor test), and a pick is
+   made only when asked for, not every frame, so picking costs one
+   draw of the vertices and a single pixel, whatever the number of
+   atoms. The buffer is drawn by Renderer like any other scene.
+
+   Usage, while the OpenGL context is current (e.g., after
+   makeCurrent() in a mouse event):
+
+       pickBuffer = PickBuffer()
+       ...
+       pickID = pickBuffer.pick(renderer, pickScene, camera, x, y, width, height)
+"""
+import numpy as np
+from OpenGL.GL import *
+
+class PickBuffer(object):
+
+    def __init__(self):
+        self.width = 0
+        self.height = 0
+        self.framebufferRef = glGenFramebuffers(1)
+        self.colorRef = glGenRenderbuffers(1)
+        self.depthRef = glGenRenderbuffers(1)
+
+    def resize(self, width, height):
+        """
+           (Re)allocate the attachments for width x height pixels,
+           if their size has changed.
+        """
+        width, height = max(int(width), 1), max(int(height), 1)
+        if (width, height) == (self.width, self.height):
+            return
+        previous = glGetIntegerv(GL_FRAMEBUFFER_BINDING)
+
+        glBindRenderbuffer(GL_RENDERBUFFER, self.colorRef)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_R32I, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depthRef)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebufferRef)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0,
+                                  GL_RENDERBUFFER, self.colorRef)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT,
+                                  GL_RENDERBUFFER, self.depthRef)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindFramebuffer(GL_FRAMEBUFFER, previous)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise Exception("Pick framebuffer is incomplete: status " + str(status))
+        self.width = width
+        self.height = height
+
+    def pick(self, renderer, scene, camera, x, y, width, height):
+        """
+           Draw scene and return the ID drawn at pixel (x, y), counted
+           from the bottom left corner of a width x height view, or
+           0 if nothing is drawn there.
+        """
+        if not (0 <= x < width and 0 <= y < height):
+            return 0
+        self.resize(width, height)
+        previous = glGetIntegerv(GL_FRAMEBUFFER_BINDING)
+        viewport = glGetIntegerv(GL_VIEWPORT)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebufferRef)
+        glViewport(0, 0, self.width, self.height)
+        glEnable(GL_SCISSOR_TEST)
+        glScissor(int(x), int(y), 1, 1)
+        glClearBufferiv(GL_COLOR, 0, np.zeros(4, dtype=np.int32))
+        glClearBufferfv(GL_DEPTH, 0, np.ones(1, dtype=np.float32))
+        renderer.render(scene, camera, clearColor=False, clearDepth=False)
+
+        pixel = np.zeros(1, dtype=np.int32)
+        glReadPixels(int(x), int(y), 1, 1, GL_RED_INTEGER, GL_INT, pixel)
+
+        glDisable(GL_SCISSOR_TEST)
+        glBindFramebuffer(GL_FRAMEBUFFER, previous)
+        glViewport(*viewport)
+        return int(pixel[0])
@@ -99,6 +99,22 @@ class Renderer(object):
            mesh.material.updateRenderSettings()
 
            # Specify correct draw mode and number of vertices to be rendered
-           glDrawArrays( mesh.material.settings["drawStyle"], 0,
-                         mesh.geometry.vertexCount )
+           drawStyle = mesh.material.settings["drawStyle"]
+           geometry = mesh.geometry
+           if geometry.indices is None:
+               if geometry.instanceCount is None:
+                   glDrawArrays( drawStyle, 0, geometry.vertexCount )
+               else:
+                   # Draw every instance of geometry in one call
+                   glDrawArraysInstanced( drawStyle, 0, geometry.vertexCount,
+                                          geometry.instanceCount )
+           else:
+               # Vertices are taken from element (index) buffer
+               if geometry.instanceCount is None:
+                   glDrawElements( drawStyle, geometry.indexCount,
+                                   GL_UNSIGNED_INT, None )
+               else:
+                   glDrawElementsInstanced( drawStyle, geometry.indexCount,
+                                            GL_UNSIGNED_INT, None,
+                                            geometry.instanceCount )
 
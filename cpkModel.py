@@ -5,7 +5,6 @@
 """
 # Import needed standard libraries
 import sys
-import numpy as np
 
 # Need following for molecular objects
 import Elements
@@ -22,21 +21,37 @@ from core.group    import Group
 from core.camera   import Camera
 from core.matrix   import Matrix
 from core.mesh     import Mesh
+from core.pickBuffer import PickBuffer
 from geometry.sphereGeometry    import SphereGeometry
+from geometry.billboardGeometry import BillboardGeometry
+from geometry.geometryCache     import geometryCache
 from light.ambientLight         import AmbientLight
 from light.directionalLight     import DirectionalLight
-from material.phongMaterial     import PhongMaterial
+from material.instancedPhongMaterial import InstancedPhongMaterial
+from material.impostorMaterial       import ImpostorMaterial
+from material.pickMaterial           import PickMaterial, pickedAtom
 
 #
 # Establish this structure model as a QOpenGLWidget with 
 #   pre-established functions/methods.
 #
 class CpkModel(GLBase):
-    def __init__(self, parent, molecule, label):
+    def __init__(self, parent, molecule, label, mode="mesh"):
+        """
+           mode selects how spheres are drawn:
+             • "mesh"     == instanced triangle mesh of a sphere
+             • "impostor" == instanced camera-facing squares on which
+                             exact spheres are ray-cast; far fewer
+                             triangles for very large molecules
+        """
         super().__init__(parent)
 
+        if mode not in ("mesh", "impostor"):
+            raise ValueError("Unknown space-filling mode: " + str(mode))
+
         self.parent = parent      # main window for graphics display
         self.molecule = molecule  # molecule object for display
+        self.mode = mode          # sphere drawing mode
         self.setFocus()           # give keyboard input focus to this widget
         #
         # Use a label to keep track of mouse coordinates
@@ -62,6 +77,9 @@ class CpkModel(GLBase):
         self.theta = 0 # y-axis rotation angle
         self.chi = 0   # z-axis rotation angle
 
+        # Pick buffer, created with the scene in initializeGL
+        self.pickBuffer = None
+
     def initializeGL(self):
         super().initializeGL()
 
@@ -79,63 +97,101 @@ class CpkModel(GLBase):
         self.scene.add( directional )
 
         # Use Phong lighting model for spheres ??? more comments ???
-        phongMat = PhongMaterial( properties={ "useVertexColors" : True,
-                                               "shininess" : 64,
-                                               "specularStrength" : 1.5} )
-
-        # Draw each atom of molecule as a shaded sphere
-        for atom in self.molecule.atoms:
-            atom_coord = atom.coordinates
-            #
-            # Get atom van der Waals radius and adjust 
-            #   with molecule's scale factor.
-            #
-            vdw_radius = Elements.VdwRadius[atom.atomicNumber] * self.molecule.scaler
-            rgb = (np.array(Elements.AtomColor[atom.atomicNumber]))/255
-            # Convert numpy array, rgb, to Python list
-            color = rgb.tolist()
-            #
-            # Draw a single-color sphere/ball with radius and centered at the origin
-            #
-            sphereGeometry = SphereGeometry(radius=vdw_radius, color1=color, color2=color)
-            #
-            # Apply shading model to sphere/ball
-            # 
-            sphereObject = Mesh(sphereGeometry, phongMat)
-            #
-            # Translate center (0,0,0) of sphere/ball to actual atom coordinates
-            #
-            sphereObject.setPosition(atom_coord)
-            self.spheres.add(sphereObject)
+        phongProperties = { "useVertexColors" : True,
+                            "shininess" : 64,
+                            "specularStrength" : 1.5 }
+        if self.mode == "impostor":
+            phongMat = ImpostorMaterial( properties=phongProperties )
+        else:
+            phongMat = InstancedPhongMaterial( properties=phongProperties )
+
+        #
+        # Draw all atoms of molecule as shaded spheres with a single
+        #   instanced draw call: one unit sphere/ball is stored on the
+        #   GPU, and each atom supplies its position, van der Waals 
+        #   radius, and color. The molecule's scale factor is applied
+        #   through the model's transform. In impostor mode the unit
+        #   sphere is replaced by a single square per atom.
+        #
+        atomicNumbers = self.molecule.atomicNumbers
+        vdwRadii = Elements.VdwRadii[atomicNumbers]
+        colors = Elements.AtomColors[atomicNumbers]/255
+        if self.mode == "impostor":
+            sphereGeometry = geometryCache.get(self.context().shareGroup(), BillboardGeometry)
+        else:
+            sphereGeometry = geometryCache.get(self.context().shareGroup(), SphereGeometry, radius=1)
+        sphereGeometry.addInstanceAttribute("vec3", "instancePosition", self.molecule.coordinates.copy())
+        sphereGeometry.addInstanceAttribute("float", "instanceRadius", vdwRadii)
+        sphereGeometry.addInstanceAttribute("vec3", "instanceColor", colors)
+        sphereGeometry.countInstances()
+        #
+        # Apply shading model to spheres/balls
+        # 
+        sphereObject = Mesh(sphereGeometry, phongMat)
+        self.spheres.add(sphereObject)
 
         self.scene.add(self.spheres)
 
+        #
+        # Draw the same spheres with atom IDs in place of colors, to
+        #   pick the atom under the mouse (see pickAtom)
+        #
+        if self.mode == "impostor":
+            pickMat = PickMaterial(ImpostorMaterial.vertexShaderCode,
+                                   fragmentShaderCode=ImpostorMaterial.pickFragmentShaderCode)
+        else:
+            pickMat = PickMaterial(InstancedPhongMaterial.vertexShaderCode)
+        self.pickScene = Scene()
+        self.pickGroup = Group()
+        self.pickGroup.add( Mesh(sphereGeometry, pickMat) )
+        self.pickScene.add(self.pickGroup)
+        self.pickBuffer = PickBuffer()
+
     def paintGL(self):
         super().paintGL()
 
         self.setFocus()
-        localCoord = False
 
-        # Rotation actions upon mouse presses and movements
+        #
+        # Rotation actions upon mouse presses and movements. Only the
+        #   molecule's transform changes; atom coordinates are untouched.
+        #
         if self.xy_rotation:
-            self.spheres.rotateX( self.phi, localCoord )
-            self.spheres.rotateY( self.theta, localCoord )
             self.molecule.rotateXYZ(self.phi, self.theta, 0)
         elif self.z_rotation:
-            self.spheres.rotateZ( self.chi, localCoord )
             self.molecule.rotateXYZ(0, 0, self.chi)
        
         # Scaling actions upon key presses
         if self.input.isKeyDown(Qt.Key_L):
-            self.spheres.scale( 1.1, localCoord )
             self.molecule.scaleXYZ(1.1)
         if self.input.isKeyDown(Qt.Key_S):
-            self.spheres.scale( 0.9, localCoord )
             self.molecule.scaleXYZ(0.9)
 
+        # Orient and scale the whole model with the molecule's transform
+        self.spheres.transform = self.molecule.transform.copy()
+
         # Render molecular structure
         self.renderer.render( self.scene, self.camera )
 
+    def pickAtom(self, x, y):
+        """
+           Return the index of the atom drawn at widget position (x, y),
+           or None if there is none. The spheres are drawn once, with
+           atom IDs for colors, into the pick buffer, only at (x, y).
+        """
+        if self.pickBuffer is None:
+            return None
+        ratio = self.devicePixelRatio()
+        width = int(self.width() * ratio)
+        height = int(self.height() * ratio)
+        self.makeCurrent()
+        self.pickGroup.transform = self.molecule.transform.copy()
+        pickID = self.pickBuffer.pick(self.renderer, self.pickScene, self.camera,
+                                      int(x * ratio), height - 1 - int(y * ratio),
+                                      width, height)
+        self.doneCurrent()
+        return pickedAtom(pickID)
+
     def mousePressEvent(self, event):
         """ 
            Left mouse press initiates xy rotation.
@@ -185,10 +241,19 @@ class CpkModel(GLBase):
         self.prev_x = curr_x
         self.prev_y = curr_y
 
-        # Pass mouse_pos coords to mouse_track_label to
-        #   display in status bar.
+        #
+        # Show the atom under the mouse in the status bar, or the
+        #   mouse coordinates if there is none. Atoms are only picked
+        #   while the molecule is not being rotated.
+        #
+        atom = None
+        if not (self.xy_rotation or self.z_rotation):
+            atom = self.pickAtom(curr_x, curr_y)
         self.mouse_track_label.setVisible(True)
-        sb_text = f"""<p>Mouse Coordinates: ({curr_x},
+        if atom is not None:
+            sb_text = f"""<p>{self.molecule.atomCoordinateString(self.molecule.atoms[atom])}<p>"""
+        else:
+            sb_text = f"""<p>Mouse Coordinates: ({curr_x},
                          {curr_y})<p>"""
         self.mouse_track_label.setText(sb_text)
         self.parent.status_bar.addWidget(self.mouse_track_label)
@@ -0,0 +1,24 @@
+# File: billboardGeometry.py
+"""
+   A billboard is a flat square, centered at the origin, with
+   corners at (±1, ±1, 0). It is drawn as 2 triangles and is
+   meant to be oriented and sized in a vertex shader, e.g., to
+   face the camera and cover the silhouette of a sphere which is
+   then ray-cast in the fragment shader (see ImpostorMaterial).
+"""
+from geometry.geometry import Geometry
+
+class BillboardGeometry(Geometry):
+
+    def __init__(self):
+        super().__init__()
+
+        P0 = [-1, -1, 0]
+        P1 = [ 1, -1, 0]
+        P2 = [-1,  1, 0]
+        P3 = [ 1,  1, 0]
+        positionData = [ P0, P1, P3, P0, P3, P2 ]
+
+        # Add attribute and count vertices
+        self.addAttribute("vec3", "vertexPosition", positionData)
+        self.countVertices()
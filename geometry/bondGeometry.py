@@ -9,8 +9,9 @@
 """
 from geometry.parametricGeometry import ParametricGeometry
 from geometry.hemisphereGeometry import HemisphereGeometry
+from geometry.cylindricalGeometry import cylindricalSurface
 from core.matrix import Matrix
-from math import sin, cos, pi
+from math import pi
 
 class BondGeometry(ParametricGeometry):
 
@@ -18,15 +19,10 @@ class BondGeometry(ParametricGeometry):
                  heightSegments=4, color1=[0.5,0.5,1.0], 
                  color2=[1.0,0.5,0.5]):
 
-        # Parametric function
-        def S(u, v):
-            return [ (v*radius+(1-v)*radius)*sin(u), 
-                     height*(v-0.5),
-                     (v*radius+(1-v)*radius)*cos(u) ]
-
         super().__init__( 0, 2*pi, radialSegments, 
                           0, 1, heightSegments, 
-                          S, color1, color2 )
+                          cylindricalSurface(radius, radius, height),
+                          color1, color2 )
 
         #
         # Put rounded cap on top of bond
@@ -0,0 +1,188 @@
+# File: bondInstances.py
+"""
+   Per-instance attributes of the bonds of a molecule, drawn with a
+   shared bond geometry in one instanced draw call, kept in buffers
+   which are changed in place as the molecule moves:
+
+     • instanceStart, instanceEnd: positions of the 2 bonded atoms
+     • instanceRadius: radius of the bond
+     • instanceColor1, instanceColor2: colors of the 2 atoms
+
+   Bonds made and broken, e.g., by Molecule.updateBonds while a
+   trajectory is played, only change their own rows: a removed bond
+   is replaced by the last bond, and new bonds are appended. The
+   buffers have room for more bonds than are drawn, and grow by
+   doubling, so the geometry and its mesh are never rebuilt.
+
+   Changes are made to the arrays at once, and uploaded to the GPU
+   by upload(), which needs the OpenGL context to be current (e.g.,
+   in paintGL).
+
+   Usage:
+
+       bonds = BondInstances(bondGeometry, molecule, colors, radius=0.1)
+       ...
+       added, removed = molecule.updateBonds()
+       bonds.setCoordinates(molecule.coordinates)
+       bonds.applyChanges(added, removed, molecule.coordinates)
+       ...
+       bonds.upload()      # in paintGL
+"""
+import numpy as np
+
+class BondInstances(object):
+
+    def __init__(self, geometry, molecule, colors, radius=0.1):
+        """
+           geometry == shared bond geometry to add instance attributes to
+           molecule == molecule whose bonds are drawn
+           colors == (N,3) array of the color of each atom
+           radius == radius of every bond
+        """
+        self.geometry = geometry
+        self.colors = np.asarray(colors, dtype=float)
+        self.radius = radius
+
+        # Atom indices of bond drawn by each row
+        pairs = molecule.bondIndices
+        self.count = len(pairs)
+        self.pairs = np.zeros( (max(self.count, 16), 2), dtype=np.int64 )
+        self.pairs[:self.count] = pairs
+
+        capacity = len(self.pairs)
+        self.start = np.zeros( (capacity, 3) )
+        self.end = np.zeros( (capacity, 3) )
+        self.radii = np.full(capacity, float(radius))
+        self.color1 = np.zeros( (capacity, 3) )
+        self.color2 = np.zeros( (capacity, 3) )
+        self._fill(molecule.coordinates, 0, self.count)
+
+        geometry.addInstanceAttribute("vec3", "instanceStart", self.start, dynamic=True)
+        geometry.addInstanceAttribute("vec3", "instanceEnd", self.end, dynamic=True)
+        geometry.addInstanceAttribute("float", "instanceRadius", self.radii, dynamic=True)
+        geometry.addInstanceAttribute("vec3", "instanceColor1", self.color1, dynamic=True)
+        geometry.addInstanceAttribute("vec3", "instanceColor2", self.color2, dynamic=True)
+        geometry.instanceCount = self.count
+
+        #
+        # Rows changed since last upload (start, stop), whether every
+        #   bond has moved, and whether buffers have grown and must be
+        #   uploaded whole
+        #
+        self.dirty = None
+        self.moved = False
+        self.grown = False
+
+    def _fill(self, coordinates, start, stop):
+        """
+           Compute the instance data of rows start:stop from their pairs.
+        """
+        pairs = self.pairs[start:stop]
+        self.start[start:stop] = coordinates[pairs[:, 0]]
+        self.end[start:stop] = coordinates[pairs[:, 1]]
+        self.color1[start:stop] = self.colors[pairs[:, 0]]
+        self.color2[start:stop] = self.colors[pairs[:, 1]]
+
+    def _markDirty(self, start, stop):
+        if stop <= start:
+            return
+        if self.dirty is None:
+            self.dirty = (start, stop)
+        else:
+            self.dirty = ( min(self.dirty[0], start), max(self.dirty[1], stop) )
+
+    def _keys(self, pairs):
+        """
+           One integer per pair, the same for (i, j) and (j, i).
+        """
+        pairs = np.sort(pairs, axis=1)
+        return pairs[:, 0] * len(self.colors) + pairs[:, 1]
+
+    def applyChanges(self, added, removed, coordinates):
+        """
+           Stop drawing the bonds in removed and start drawing those
+           in added; both are (M,2) arrays of atom indices. New bonds
+           are placed at the given (N,3) atom coordinates.
+        """
+        added = np.asarray(added, dtype=np.int64).reshape(-1, 2)
+        removed = np.asarray(removed, dtype=np.int64).reshape(-1, 2)
+        arrays = (self.pairs, self.start, self.end, self.radii, self.color1, self.color2)
+
+        #
+        # Fill the row of each removed bond with one of the last rows,
+        #   so the bonds drawn stay in rows 0:count
+        #
+        if len(removed):
+            rows = np.flatnonzero( np.isin(self._keys(self.pairs[:self.count]),
+                                           self._keys(removed)) )
+            count = self.count - len(rows)
+            holes = rows[rows < count]
+            tail = np.arange(count, self.count)
+            movers = tail[~np.isin(tail, rows)]
+            for array in arrays:
+                array[holes] = array[movers]
+            if len(holes):
+                self._markDirty(holes.min(), holes.max() + 1)
+            self.count = count
+
+        # Append new bonds which are not already drawn
+        if len(added):
+            keys = self._keys(added)
+            added = added[~np.isin(keys, self._keys(self.pairs[:self.count]))]
+            added = added[np.unique(self._keys(added), return_index=True)[1]]
+        if len(added):
+            stop = self.count + len(added)
+            if stop > len(self.pairs):
+                self._grow(stop)
+            self.pairs[self.count:stop] = added
+            self.radii[self.count:stop] = self.radius
+            self._fill(coordinates, self.count, stop)
+            self._markDirty(self.count, stop)
+            self.count = stop
+
+    def _grow(self, needed):
+        """
+           Enlarge arrays to hold at least needed rows, by doubling.
+        """
+        capacity = max(2 * len(self.pairs), needed)
+        for name in ("pairs", "start", "end", "radii", "color1", "color2"):
+            array = getattr(self, name)
+            grown = np.zeros( (capacity,) + array.shape[1:], dtype=array.dtype )
+            grown[:self.count] = array[:self.count]
+            setattr(self, name, grown)
+        self.grown = True
+
+    def setCoordinates(self, coordinates):
+        """
+           Move the ends of every bond drawn to new atom coordinates.
+        """
+        pairs = self.pairs[:self.count]
+        self.start[:self.count] = coordinates[pairs[:, 0]]
+        self.end[:self.count] = coordinates[pairs[:, 1]]
+        self.moved = True
+
+    def upload(self):
+        """
+           Upload changed rows to the GPU and draw count instances.
+           Must be called while the OpenGL context is current.
+        """
+        attributes = self.geometry.attributes
+        arrays = { "instanceStart": self.start, "instanceEnd": self.end,
+                   "instanceRadius": self.radii, "instanceColor1": self.color1,
+                   "instanceColor2": self.color2 }
+        if self.grown:
+            for name, array in arrays.items():
+                attributes[name].data = array
+                attributes[name].uploadData()
+        else:
+            if self.moved:
+                attributes["instanceStart"].updateData(0, self.count)
+                attributes["instanceEnd"].updateData(0, self.count)
+            if self.dirty is not None:
+                start, stop = self.dirty
+                for name in arrays:
+                    attributes[name].updateData(start, stop)
+        self.grown = False
+        self.dirty = None
+        self.moved = False
+        self.geometry.instanceCount = self.count
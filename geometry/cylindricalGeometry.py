@@ -10,7 +10,30 @@
 from geometry.parametricGeometry import ParametricGeometry
 from geometry.polygonGeometry import PolygonGeometry
 from core.matrix import Matrix
-from math import sin, cos, pi
+import numpy as np
+from math import pi
+
+def cylindricalSurface(radiusTop, radiusBottom, height):
+    """
+       Return parametric function, S(u,v), of a cylindrical surface
+       whose radius changes linearly from radiusBottom (v = 0) to
+       radiusTop (v = 1). The normal vector leans along the y-axis
+       by the slope of the side, (radiusTop - radiusBottom)/height.
+    """
+    slope = radiusTop - radiusBottom
+
+    def S(u, v):
+        radius = v*radiusTop + (1-v)*radiusBottom
+        position = np.stack( ( radius * np.sin(u),
+                               height * (v-0.5),
+                               radius * np.cos(u) ), axis=-1 )
+        normal = np.stack( ( height * np.sin(u),
+                             np.full_like(u, -slope),
+                             height * np.cos(u) ), axis=-1 )
+        normal /= np.hypot(height, slope)
+        return position, normal
+
+    return S
 
 class CylindricalGeometry(ParametricGeometry):
 
@@ -19,15 +42,10 @@ class CylindricalGeometry(ParametricGeometry):
                        closedTop=True, closedBottom=True,
                        color1=None, color2=None):
 
-        # Parametric function
-        def S(u, v):
-            return [ (v*radiusTop+(1-v)*radiusBottom)*sin(u), 
-                     height*(v-0.5),
-                     (v*radiusTop+(1-v)*radiusBottom)*cos(u) ]
-
         super().__init__( 0, 2*pi, radialSegments,
                           0, 1, heightSegments, 
-                          S, color1, color2 )
+                          cylindricalSurface(radiusTop, radiusBottom, height),
+                          color1, color2 )
 
         #
         # Handle case(s) in which the top and/or bottom
@@ -10,7 +10,29 @@
    the y-axis.
 """
 from geometry.parametricGeometry import ParametricGeometry
-from math import sin, cos, pi
+import numpy as np
+from math import pi
+
+def ellipsoidSurface(width, height, depth):
+    """
+       Return parametric function, S(u,v), of an ellipsoid. The
+       normal vector at a point, p, is proportional to
+       ( p.x/a**2, p.y/b**2, p.z/c**2 ), where a, b, & c are the
+       semi-axes.
+    """
+    a, b, c = width/2, height/2, depth/2
+
+    def S(u, v):
+        position = np.stack( (  a * np.sin(u) * np.cos(v),
+                                b * np.sin(v),
+                                c * np.cos(u) * np.cos(v) ), axis=-1 )
+        normal = np.stack( ( np.sin(u) * np.cos(v) / a,
+                             np.sin(v) / b,
+                             np.cos(u) * np.cos(v) / c ), axis=-1 )
+        normal /= np.linalg.norm(normal, axis=-1, keepdims=True)
+        return position, normal
+
+    return S
 
 class EllipsoidGeometry(ParametricGeometry):
 
@@ -18,13 +40,8 @@ class EllipsoidGeometry(ParametricGeometry):
                        radiusSegments=32, heightSegments=16,
                        color1=None, color2=None):
 
-        # Parametric function
-        def S(u, v):
-            return [  width/2 * sin(u) * cos(v),
-                     height/2 * sin(v),
-                      depth/2 * cos(u) * cos(v) ]
-
         super().__init__( 0, 2*pi, radiusSegments,
                           -pi/2, pi/2, heightSegments, 
-                          S, color1, color2 )
+                          ellipsoidSurface(width, height, depth),
+                          color1, color2 )
 
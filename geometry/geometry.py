@@ -4,6 +4,7 @@
    number of vertices.
 """
 from core.attribute import Attribute
+from OpenGL.GL import GL_STATIC_DRAW, GL_DYNAMIC_DRAW
 import numpy as np
 
 class Geometry(object):
@@ -20,9 +21,52 @@ class Geometry(object):
         # Number of vertices
         self.vertexCount = None
 
+        # Number of instances (None == geometry is not instanced)
+        self.instanceCount = None
+
+        #
+        # Vertex indices, 3 per triangle, as an Attribute of type
+        #   "index" (None == each triangle has its own 3 vertices)
+        #
+        self.indices = None
+        self.indexCount = None
+
     def addAttribute(self, dataType, variableName, data):
         self.attributes[variableName] = Attribute(dataType, data)
 
+    def addInstanceAttribute(self, dataType, variableName, data, dynamic=False):
+        """
+           Per-instance attributes hold one element per copy of this
+           geometry, e.g., the position of each atom. All copies are
+           drawn with a single instanced draw call. Data which will be
+           changed often (see Attribute.updateData) is dynamic.
+        """
+        usage = GL_DYNAMIC_DRAW if dynamic else GL_STATIC_DRAW
+        self.attributes[variableName] = Attribute(dataType, data, divisor=1, usage=usage)
+
+    def setIndices(self, data):
+        """
+           Triangles are drawn from vertices listed, by number, in
+           data, so vertices may be shared between triangles.
+        """
+        self.indices = Attribute("index", data)
+        self.indexCount = len(self.indices.data)
+
+    def sharedCopy(self):
+        """
+           Return a new Geometry using the same vertex buffers (and
+           index buffer) as this one. Attributes added to the copy,
+           e.g., per-instance attributes, do not affect this geometry.
+        """
+        copy = Geometry()
+        copy.attributes = { name: attributeObject
+                            for name, attributeObject in self.attributes.items()
+                            if attributeObject.divisor == 0 }
+        copy.vertexCount = self.vertexCount
+        copy.indices = self.indices
+        copy.indexCount = self.indexCount
+        return copy
+
     def countVertices(self):
         """
            Number vertices may be calculated from length of any
@@ -31,20 +75,25 @@ class Geometry(object):
         attrib = list( self.attributes.values() )[0]
         self.vertexCount = len(attrib.data)
 
+    def countInstances(self):
+        """
+           Number of instances may be calculated from length of any
+           per-instance Attribute object's array of data.
+        """
+        for attrib in self.attributes.values():
+            if attrib.divisor > 0:
+                self.instanceCount = len(attrib.data)
+                return
+
     def applyMatrixLine(self, matrix, variableName="vertexPosition"):
         """ 
            Transform data in an attribute using a matrix.
         """ 
-        oldPositionData = self.attributes[variableName].data
-        newPositionData = []
-
-        for oldPos in oldPositionData:
-            newPos = oldPos.copy()         # avoid changing list reference
-            newPos.append(1)               # add homogeneous 4th coordinate
-            newPos = matrix @ newPos       # multiply by matrix
-            newPos = list( newPos[0:3] )   # remove homogeneous coord
-            newPositionData.append(newPos) # add to new data list
+        positionData = np.asarray(self.attributes[variableName].data, dtype=float)
 
+        # Multiply by matrix with homogeneous 4th coordinate of 1
+        matrix = np.asarray(matrix)
+        newPositionData = positionData @ matrix[0:3, 0:3].T + matrix[0:3, 3]
         self.attributes[variableName].data = newPositionData
 
         # New data must be uploaded
@@ -53,45 +102,28 @@ class Geometry(object):
     def applyMatrix(self, matrix, variableName="vertexPosition"):
         """ 
            Transform data in an attribute using a matrix.
+           Normal vectors are transformed by the rotation
+           part of the matrix.
         """ 
-        oldPositionData = self.attributes[variableName].data
-        newPositionData = []
-
-        for oldPos in oldPositionData:
-            newPos = oldPos.copy()         # avoid changing list reference
-            newPos.append(1)               # add homogeneous 4th coordinate
-            newPos = matrix @ newPos       # multiply by matrix
-            newPos = list( newPos[0:3] )   # remove homogeneous coord
-            newPositionData.append(newPos) # add to new data list
+        positionData = np.asarray(self.attributes[variableName].data, dtype=float)
 
+        # Multiply by matrix with homogeneous 4th coordinate of 1
+        matrix = np.asarray(matrix)
+        newPositionData = positionData @ matrix[0:3, 0:3].T + matrix[0:3, 3]
         self.attributes[variableName].data = newPositionData
 
         # Extract the rotation submatrix
-        rotationMatrix = np.array( [ matrix[0][0:3],
-                                     matrix[1][0:3],
-                                     matrix[2][0:3] ] )
+        rotationMatrix = matrix[0:3, 0:3]
 
         # Update normal vector data upon transforming a geometry
-        oldVertexNormalData = self.attributes["vertexNormal"].data
-        newVertexNormalData = []
-        for oldNormal in oldVertexNormalData:
-            newNormal = oldNormal.copy()
-            newNormal = rotationMatrix @ newNormal
-            newVertexNormalData.append( newNormal )
-        self.attributes["vertexNormal"].data = newVertexNormalData
-
-        oldFaceNormalData = self.attributes["faceNormal"].data
-        newFaceNormalData = []
-        for oldNormal in oldFaceNormalData:
-            newNormal = oldNormal.copy()
-            newNormal = rotationMatrix @ newNormal
-            newFaceNormalData.append( newNormal )
-        self.attributes["faceNormal"].data = newFaceNormalData
+        for normalName in ("vertexNormal", "faceNormal"):
+            if normalName in self.attributes:
+                normalData = np.asarray(self.attributes[normalName].data, dtype=float)
+                self.attributes[normalName].data = normalData @ rotationMatrix.T
+                self.attributes[normalName].uploadData()
 
         # New data must be uploaded
         self.attributes[variableName].uploadData()
-        self.attributes["vertexNormal"].uploadData()
-        self.attributes["faceNormal"].uploadData()
 
     def merge(self, otherGeometry):
         """
@@ -99,10 +131,39 @@ class Geometry(object):
            object, which requires both geometries to have 
            attributes with same names.
         """
+        #
+        # If either geometry is indexed, so is merged geometry.
+        #   Indices of other geometry follow on after vertices
+        #   of this one.
+        #
+        if self.indices is not None or otherGeometry.indices is not None:
+            indices = np.concatenate( (self.vertexIndices(),
+                                       otherGeometry.vertexIndices() + self.vertexCount) )
+        else:
+            indices = None
+
         for variableName, attributeObject in self.attributes.items():
-            attributeObject.data.extend(otherGeometry.attributes[variableName].data)
+            otherData = otherGeometry.attributes[variableName].data
+            attributeObject.data = np.concatenate( (np.asarray(attributeObject.data, dtype=float),
+                                                    np.asarray(otherData, dtype=float)) )
             attributeObject.uploadData() # new data must be uploaded
 
         # Update number of vertices
         self.countVertices()
 
+        if indices is not None:
+            if self.indices is None:
+                self.setIndices(indices)
+            else:
+                self.indices.data = indices
+                self.indices.uploadData()
+                self.indexCount = len(indices)
+
+    def vertexIndices(self):
+        """
+           Return indices of vertices drawn, in order; for geometry
+           which is not indexed, simply 0, 1, 2, ..., vertexCount-1.
+        """
+        if self.indices is None:
+            return np.arange(self.vertexCount, dtype=np.int64)
+        return np.asarray(self.indices.data, dtype=np.int64)
@@ -0,0 +1,97 @@
+# File: geometryCache.py
+"""
+   A geometry cache hands back an already tessellated and uploaded
+   geometry for a repeated (context, geometry class, parameters)
+   tuple instead of building a new one, e.g.,
+
+       geometry = geometryCache.get(context, SphereGeometry, radius=1)
+
+   The context identifies the OpenGL contexts in which the vertex
+   buffers are valid (for Qt, the widget's QOpenGLContextGroup).
+   Buffers cannot be used in other contexts, so geometries for
+   different contexts are cached separately.
+
+   Each call returns a new Geometry object which shares the cached
+   vertex buffers (see Geometry.sharedCopy), so per-instance
+   attributes may be added to it freely. Shared vertex data must
+   not be changed with applyMatrix or merge; position meshes with
+   their transform instead.
+
+   The cache holds at most maxSize geometries and evicts the least
+   recently used one when full. Meshes still holding an evicted
+   geometry keep working; it is only no longer handed out.
+"""
+from collections import OrderedDict
+import numpy as np
+
+def _frozen(value):
+    """
+       Return a hashable version of a parameter value; lists, tuples,
+       and arrays (e.g., colors) become nested tuples.
+    """
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(_frozen(item) for item in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+class GeometryCache(object):
+
+    def __init__(self, maxSize=64):
+        """
+           maxSize == largest number of geometries kept
+        """
+        self.maxSize = maxSize
+
+        # Cached geometries, least recently used first
+        self.geometries = OrderedDict()
+
+        # Number of requests served from and not from cache
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, context, geometryClass, **parameters):
+        """
+           Return a copy, sharing vertex buffers, of the geometry built
+           by geometryClass(**parameters) in context, building it only
+           if it is not already cached.
+        """
+        key = ( context, geometryClass,
+                tuple(sorted( (name, _frozen(value)) for name, value in parameters.items() )) )
+        geometry = self.geometries.get(key)
+        if geometry is None:
+            self.misses += 1
+            geometry = geometryClass(**parameters)
+            self.geometries[key] = geometry
+            while len(self.geometries) > self.maxSize:
+                self.geometries.popitem(last=False)
+        else:
+            self.hits += 1
+            self.geometries.move_to_end(key)
+        return geometry.sharedCopy()
+
+    def clear(self, context=None):
+        """
+           Forget all cached geometries, or only those of a context,
+           e.g., when the context is destroyed.
+        """
+        if context is None:
+            self.geometries.clear()
+        else:
+            for key in [key for key in self.geometries if key[0] is context]:
+                del self.geometries[key]
+
+    def statistics(self):
+        """
+           Return counters as a dictionary: hits, misses,
+           number of geometries cached, and maxSize.
+        """
+        return { "hits": self.hits, "misses": self.misses,
+                 "size": len(self.geometries), "maxSize": self.maxSize }
+
+    def __len__(self):
+        return len(self.geometries)
+
+
+# Cache shared by all structure models
+geometryCache = GeometryCache()
@@ -1,6 +1,6 @@
 # File: parametricGeometry.py
 """
-   Use a parametric function to transform a 2D rectangular 
+   Use a parametric function to transform a 2D rectangular
    region into a 3D surface, e.g., a sphere or cylinder.
    The parametric function, S, generally expresses x, y, & z
    coordinates in terms of 2 independent variable u and v:
@@ -11,129 +11,133 @@
 
           0 <= u <= 1  and  0 <= v <= 1
 
+   S is evaluated once for the whole grid of (u,v) samples: it
+   takes arrays of u and v values and returns arrays of positions
+   and of unit normal vectors, the normals being calculated from
+   the analytic form of the surface. Each sample is stored once,
+   as a vertex shared by the triangles around it, and triangles
+   are listed as vertex indices calculated with array arithmetic.
 """
 from geometry.geometry import Geometry
 import numpy as np
 
+def tessellate(uStart, uEnd, uResolution,
+               vStart, vEnd, vResolution,
+               surfaceFunction, color1, color2):
+    """
+        tessellate(uStart, uEnd, uResolution, vStart, vEnd, vResolution,
+                   surfaceFunction, color1, color2)
+
+        args:    same as for ParametricGeometry
+        returns: positionData, colorData, and vertexNormalData, each
+                 an (N,3) array holding one row per vertex, and
+                 indexData, an (M,) array of vertex indices, 3 per
+                 triangle
+    """
+    # Calculate space between u and v coordinates
+    deltaU = (uEnd - uStart) / uResolution
+    deltaV = (vEnd - vStart) / vResolution
+
+    #
+    # Generate grid of points and normals on surface function,
+    #   each an array of shape (uResolution+1, vResolution+1, 3).
+    #
+    u = uStart + np.arange(uResolution+1) * deltaU
+    v = vStart + np.arange(vResolution+1) * deltaV
+    u, v = np.meshgrid(u, v, indexing='ij')
+    positions, vertexNormals = surfaceFunction(u, v)
+    positions = np.asarray(positions, dtype=float)
+    vertexNormals = np.asarray(vertexNormals, dtype=float)
+
+    #
+    # Half the rectangles (along v) may be one color and the other
+    #   half a different color. Vertices on the row between the two
+    #   halves are then stored twice, once in each color, so the
+    #   colors do not blend across the neighboring rectangles.
+    #
+    split = vResolution
+    if color1 is not None and list(color1) != list(color2):
+        split = int(np.ceil(vResolution/2))
+    if split < vResolution:
+        blocks = [ (0, split+1), (split, vResolution+1) ]
+    else:
+        blocks = [ (0, vResolution+1) ]
+
+    positionData = np.concatenate( [positions[:, b0:b1].reshape(-1, 3) for b0, b1 in blocks] )
+    vertexNormalData = np.concatenate( [vertexNormals[:, b0:b1].reshape(-1, 3) for b0, b1 in blocks] )
+
+    if color1 is None:
+        # Default vertex colors cycle along the grid
+        defaultColors = np.array( [[1, 0, 0], [0, 1, 0], [0, 0, 1],
+                                   [0, 1, 1], [1, 0, 1], [1, 1, 0]], dtype=float )
+        uIndex, vIndex = np.meshgrid( np.arange(uResolution+1),
+                                      np.arange(vResolution+1), indexing='ij' )
+        colorData = defaultColors[ ((uIndex + vIndex) % 6).reshape(-1) ]
+    else:
+        blockColors = [color1, color2]
+        colorData = np.concatenate( [ np.tile( np.asarray(blockColors[n], dtype=float),
+                                               ((uResolution+1)*(b1-b0), 1) )
+                                      for n, (b0, b1) in enumerate(blocks) ] )
+
+    #
+    # Number of the vertex in column uIndex, row vIndex, of the
+    #   given block of rows; blocks are stored one after another,
+    #   each column by column.
+    #
+    def vertexNumber(uIndex, vIndex, block):
+        first = 0
+        number = np.zeros(np.broadcast(uIndex, vIndex, block).shape, dtype=np.int64)
+        for n, (b0, b1) in enumerate(blocks):
+            inBlock = block == n
+            number = np.where( inBlock, first + uIndex*(b1-b0) + (vIndex-b0), number )
+            first += (uResolution+1)*(b1-b0)
+        return number
+
+    #
+    # Corners of each rectangle of the grid, A at (u, v), B at
+    #   (u+1, v), C at (u+1, v+1), and D at (u, v+1). Each
+    #   rectangle is split into 2 triangles, ABC and ACD.
+    #
+    xIndex, yIndex = np.meshgrid( np.arange(uResolution),
+                                  np.arange(vResolution), indexing='ij' )
+    block = (yIndex >= split).astype(np.int64)
+    A = vertexNumber(xIndex,   yIndex,   block)
+    B = vertexNumber(xIndex+1, yIndex,   block)
+    C = vertexNumber(xIndex+1, yIndex+1, block)
+    D = vertexNumber(xIndex,   yIndex+1, block)
+    indexData = np.stack( (A, B, C, A, C, D), axis=2 ).reshape(-1)
+
+    return positionData, colorData, vertexNormalData, indexData
+
+
 class ParametricGeometry(Geometry):
 
     def __init__(self, uStart, uEnd, uResolution,
-                       vStart, vEnd, vResolution, 
+                       vStart, vEnd, vResolution,
                        surfaceFunction, color1, color2):
         """
            uStart, uEnd == bounds for u
            vStart, vEnd == bounds for v
            uResolution == number of samples used between u values
            vResolution == number of samples used between v values
-           surfaceFunction == parametric function, S(u,v)
+           surfaceFunction == parametric function, S(u,v), taking
+                              arrays u and v of the same shape and
+                              returning (positions, normals), two
+                              arrays of shape u.shape + (3,)
            color1 == color, [r,g,b], of 1st half of surface
            color2 == color, [r,g,b], of 2nd half of surface
         """
         super().__init__()
 
-        # Calculate space between u and v coordinates
-        deltaU = (uEnd - uStart) / uResolution
-        deltaV = (vEnd - vStart) / vResolution
-
-        #
-        # Calculate half the samples between v values. Use of 
-        #   this variable leads to a departure from the original
-        #   code, allowing half the vertices to be one color
-        #   and the other half to possibly be a different color.
-        #
-        vHalfResolution = vResolution/2
-
-        #
-        # Generate set of points on surface function and 
-        #   store in 2D array, positions.
-        #
-        positions = []
-        for uIndex in range(uResolution+1):
-            vArray = []
-            for vIndex in range(vResolution+1):
-                u = uStart + uIndex * deltaU
-                v = vStart + vIndex * deltaV
-                vArray.append( surfaceFunction(u,v) )
-            positions.append(vArray)
-
-        # Calculate normal vector from 3 points
-        def calcNormal(P0, P1, P2):
-            v1 = np.array(P1) - np.array(P0)
-            v2 = np.array(P2) - np.array(P0)
-            orthogonal_vector = np.cross(v1, v2)
-            norm = np.linalg.norm(orthogonal_vector)
-            normal_vector = orthogonal_vector / norm if norm > 1e-6 \
-                else np.array(P0) / np.linalg.norm(P0)
-            return normal_vector
-
-        #
-        # Populate list with vertex normal vectors
-        #   at position of each vertex.
-        #
-        vertexNormals = []
-        for uIndex in range(uResolution+1):
-            vArray = []
-            for vIndex in range(vResolution+1):
-                u = uStart + uIndex * deltaU
-                v = vStart + vIndex * deltaV
-                h = 0.0001
-                P0 = surfaceFunction(u, v)
-                P1 = surfaceFunction(u+h, v)
-                P2 = surfaceFunction(u, v+h)
-                normalVector = calcNormal(P0, P1, P2)
-                vArray.append( normalVector )
-            vertexNormals.append(vArray)
-
-        # Store vertex data
-        positionData = []
-        colorData = []
-
-        # Default vertex colors
-        C1, C2, C3 = [1, 0, 0], [0, 1, 0], [0, 0, 1]
-        C4, C5, C6 = [0, 1, 1], [1, 0, 1], [1, 1, 0]
-
-        vertexNormalData = []
-        faceNormalData = []
-
-        #
-        # Group vertex data into triangles
-        #   Note: [].copy() needed to avoid storing references.
-        #
-        for xIndex in range(uResolution):
-            for yIndex in range(vResolution):
-                # position data for rectangle vertices
-                pA = positions[xIndex+0][yIndex+0]
-                pB = positions[xIndex+1][yIndex+0]
-                pD = positions[xIndex+0][yIndex+1]
-                pC = positions[xIndex+1][yIndex+1]
-                # rectangle as 2 triangles
-                positionData += [pA.copy(), pB.copy(), pC.copy(),
-                                 pA.copy(), pC.copy(), pD.copy()]
-                # color for vertices
-                if color1 == None:
-                    colorData += [C1,C2,C3, C4,C5,C6]
-                else:
-                    if yIndex < vHalfResolution:
-                        colorData += [color1]*6
-                    else:
-                        colorData += [color2]*6
-                # vertex normal vectors
-                nA = vertexNormals[xIndex+0][yIndex+0]
-                nB = vertexNormals[xIndex+1][yIndex+0]
-                nD = vertexNormals[xIndex+0][yIndex+1]
-                nC = vertexNormals[xIndex+1][yIndex+1]
-                vertexNormalData += [nA,nB,nC, nA,nC,nD]
-                # face normal vectors
-                fn0 = calcNormal(pA, pB, pC)
-                fn1 = calcNormal(pA, pC, pD)
-                faceNormalData += [fn0,fn0,fn0, fn1,fn1,fn1]
-
-
-        # Add attributes and count vertices
+        positionData, colorData, vertexNormalData, indexData = \
+            tessellate( uStart, uEnd, uResolution,
+                        vStart, vEnd, vResolution,
+                        surfaceFunction, color1, color2 )
+
+        # Add attributes, count vertices, and share them between triangles
         self.addAttribute("vec3", "vertexPosition", positionData)
         self.addAttribute("vec3", "vertexColor", colorData)
         self.addAttribute("vec3", "vertexNormal", vertexNormalData)
-        self.addAttribute("vec3", "faceNormal", faceNormalData)
 
         self.countVertices()
-
+        self.setIndices(indexData)
@@ -3,30 +3,46 @@
    Establish a window for OpenGL drawing:
     • set window size and title
     • create and display menu bar
-    • open coordinate file; read and process coordinate data
+    • open coordinate file; read and process coordinate data in
+      a worker thread, showing progress in the status bar
     • determine which structure model to display and then
       update the window
 """
 # Import needed standard libraries
+import importlib
 import sys
 import numpy as np
 
 # Import needed local libraries
-from stickModel      import StickModel
-from cpkModel        import CpkModel  
-from ballStickModel  import BallStickModel
 from newCanvas       import NewCanvas
-from processMolecule import processMolecule
+from processMolecule import announceMolecule
+from moleculeLoader  import MoleculeLoader
 
 # Need following for molecular objects
-import Atom
-import Molecule
 import Elements
 
 # Import needed third party libraries
 from PySide6.QtWidgets import (QApplication, QMainWindow, QFileDialog,
                                QMessageBox, QStatusBar, QLabel)
 from PySide6.QtGui import QAction, QSurfaceFormat
+from PySide6.QtCore import Qt, QThreadPool
+
+#
+# Module and class of each structure model. A model's module (with its
+#   geometries, materials, and shaders) is imported only when the model
+#   is first selected, so the window opens without loading any of them.
+#
+MODEL_CLASSES = { "stick":          ("stickModel", "StickModel"),
+                  "cpk":            ("cpkModel", "CpkModel"),
+                  "ball-and-stick": ("ballStickModel", "BallStickModel") }
+
+def modelClass(model):
+    """
+       Return the widget class drawing the named structure model,
+       importing its module the first time.
+    """
+    moduleName, className = MODEL_CLASSES[model]
+    return getattr(importlib.import_module(moduleName), className)
 
 class MainWindow(QMainWindow):
     """
@@ -38,6 +54,7 @@ class MainWindow(QMainWindow):
         super().__init__()
 
         self.molecule = None   # initialize molecule object
+        self.loader = None     # MoleculeLoader reading a file, if any
 
         self.label = QLabel()  # Use to display mouse tracking
 
@@ -68,6 +85,11 @@ class MainWindow(QMainWindow):
         # lambda function not needed here since no argument is passed
         self.open_act.triggered.connect(self.openFile) # see method below
 
+        self.cancel_act = QAction("Cancel Loading")
+        self.cancel_act.setShortcut("Esc")
+        self.cancel_act.setEnabled(False) # enabled only while a file loads
+        self.cancel_act.triggered.connect(self.cancelLoading)
+
         self.quit_act = QAction("Quit")
         self.quit_act.setShortcut("Ctrl+Q")
         self.quit_act.triggered.connect(self.close) # self.close => QWidget slot
@@ -82,6 +104,9 @@ class MainWindow(QMainWindow):
         self.cpkmodel_act = QAction("Space-filling model")
         self.cpkmodel_act.triggered.connect(lambda: self.selectModel("cpk"))
 
+        self.cpkimpostor_act = QAction("Space-filling model (ray-cast)")
+        self.cpkimpostor_act.triggered.connect(lambda: self.selectModel("cpk-impostor"))
+
     def createMenu(self):
         """
            Create application's menu bar.
@@ -93,6 +118,7 @@ class MainWindow(QMainWindow):
         file_menu.addAction(self.new_act)
         file_menu.addSeparator()
         file_menu.addAction(self.open_act)
+        file_menu.addAction(self.cancel_act)
         file_menu.addSeparator()
         file_menu.addAction(self.quit_act)
 
@@ -101,6 +127,7 @@ class MainWindow(QMainWindow):
         view_menu.addAction(self.stickmodel_act)
         view_menu.addAction(self.ballstickmodel_act)
         view_menu.addAction(self.cpkmodel_act)
+        view_menu.addAction(self.cpkimpostor_act)
 
         # Create status bar
         self.status_bar = QStatusBar()         
@@ -117,34 +144,102 @@ class MainWindow(QMainWindow):
                             "Unichem Files (*.xyz);;Python Files (*.py)")
 
         #
-        # Create a molecule object; read in xyz coords (in Angstroms).
+        # Create a molecule object from the first frame of file; read
+        #   in title, atomic numbers, and xyz coords (in Angstroms).
+        #   Only the first frame is read, however large the file. The
+        #   molecule and its bonds are kept in a cache file beside it
+        #   (see mqlbFile.py), so opening the file again is quick.
+        #
+        # Then process atomic coordinates to form molecule:
+        #  • determine which atoms are bonded to each other
+        #  • center atomic coordinates
+        #
+        # Both are done in a worker thread (see moleculeLoader.py);
+        #   the current molecule stays on display until loading ends.
         #
         if coord_file:
-            self.molecule = Molecule.Molecule()  # create molecule instance
-            with open(coord_file, "r") as f:
-                contents = f.readlines()
-                title = contents[0]              # molecule title
-                natoms = int(contents[1])        # number of atoms
-                for i in range(2, natoms+2):
-                    data = contents[i].split()   # each line contains:
-                    atnum = int(data[0])         #  • atomic number
-                    x = float(data[1])           #  • x coord
-                    y = float(data[2])           #  • y coord
-                    z = float(data[3])           #  • z coord
-                    # Add newly created atom object to molecule object
-                    self.molecule.addAtom(Atom.Atom(atnum, x, y, z))
+            self.startLoading(coord_file)
         else:
             QMessageBox.information(self, "No File", "No File Selected.", 
                                     QMessageBox.StandardButton.Ok)
 
+    def startLoading(self, coord_file):
+        """
+           Start loading molecule from file in a worker thread,
+           cancelling any file still being loaded.
+        """
+        self.cancelLoading()
+        loader = MoleculeLoader(coord_file)
         #
-        # Process atomic coordinates to form molecule:
-        #  • determine which atoms are bonded to each other
-        #  • center atomic coordinates
+        # Signals are emitted in the worker thread and queued for
+        #   these methods, which run in the window's thread.
         #
-        if self.molecule:
-            self.setWindowTitle("Moleql – " + title) # reset window title
-            processMolecule(self, self.molecule)
+        loader.signals.progress.connect(self.showProgress)
+        loader.signals.finished.connect(self.moleculeLoaded)
+        loader.signals.failed.connect(self.loadFailed)
+        self.loader = loader
+        self.loadedAtoms = 0
+        self.cancel_act.setEnabled(True)
+        self.status_bar.showMessage("Reading " + coord_file + " ...")
+        QThreadPool.globalInstance().start(loader)
+
+    def cancelLoading(self):
+        """
+           Stop loading file, if any is being loaded.
+        """
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loadingDone()
+            self.status_bar.showMessage("Loading cancelled", 3000)
+
+    def loadingDone(self):
+        self.loader = None
+        self.cancel_act.setEnabled(False)
+        self.status_bar.clearMessage()
+
+    def fromCurrentLoader(self):
+        """
+           Was signal being handled sent by the current loader, rather
+           than one which has since been cancelled?
+        """
+        return self.loader is not None and self.sender() is self.loader.signals
+
+    def showProgress(self, stage, count):
+        """
+           Show progress of loader in status bar.
+        """
+        if not self.fromCurrentLoader():
+            return
+        if stage == "atoms":
+            self.loadedAtoms = count
+            self.status_bar.showMessage("%d atoms read" % count)
+        elif stage == "hash":
+            self.status_bar.showMessage("%d MiB of file checked for cache" % count)
+        else:
+            self.status_bar.showMessage("%d atoms read, %d bonds found"
+                                        % (self.loadedAtoms, count))
+
+    def moleculeLoaded(self, molecule, title):
+        """
+           Show molecule read and processed by loader.
+        """
+        if not self.fromCurrentLoader():
+            return
+        self.loadingDone()
+        self.molecule = molecule
+        self.setWindowTitle("Moleql – " + title) # reset window title
+        announceMolecule(self)
+
+    def loadFailed(self, message):
+        if not self.fromCurrentLoader():
+            return
+        self.loadingDone()
+        QMessageBox.warning(self, "Unreadable File", message,
+                            QMessageBox.StandardButton.Ok)
+
+    def closeEvent(self, event):
+        self.cancelLoading()
+        super().closeEvent(event)
 
     def selectModel(self, model):
         """
@@ -163,13 +258,16 @@ class MainWindow(QMainWindow):
             self.setCentralWidget(NewCanvas(self)) # create a blank canvas
         elif model == "stick":
             self.status_bar.removeWidget(self.label)
-            self.setCentralWidget(StickModel(self, self.molecule, self.label))
+            self.setCentralWidget(modelClass("stick")(self, self.molecule, self.label))
         elif model == "cpk":
             self.status_bar.removeWidget(self.label)
-            self.setCentralWidget(CpkModel(self, self.molecule, self.label))
+            self.setCentralWidget(modelClass("cpk")(self, self.molecule, self.label))
+        elif model == "cpk-impostor":
+            self.status_bar.removeWidget(self.label)
+            self.setCentralWidget(modelClass("cpk")(self, self.molecule, self.label, mode="impostor"))
         elif model == "ball-and-stick":
             self.status_bar.removeWidget(self.label)
-            self.setCentralWidget(BallStickModel(self, self.molecule, self.label))
+            self.setCentralWidget(modelClass("ball-and-stick")(self, self.molecule, self.label))
         # Now, update with new model
         self.update()
 
@@ -185,6 +283,13 @@ class baseApp(QApplication):
            Configure renderable surfaces using the QSurfaceFormat class,
            a way of enabling OpengGL features.
         """
+        #
+        # All structure models share OpenGL resources, so that vertex
+        #   buffers cached in geometryCache stay valid when one model
+        #   widget replaces another. Must be set before QApplication
+        #   is created.
+        #
+        QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
         super().__init__(argv)
         self.format = QSurfaceFormat()
         self.format.setDepthBufferSize(24)                 # set minimum buffer depth
@@ -1,9 +1,10 @@
 # File: flatMaterial.py
 """
    The simplest shading model is the flat shading model, in which
-   face normal vectores are used, calculations take place in the
-   vertex shader, and light contribution values are passed along
-   to the fragment shader. 
+   face normal vectores are used, so that each triangle is evenly
+   lit. Face normals are calculated in the fragment shader from
+   the triangle's surface, so vertices may be shared between
+   triangles (indexed geometry).
 
    **Note**
    All code referencing 'texture' has been removed to simplify
@@ -18,14 +19,11 @@ from OpenGL.GL import *
 
 class FlatMaterial(Material):
 
-    def __init__(self, properties={}):
-        """
-           In OpenGL shader language, GLSL, the 'struct' data
-           structure groups together related data variables 
-           as a single unit. 'struct Light' is use to store 
-           light-related data.
-        """
-        vertexShaderCode = """
+    #
+    # Light structure and lightCalc function, used by the
+    #   fragment shader.
+    #
+    lightCalcCode = """
         struct Light
         {
             // 1 = AMBIENT, 2 = DIRECTIONAL, 3 = POINT
@@ -82,10 +80,23 @@ class FlatMaterial(Material):
             return light.color * (ambient + diffuse + specular);
         }
 
+        """
+
+    def __init__(self, properties={}, vertexShaderCode=None):
+        """
+           In OpenGL shader language, GLSL, the 'struct' data
+           structure groups together related data variables 
+           as a single unit. 'struct Light' is use to store 
+           light-related data.
+
+           Subclasses may supply their own vertexShaderCode, which
+           must provide the same outputs (UV, color, position) to
+           the fragment shader.
+        """
+        defaultVertexShaderCode = """
         //
-        // Before being used in lightCalc function, model matrix needs to be
-        //   applied to the position data and rotational part of model matrix
-        //   needs to be applied to normal data.
+        // Model matrix needs to be applied to the position data
+        //   before it is used in lightCalc function.
         //
         uniform mat4 projectionMatrix;
         uniform mat4 viewMatrix;
@@ -93,10 +104,9 @@ class FlatMaterial(Material):
         in vec3 vertexPosition;
         in vec3 vertexColor;
         in vec2 vertexUV;
-        in vec3 faceNormal;
         out vec2 UV;
-        out vec3 light;
         out vec3 color;
+        out vec3 position;
         void main()
         {
             gl_Position = projectionMatrix * viewMatrix * 
@@ -104,30 +114,33 @@ class FlatMaterial(Material):
                                              vec4(vertexPosition, 1);
             UV = vertexUV;
             color = vertexColor;
-            // Calculate total effect of lights on color
-            vec3 position = vec3( modelMatrix * vec4(vertexPosition, 1) );
-            vec3 normal = normalize( mat3(modelMatrix) * faceNormal );
-            light = vec3(0,0,0);
-            light += lightCalc( light0, position, normal );
-            light += lightCalc( light1, position, normal );
-            light += lightCalc( light2, position, normal );
-            light += lightCalc( light3, position, normal );
+            position = vec3( modelMatrix * vec4(vertexPosition, 1) );
         }
         """
 
         #
-        # Total light contribution is passed from vertex shader
-        #   to determine final color of each fragment.
+        # Triangles share their vertices, so face normals cannot be
+        #   vertex data. Instead, the normal of the triangle being
+        #   drawn is found in the fragment shader from the change in
+        #   position between neighboring pixels, which is the same
+        #   across the whole (flat) triangle.
         # 
-        fragmentShaderCode = """
+        fragmentShaderCode = self.lightCalcCode + """
         uniform vec3 baseColor;
         uniform bool useVertexColors;
         in vec2 UV;
-        in vec3 light;
         in vec3 color;
+        in vec3 position;
         out vec4 fragColor;
         void main()
         {
+            // Calculate total effect of lights on color
+            vec3 normal = normalize( cross( dFdx(position), dFdy(position) ) );
+            vec3 light = vec3(0,0,0);
+            light += lightCalc( light0, position, normal );
+            light += lightCalc( light1, position, normal );
+            light += lightCalc( light2, position, normal );
+            light += lightCalc( light3, position, normal );
             vec4 tempColor = vec4(baseColor, 1.0);
             if( useVertexColors )
                 tempColor *= vec4(color, 1.0);
@@ -136,6 +149,9 @@ class FlatMaterial(Material):
         }
         """
 
+        if vertexShaderCode is None:
+            vertexShaderCode = defaultVertexShaderCode
+
         super().__init__(vertexShaderCode, fragmentShaderCode)
 
         # Uniform objects to be added
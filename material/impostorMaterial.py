@@ -0,0 +1,141 @@
+# File: impostorMaterial.py
+"""
+   Impostor material for instanced rendering of spheres. Rather
+   than tessellating each sphere into triangles, every atom is
+   drawn as a single square (BillboardGeometry) turned to face
+   the camera and just large enough to cover the sphere's
+   silhouette. The fragment shader casts a ray from the camera
+   through each pixel of the square, discards pixels that miss
+   the sphere, and for pixels that hit it computes the exact
+   point, normal, and depth on the sphere's surface. Per-instance
+   attributes are those of InstancedPhongMaterial:
+
+     • instancePosition == center of sphere (vec3)
+     • instanceRadius   == radius of sphere (float)
+     • instanceColor    == color of sphere, [r,g,b] (vec3)
+
+   The lighting calculations are those of PhongMaterial. The
+   model matrix is assumed to be a rotation, translation, and
+   uniform scaling, as set by Molecule.transform.
+"""
+
+from material.phongMaterial import PhongMaterial
+
+class ImpostorMaterial(PhongMaterial):
+
+    #
+    # All calculations are done in world coordinates, the same
+    #   coordinates used by lightCalc for lights and viewPosition.
+    #   Also drawn by PickMaterial, to pick what this material draws.
+    #
+    vertexShaderCode = """
+        uniform mat4 projectionMatrix;
+        uniform mat4 viewMatrix;
+        uniform mat4 modelMatrix;
+        uniform vec3 viewPosition;
+        in vec3 vertexPosition;
+        in vec3 instancePosition;
+        in float instanceRadius;
+        in vec3 instanceColor;
+        out vec3 position;
+        out vec3 color;
+        flat out vec3 center;
+        flat out float radius;
+        void main()
+        {
+            center = vec3( modelMatrix * vec4(instancePosition, 1) );
+            radius = instanceRadius * length( vec3(modelMatrix[0]) );
+
+            // Basis of plane through sphere center facing camera
+            vec3 toCamera = viewPosition - center;
+            float cameraDistance = length(toCamera);
+            vec3 w = toCamera / cameraDistance;
+            vec3 helper = abs(w.y) < 0.99 ? vec3(0, 1, 0) : vec3(1, 0, 0);
+            vec3 u = normalize( cross(helper, w) );
+            vec3 v = cross(w, u);
+
+            //
+            // Cone of rays from camera which touch sphere cuts this
+            //   plane in a circle of radius r*d/sqrt(d*d - r*r).
+            //
+            float halfSize = radius * cameraDistance / 
+                             sqrt( max(cameraDistance*cameraDistance - radius*radius, 1e-6) );
+            position = center + halfSize * (vertexPosition.x * u + 
+                                            vertexPosition.y * v);
+            gl_Position = projectionMatrix * viewMatrix * vec4(position, 1);
+            color = instanceColor;
+        }
+        """
+
+    #
+    # Point where the ray from the camera through this pixel hits the
+    #   sphere; pixels which miss it are discarded, and the depth of
+    #   the pixel is that of the point on the sphere, not the square.
+    #
+    sphereHitCode = """
+        vec3 sphereHit(vec3 position, vec3 center, float radius, vec3 viewPosition,
+                       mat4 projectionMatrix, mat4 viewMatrix)
+        {
+            vec3 rayDirection = normalize(position - viewPosition);
+            vec3 fromCenter = viewPosition - center;
+            float b = dot(fromCenter, rayDirection);
+            float c = dot(fromCenter, fromCenter) - radius * radius;
+            float discriminant = b * b - c;
+            if (discriminant < 0.0)
+                discard;
+            vec3 hitPosition = viewPosition + 
+                               (-b - sqrt(discriminant)) * rayDirection;
+
+            vec4 clipPosition = projectionMatrix * viewMatrix * 
+                                                   vec4(hitPosition, 1);
+            float ndcDepth = clipPosition.z / clipPosition.w;
+            gl_FragDepth = 0.5 * (gl_DepthRange.diff * ndcDepth + 
+                                  gl_DepthRange.near + gl_DepthRange.far);
+            return hitPosition;
+        }
+        """
+
+    # Fragment shader with which PickMaterial picks these spheres
+    pickFragmentShaderCode = sphereHitCode + """
+        uniform mat4 projectionMatrix;
+        uniform mat4 viewMatrix;
+        uniform vec3 viewPosition;
+        in vec3 position;
+        flat in vec3 center;
+        flat in float radius;
+        flat in int pickID;
+        out int fragID;
+        void main()
+        {
+            sphereHit(position, center, radius, viewPosition,
+                      projectionMatrix, viewMatrix);
+            fragID = pickID;
+        }
+        """
+
+    def __init__(self, properties={}):
+
+        fragmentShaderCode = PhongMaterial.lightCalcCode + self.sphereHitCode + """
+        uniform mat4 projectionMatrix;
+        uniform mat4 viewMatrix;
+        in vec3 position;
+        flat in vec3 center;
+        flat in float radius;
+        out vec4 fragColor;
+        void main()
+        {
+            vec3 hitPosition = sphereHit(position, center, radius, viewPosition,
+                                         projectionMatrix, viewMatrix);
+            vec3 hitNormal = (hitPosition - center) / radius;
+
+            // Calculate total effect of lights on color
+            vec3 total = vec3(0,0,0);
+            total += lightCalc( light0, hitPosition, hitNormal );
+            total += lightCalc( light1, hitPosition, hitNormal );
+            total += lightCalc( light2, hitPosition, hitNormal );
+            total += lightCalc( light3, hitPosition, hitNormal );
+            fragColor = vec4( total, 1 );
+        }
+        """
+
+        super().__init__(properties, self.vertexShaderCode, fragmentShaderCode)
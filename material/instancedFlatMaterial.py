@@ -0,0 +1,81 @@
+# File: instancedFlatMaterial.py
+"""
+   Flat material for instanced rendering of bonds. A single capped
+   cylinder (BondGeometry with radius 1 and height 1, lying along
+   the y axis and centered at the origin) is stored on the GPU and
+   drawn once per bond. Each instance is stretched between its two
+   atoms and colored from per-instance attributes:
+
+     • instanceStart  == position of first atom of bond (vec3)
+     • instanceEnd    == position of second atom of bond (vec3)
+     • instanceRadius == radius of bond (float)
+     • instanceColor1 == color, [r,g,b], of first half of bond (vec3)
+     • instanceColor2 == color, [r,g,b], of second half of bond (vec3)
+
+   The cylinder body is stretched to the bond length while the 
+   hemispherical caps are only scaled by the radius, so the caps
+   stay round. The shared geometry must be built with vertex colors
+   [0,0,0] for its first half and [1,1,1] for its second half; the
+   vertex color then selects which atom color each face receives.
+   The lighting calculations, done per fragment with face normals,
+   are those of FlatMaterial.
+"""
+
+from material.flatMaterial import FlatMaterial
+
+class InstancedFlatMaterial(FlatMaterial):
+
+    # Also drawn by PickMaterial, to pick what this material draws
+    vertexShaderCode = """
+        uniform mat4 projectionMatrix;
+        uniform mat4 viewMatrix;
+        uniform mat4 modelMatrix;
+        in vec3 vertexPosition;
+        in vec3 vertexColor;
+        in vec2 vertexUV;
+        in vec3 instanceStart;
+        in vec3 instanceEnd;
+        in float instanceRadius;
+        in vec3 instanceColor1;
+        in vec3 instanceColor2;
+        out vec2 UV;
+        out vec3 color;
+        out vec3 position;
+        void main()
+        {
+            //
+            // Orthonormal basis with its y axis along the bond;
+            //   helper vector is any direction not parallel to bond.
+            //
+            vec3 bond = instanceEnd - instanceStart;
+            float bondLength = length(bond);
+            vec3 yAxis = bond / bondLength;
+            vec3 helper = abs(yAxis.y) < 0.99 ? vec3(0, 1, 0) : vec3(1, 0, 0);
+            vec3 xAxis = normalize( cross(helper, yAxis) );
+            vec3 zAxis = cross(xAxis, yAxis);
+            mat3 basis = mat3(xAxis, yAxis, zAxis);
+
+            //
+            // Body of unit bond (|y| <= 0.5) is stretched to bond length;
+            //   caps (|y| > 0.5) keep their shape, scaled by the radius.
+            //
+            float y = vertexPosition.y;
+            float along = y * bondLength;
+            if ( abs(y) > 0.5 )
+                along = sign(y) * (0.5 * bondLength + (abs(y) - 0.5) * instanceRadius);
+            vec3 local = vec3( instanceRadius * vertexPosition.x, along,
+                               instanceRadius * vertexPosition.z );
+            vec4 bondPosition = vec4( 0.5 * (instanceStart + instanceEnd) + 
+                                      basis * local, 1 );
+
+            gl_Position = projectionMatrix * viewMatrix * 
+                                             modelMatrix *
+                                             bondPosition;
+            UV = vertexUV;
+            color = mix( instanceColor1, instanceColor2, vertexColor.r );
+            position = vec3( modelMatrix * bondPosition );
+        }
+        """
+
+    def __init__(self, properties={}):
+        super().__init__(properties, self.vertexShaderCode)
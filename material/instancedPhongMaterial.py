@@ -0,0 +1,50 @@
+# File: instancedPhongMaterial.py
+"""
+   Phong material for instanced rendering of spheres. A single 
+   unit sphere is stored on the GPU and drawn once per atom; each
+   instance is moved to its atom's position, scaled by its radius,
+   and given its color from per-instance attributes:
+
+     • instancePosition == center of sphere (vec3)
+     • instanceRadius   == radius of sphere (float)
+     • instanceColor    == color of sphere, [r,g,b] (vec3)
+
+   The lighting calculations are those of PhongMaterial.
+"""
+
+from material.phongMaterial import PhongMaterial
+
+class InstancedPhongMaterial(PhongMaterial):
+
+    # Also drawn by PickMaterial, to pick what this material draws
+    vertexShaderCode = """
+        uniform mat4 projectionMatrix;
+        uniform mat4 viewMatrix;
+        uniform mat4 modelMatrix;
+        in vec3 vertexPosition;
+        in vec2 vertexUV;
+        in vec3 vertexNormal;
+        in vec3 instancePosition;
+        in float instanceRadius;
+        in vec3 instanceColor;
+        out vec3 position;
+        out vec3 color;
+        out vec2 UV;
+        out vec3 normal;
+        void main()
+        {
+            // Scale unit sphere and move it to atom position
+            vec4 localPosition = vec4(instancePosition + 
+                                      instanceRadius * vertexPosition, 1);
+            gl_Position = projectionMatrix * viewMatrix * 
+                                             modelMatrix *
+                                             localPosition;
+            color = instanceColor;
+            position = vec3( modelMatrix * localPosition );
+            UV = vertexUV;
+            normal = normalize( mat3(modelMatrix) * vertexNormal );
+        }
+        """
+
+    def __init__(self, properties={}):
+        super().__init__(properties, self.vertexShaderCode)
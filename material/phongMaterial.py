@@ -23,49 +23,12 @@ from OpenGL.GL import *
 
 class PhongMaterial(Material):
 
-    def __init__(self, properties={}):
-        """
-           In OpenGL shader language, GLSL, the 'struct' data
-           structure groups together related data variables 
-           as a single unit. 'struct Light' is use to store 
-           light-related data.
-        """
-        vertexShaderCode = """
-
-        //
-        // Before being used in lightCalc function, model matrix needs to be
-        //   applied to the position data and rotational part of model matrix
-        //   needs to be applied to normal data.
-        //
-        uniform mat4 projectionMatrix;
-        uniform mat4 viewMatrix;
-        uniform mat4 modelMatrix;
-        in vec3 vertexPosition;
-        in vec3 vertexColor;
-        in vec2 vertexUV;
-        in vec3 vertexNormal;
-        out vec3 position;
-        out vec3 color;
-        out vec2 UV;
-        out vec3 normal;
-        void main()
-        {
-            gl_Position = projectionMatrix * viewMatrix * 
-                                             modelMatrix *
-                                             vec4(vertexPosition, 1);
-            color = vertexColor;
-            position = vec3( modelMatrix * vec4(vertexPosition, 1) );
-            UV = vertexUV;
-            // Calculate total effect of lights on color
-            normal = normalize( mat3(modelMatrix) * vertexNormal );
-        }
-        """
-
-        #
-        # Total light contribution is passed from vertex shader
-        #   to determine final color of each fragment.
-        # 
-        fragmentShaderCode = """
+    #
+    # Light structure, material uniforms, and lightCalc function,
+    #   shared with subclasses which supply their own fragment
+    #   shader main().
+    #
+    lightCalcCode = """
         struct Light
         {
             // 1 = AMBIENT, 2 = DIRECTIONAL, 3 = POINT
@@ -149,7 +112,57 @@ class PhongMaterial(Material):
 
             return colorShade;
         }
+        """
 
+    def __init__(self, properties={}, vertexShaderCode=None, fragmentShaderCode=None):
+        """
+           In OpenGL shader language, GLSL, the 'struct' data
+           structure groups together related data variables 
+           as a single unit. 'struct Light' is use to store 
+           light-related data.
+
+           Subclasses may supply their own vertexShaderCode, which
+           must provide the same outputs (position, color, UV,
+           normal) to the fragment shader. Subclasses may also
+           supply their own fragmentShaderCode, which should start
+           with PhongMaterial.lightCalcCode.
+        """
+        defaultVertexShaderCode = """
+
+        //
+        // Before being used in lightCalc function, model matrix needs to be
+        //   applied to the position data and rotational part of model matrix
+        //   needs to be applied to normal data.
+        //
+        uniform mat4 projectionMatrix;
+        uniform mat4 viewMatrix;
+        uniform mat4 modelMatrix;
+        in vec3 vertexPosition;
+        in vec3 vertexColor;
+        in vec2 vertexUV;
+        in vec3 vertexNormal;
+        out vec3 position;
+        out vec3 color;
+        out vec2 UV;
+        out vec3 normal;
+        void main()
+        {
+            gl_Position = projectionMatrix * viewMatrix * 
+                                             modelMatrix *
+                                             vec4(vertexPosition, 1);
+            color = vertexColor;
+            position = vec3( modelMatrix * vec4(vertexPosition, 1) );
+            UV = vertexUV;
+            // Calculate total effect of lights on color
+            normal = normalize( mat3(modelMatrix) * vertexNormal );
+        }
+        """
+
+        #
+        # Total light contribution is calculated per fragment
+        #   to determine final color of each fragment.
+        # 
+        defaultFragmentShaderCode = self.lightCalcCode + """
         //uniform vec3 baseColor;
         in vec3 position;
         in vec2 UV;
@@ -169,6 +182,11 @@ class PhongMaterial(Material):
         }
         """
 
+        if vertexShaderCode is None:
+            vertexShaderCode = defaultVertexShaderCode
+        if fragmentShaderCode is None:
+            fragmentShaderCode = defaultFragmentShaderCode
+
         super().__init__(vertexShaderCode, fragmentShaderCode)
 
         # Uniforms to be added
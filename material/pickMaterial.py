@@ -0,0 +1,85 @@
+# File: pickMaterial.py
+"""
+   Material which draws the integer ID of what covers each pixel,
+   for picking with a PickBuffer, instead of a color. It draws the
+   same shapes as another material by reusing its vertex shader
+   (e.g., InstancedPhongMaterial.vertexShaderCode): the shader's
+   main() is renamed and called from a new main(), which then
+   computes the pick ID, an int expression of the shader's inputs
+   and gl_InstanceID:
+
+     • SPHERE_PICK_ID: the atom number (index + 1) of each instance
+       of a sphere, so 0 is left for pixels where nothing is drawn
+     • BOND_PICK_ID: negative, from the row of each bond instance
+       (see BondInstances) and which half of the bond is drawn
+
+   pickedAtom() turns either kind of ID back into an atom index.
+
+   A fragment shader may be given for shapes whose pixels are
+   decided there, e.g., ImpostorMaterial spheres; it receives the
+   ID as "flat in int pickID" and writes it to "out int fragID".
+"""
+
+from material.material import Material
+from OpenGL.GL import *
+
+SPHERE_PICK_ID = "gl_InstanceID + 1"
+BOND_PICK_ID = "-(2 * gl_InstanceID + int(vertexColor.r > 0.5) + 1)"
+
+def pickedAtom(pickID, bondPairs=None):
+    """
+        pickedAtom(pickID, bondPairs=None)
+
+        args:    pickID is an ID read from a PickBuffer
+                 bondPairs is the (M,2) array of atom indices of the
+                 bond instances picked (BondInstances.pairs)
+        returns: index of the atom picked, or of the atom at the end
+                 of the half of the bond picked; None if nothing was
+                 picked
+    """
+    if pickID > 0:
+        return pickID - 1
+    if pickID < 0 and bondPairs is not None:
+        row, half = divmod(-pickID - 1, 2)
+        return int(bondPairs[row, half])
+    return None
+
+class PickMaterial(Material):
+
+    fragmentShaderCode = """
+        flat in int pickID;
+        out int fragID;
+        void main()
+        {
+            fragID = pickID;
+        }
+        """
+
+    def __init__(self, vertexShaderCode, pickID=SPHERE_PICK_ID,
+                 fragmentShaderCode=None):
+
+        vertexShaderCode = vertexShaderCode.replace("void main()", "void drawMain()", 1) + """
+        flat out int pickID;
+        void main()
+        {
+            drawMain();
+            pickID = """ + pickID + """;
+        }
+        """
+        if fragmentShaderCode is None:
+            fragmentShaderCode = self.fragmentShaderCode
+
+        super().__init__(vertexShaderCode, fragmentShaderCode)
+
+        # Camera position, set by the renderer, e.g., for impostors
+        if "viewPosition" in vertexShaderCode + fragmentShaderCode:
+            self.addUniform("vec3", "viewPosition", [0,0,0])
+        self.locateUniforms()
+
+    def updateRenderSettings(self):
+        """
+           Draw filled triangles, front and back, as the materials
+           being picked do.
+        """
+        glDisable(GL_CULL_FACE)
+        glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
@@ -0,0 +1,103 @@
+# File: moleculeLoader.py
+"""
+   Read a molecule from file and process it (find bonds, center it)
+   in a worker thread of a QThreadPool, so the window keeps drawing
+   and responding while a large file is loaded. Bonds of very large
+   molecules are found by a pool of processes, one per CPU (see
+   CellList.findBondPairsParallel).
+
+   The loader reports what it has done with its signals, which are
+   delivered in the thread of the receiving window:
+
+     • progress(stage, count): stage is "atoms" once the atoms are
+       read, with their number, "bonds" while bonds are found, with
+       the number found so far, or "hash" while the file is checked
+       against its cache file, with the number of MiB checked
+     • finished(molecule, title): the molecule is ready to draw
+     • failed(message): the file could not be read
+     • cancelled(): cancel() was called before loading finished
+
+   Usage:
+
+       loader = MoleculeLoader("water.xyz")
+       loader.signals.finished.connect(window.moleculeLoaded)
+       QThreadPool.globalInstance().start(loader)
+       ...
+       loader.cancel()
+"""
+# Import needed standard libraries
+import os
+import threading
+
+# Import needed local libraries
+from mqlbFile        import readCachedMolecule
+from processMolecule import prepareMolecule
+
+# Import needed third party libraries
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+class LoadCancelled(Exception):
+    """
+       Raised in the worker thread to stop loading once the loader
+       has been cancelled.
+    """
+    pass
+
+class LoaderSignals(QObject):
+    """
+       Signals of a MoleculeLoader; a QRunnable is not a QObject,
+       so cannot have signals itself.
+    """
+    progress = Signal(str, int)
+    finished = Signal(object, str)
+    failed = Signal(str)
+    cancelled = Signal()
+
+class MoleculeLoader(QRunnable):
+
+    def __init__(self, fileName):
+        """
+           fileName == name of .xyz file to load
+        """
+        super().__init__()
+        self.fileName = fileName
+        self.signals = LoaderSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """
+           Ask loader to stop. Called from any thread; loading stops
+           at the next progress report, and only cancelled is emitted.
+        """
+        self._cancelled.set()
+
+    def isCancelled(self):
+        return self._cancelled.is_set()
+
+    def _progress(self, stage, count):
+        """
+           Report progress, or stop if loader has been cancelled.
+        """
+        if self._cancelled.is_set():
+            raise LoadCancelled()
+        self.signals.progress.emit(stage, count)
+
+    def run(self):
+        """
+           Read and process molecule; runs in a worker thread.
+        """
+        try:
+            if self._cancelled.is_set():
+                raise LoadCancelled()
+            molecule, title = readCachedMolecule(self.fileName, progress=self._progress,
+                                                 workers=os.cpu_count())
+            prepareMolecule(molecule, progress=self._progress)
+            if self._cancelled.is_set():
+                raise LoadCancelled()
+        except LoadCancelled:
+            self.signals.cancelled.emit()
+            return
+        except (OSError, ValueError) as error:
+            self.signals.failed.emit(str(error))
+            return
+        self.signals.finished.emit(molecule, title)
@@ -0,0 +1,282 @@
+# File: mqlbFile.py
+"""
+   Read and write molecules in .mqlb ("moleql binary") files, which
+   hold the title, atomic numbers, coordinates, and bonds of a
+   molecule as arrays that are loaded without any parsing.
+
+   A file is a header of 128 bytes followed by the arrays, each
+   starting at a multiple of 64 bytes. All numbers are little-endian.
+   The header holds, in order:
+
+     • magic number, b"MQLB" (4 bytes)
+     • format version, header size, and a zero (3 × uint32)
+     • number of atoms, N, of bonds, M, and of title bytes (3 × int64)
+     • file offsets of atomic numbers, coordinates, bonds, and
+       title (4 × int64)
+     • size and modification time (ns) of the file the molecule was
+       read from, and the number of bytes, L, at the start of that
+       file which the molecule was read from, or zeros (3 × int64)
+     • BLAKE2b hash of those L bytes, or zeros (32 bytes)
+
+   and the arrays are:
+
+     • atomic numbers, (N,) int64
+     • coordinates, in Angstroms, (N,3) float64
+     • atom indices of bonds, (M,2) int64
+     • title, UTF-8 text
+
+   loadMqlb maps the file into memory and returns the arrays as
+   read-only views of the mapping, so only the pages used are read.
+
+   readCachedMolecule opens an .xyz file through a cache file beside
+   it, fileName + ".mqlb". The first time a file is opened, its first
+   frame is read and its bonds found as usual, and the cache file is
+   written; later openings load the molecule, bonds included, from
+   the cache file. The cache file is used while the .xyz file keeps
+   the size and modification time recorded in it; if the time has
+   changed (e.g., the file was copied or touched), the cache file is
+   still used if the bytes of the first frame have the same hash.
+   Only those bytes are hashed, never the rest of a long trajectory.
+
+   Usage:
+
+       molecule, title = readCachedMolecule("water.xyz")
+
+       writeMqlb("water.mqlb", molecule, title)
+       data = loadMqlb("water.mqlb")
+       print(data.title, data.atomicNumbers, data.bondIndices)
+"""
+# Import needed standard libraries
+import hashlib
+import os
+import struct
+from collections import namedtuple
+import numpy as np
+
+# Need following for molecular objects
+import Molecule
+import xyzReader
+
+MAGIC = b"MQLB"
+VERSION = 2
+
+# Header layout; see module documentation
+_header = struct.Struct("<4s3I3q4q3q32s")
+
+# Arrays start at multiples of this many bytes
+_alignment = 64
+
+# Contents of an .mqlb file; arrays are read-only views of the file
+MqlbData = namedtuple("MqlbData", ["title", "atomicNumbers", "coordinates", "bondIndices",
+                                   "sourceSize", "sourceMtime", "sourceLength", "sourceHash"])
+
+# Identifies source file contents: size, mtime (ns), and the
+#   length and hash of the bytes at its start that were read
+_noSource = (0, 0, 0, bytes(32))
+
+def writeMqlb(fileName, molecule, title, source=_noSource):
+    """
+        writeMqlb(fileName, molecule, title, source=(0, 0, 0, bytes(32)))
+
+        args:    fileName is the name of the .mqlb file to write
+                 molecule is an instance of class Molecule
+                 title is the title of the molecule
+                 source is (size, mtime, length, hash) of the file the
+                 molecule was read from, as returned by sourceStamp
+        returns: None
+
+        The file is written under a temporary name and then renamed,
+        so a reader never sees a partly written file.
+    """
+    arrays = [ np.ascontiguousarray(molecule.atomicNumbers, dtype="<i8"),
+               np.ascontiguousarray(molecule.coordinates, dtype="<f8"),
+               np.ascontiguousarray(molecule.bondIndices, dtype="<i8").reshape(-1, 2),
+               np.frombuffer(title.encode("utf-8"), dtype=np.uint8) ]
+    offsets = []
+    end = _header.size
+    for array in arrays:
+        end = -(-end // _alignment) * _alignment
+        offsets.append(end)
+        end += array.nbytes
+
+    size, mtime, length, digest = source
+    header = _header.pack( MAGIC, VERSION, _header.size, 0,
+                           len(arrays[0]), len(arrays[2]), len(arrays[3]),
+                           *offsets, size, mtime, length, digest )
+
+    temporaryName = fileName + ".tmp%d" % os.getpid()
+    try:
+        with open(temporaryName, "wb") as f:
+            f.write(header)
+            for offset, array in zip(offsets, arrays):
+                f.write(bytes(offset - f.tell()))
+                array.tofile(f)
+        os.replace(temporaryName, fileName)
+    finally:
+        if os.path.exists(temporaryName):
+            os.remove(temporaryName)
+
+def loadMqlb(fileName):
+    """
+        loadMqlb(fileName)
+
+        args:    fileName is the name of an .mqlb file
+        returns: MqlbData whose arrays are read-only views of a
+                 memory map of the file
+        raises:  ValueError if the file is not an .mqlb file
+    """
+    with open(fileName, "rb") as f:
+        fields = _unpackHeader(f.read(_header.size))
+    (natoms, nbonds, ntitle, atomicNumbersAt, coordinatesAt, bondsAt, titleAt,
+     size, mtime, length, digest) = fields
+
+    contents = np.memmap(fileName, dtype=np.uint8, mode="r")
+    def array(offset, count, dtype, shape):
+        nbytes = count * np.dtype(dtype).itemsize
+        if offset % _alignment or offset < _header.size or offset + nbytes > len(contents):
+            raise ValueError("%s: array outside of file" % fileName)
+        return contents[offset:offset+nbytes].view(dtype).reshape(shape)
+
+    atomicNumbers = array(atomicNumbersAt, natoms, "<i8", (natoms,))
+    coordinates = array(coordinatesAt, 3*natoms, "<f8", (natoms, 3))
+    bondIndices = array(bondsAt, 2*nbonds, "<i8", (nbonds, 2))
+    title = array(titleAt, ntitle, np.uint8, (ntitle,)).tobytes().decode("utf-8", "replace")
+    return MqlbData(title, atomicNumbers, coordinates, bondIndices, size, mtime, length, digest)
+
+def _unpackHeader(data):
+    """
+        Check header bytes and return its fields after the version.
+    """
+    if len(data) < _header.size:
+        raise ValueError("Not an .mqlb file: too short")
+    magic, version, headerSize, zero, *fields = _header.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("Not an .mqlb file")
+    if version != VERSION or headerSize != _header.size:
+        raise ValueError("Unsupported .mqlb version %d" % version)
+    if min(fields[:3]) < 0:
+        raise ValueError("Bad .mqlb header")
+    return fields
+
+def moleculeFromMqlb(data):
+    """
+        moleculeFromMqlb(data)
+
+        args:    data is an MqlbData tuple
+        returns: (molecule, title), the molecule holding copies of
+                 the arrays and already bonded
+    """
+    molecule = Molecule.Molecule.fromArrays(data.atomicNumbers, data.coordinates)
+    if len(data.bondIndices) and ( data.bondIndices.min() < 0 or
+                                   data.bondIndices.max() >= molecule.atomCount ):
+        raise ValueError("Bond to atom which is not in molecule")
+    molecule.bondAtomPairs(data.bondIndices)
+    return molecule, data.title
+
+def sourceStamp(fileName, length=0, progress=None):
+    """
+        sourceStamp(fileName, length=0, progress=None)
+
+        args:    fileName is the name of a file
+                 length is the number of bytes at the start of the
+                 file to hash, e.g., those a molecule was read from
+                 progress, if given, is called as progress("hash", n)
+                 after each chunk, n being the number of MiB hashed
+                 so far; an exception it raises stops hashing
+        returns: (size, mtime, length, hash) of the file; mtime is in
+                 ns, length is reduced to the size of the file, and
+                 hash is 32 zero bytes if length is 0
+    """
+    status = os.stat(fileName)
+    length = min(length, status.st_size)
+    digest = bytes(32)
+    if length > 0:
+        hasher = hashlib.blake2b(digest_size=32)
+        with open(fileName, "rb") as f:
+            hashed = 0
+            while hashed < length:
+                chunk = f.read(min(xyzReader.CHUNK_SIZE, length - hashed))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                hashed += len(chunk)
+                if progress is not None:
+                    progress("hash", hashed >> 20)
+        digest = hasher.digest()
+    return status.st_size, status.st_mtime_ns, length, digest
+
+def readCachedMolecule(fileName, useCache=True, progress=None, workers=None):
+    """
+        readCachedMolecule(fileName, useCache=True, progress=None, workers=None)
+
+        args:    fileName is the name of an .xyz file
+                 useCache is True to read and write the cache file,
+                 fileName + ".mqlb"
+                 progress, if given, is called as progress("atoms", N)
+                 once the atoms are read, progress("bonds", M) as
+                 bonds are found, and progress("hash", n) while the
+                 first frame is hashed (see sourceStamp); an exception
+                 it raises stops reading
+                 workers is passed to Molecule.findBonds
+        returns: (molecule, title) for the first frame in file, with
+                 the molecule's bonds already found
+        raises:  ValueError if the file is not in .xyz format
+    """
+    cacheName = fileName + ".mqlb"
+    if useCache:
+        result = _loadCache(fileName, cacheName, progress)
+        if result is not None:
+            if progress is not None:
+                progress("atoms", result[0].atomCount)
+                progress("bonds", result[0].bondCount)
+            return result
+
+    frame, end = xyzReader.readFirstFrame(fileName)
+    molecule = Molecule.Molecule.fromArrays(frame.atomicNumbers, frame.coordinates)
+    title = frame.title
+    if progress is not None:
+        progress("atoms", molecule.atomCount)
+        molecule.findBonds(lambda count: progress("bonds", count), workers)
+    else:
+        molecule.findBonds(workers=workers)
+    if useCache:
+        try:
+            writeMqlb(cacheName, molecule, title, sourceStamp(fileName, end, progress))
+        except OSError:
+            # A directory which cannot be written to only means
+            #   that the file is read and bonded again next time
+            pass
+    return molecule, title
+
+def _loadCache(fileName, cacheName, progress=None):
+    """
+        Return (molecule, title) from cache file, or None if there is
+        no usable cache file for the current contents of fileName.
+    """
+    try:
+        data = loadMqlb(cacheName)
+        size, mtime, length, digest = sourceStamp(fileName)
+        if size != data.sourceSize:
+            return None
+        if mtime != data.sourceMtime:
+            source = sourceStamp(fileName, data.sourceLength, progress)
+            if data.sourceLength == 0 or source[2:] != (data.sourceLength, data.sourceHash):
+                return None
+            _restamp(cacheName, source[1])
+        return moleculeFromMqlb(data)
+    except (OSError, ValueError):
+        return None
+
+def _restamp(cacheName, mtime):
+    """
+        Record a new modification time of the source file in the
+        header of a cache file, so its contents are not hashed again.
+    """
+    try:
+        with open(cacheName, "r+b") as f:
+            fields = list(_header.unpack(f.read(_header.size)))
+            fields[-3] = mtime
+            f.seek(0)
+            f.write(_header.pack(*fields))
+    except OSError:
+        pass
@@ -4,22 +4,35 @@
    which atoms are bonded along with their respective 
    bond lengths. Also, atomic coordinates are adjusted 
    to center the molecule at origin, [0, 0, 0]
+
+   prepareMolecule does not use Qt, so it may be run in a worker
+   thread (see moleculeLoader.py) or without a window at all.
 """
 # Need following for molecular objects
 import Atom
 import Elements
 
-# Import third party libraries
-from PySide6.QtWidgets import QMessageBox
-
 def processMolecule(self, molecule):
     """ Complete processing of molecule.  """
+    prepareMolecule(molecule)
+    announceMolecule(self)
+
+def prepareMolecule(molecule, progress=None):
+    """
+       Find bonds of molecule, unless already found, and center it
+       at origin. progress, if given, is called as progress("bonds",
+       M) as bonds are found; an exception it raises stops the search.
+    """
     ###
     ###print('atomCount = ', molecule.atomCount)
     ###print('')
     ###
-    # Create molecular bonds
-    molecule.findBonds()  
+    # Create molecular bonds, unless already read from a cache file
+    if molecule.bondCount == 0:
+        if progress is not None:
+            molecule.findBonds(lambda count: progress("bonds", count))
+        else:
+            molecule.findBonds()
     ###
     ###print('bondCount = ', molecule.bondCount)
     ###for bond in molecule.bonds:
@@ -59,8 +72,7 @@ def processMolecule(self, molecule):
     ###
 
     # Translate the center of the molecule so it is at the origin.
-    for atom in molecule.atoms:
-        atom.coordinates = atom.coordinates - boxCenter
+    molecule.coordinates = molecule.coordinates - boxCenter
 
     ###
     ###print(' After centering of molecule:')
@@ -81,6 +93,11 @@ def processMolecule(self, molecule):
     ###print('')
     ###
 
+def announceMolecule(self):
+    """ Tell user molecule is ready to draw.  """
+    # Qt is imported here so that prepareMolecule can be used without it
+    from PySide6.QtWidgets import QMessageBox
+
     #
     # Finally, launch message box to tell user to choose 
     #   which structure model to draw
@@ -0,0 +1,644 @@
+# File: xyzReader.py
+"""
+   Read molecular coordinates from .xyz files, one frame at a time.
+
+   Each frame of a file holds:
+    • a title line
+    • a line with the number of atoms, N
+    • N lines, each with an atomic number (or element symbol)
+      and the x, y, & z coordinates of an atom (in Angstroms)
+
+   A file may hold several frames, one after another (e.g., a
+   trajectory). The file is read in chunks of fixed size, and
+   only the frame being parsed is held in memory, so the first
+   frame of a very large file is available at once. Atom lines
+   of a frame are parsed together into NumPy arrays.
+
+   Usage:
+
+       for frame in readFrames("water.xyz"):
+           print(frame.title, frame.atomicNumbers, frame.coordinates)
+
+       molecule, title = readMolecule("water.xyz")
+
+   For random access to the frames of a large trajectory, use
+   Trajectory, which keeps an index of where each frame starts,
+   or MappedTrajectory, which also parses frames directly from a
+   memory map of the file into a reused coordinate array.
+"""
+# Import needed standard libraries
+import io
+import mmap
+import os
+import re
+import warnings
+from collections import namedtuple
+import numpy as np
+
+# Need following for molecular objects
+import Elements
+import Molecule
+
+# One frame of an .xyz file; atomicNumbers is an (N,) integer
+#   array and coordinates is an (N,3) float array
+Frame = namedtuple("Frame", ["title", "atomicNumbers", "coordinates"])
+
+# Default number of bytes read from file at a time
+CHUNK_SIZE = 1 << 20
+
+_nonblank = re.compile(rb"\S")
+
+def readFrames(source, chunkSize=CHUNK_SIZE):
+    """
+        readFrames(source, chunkSize=CHUNK_SIZE)
+
+        args:    source is a file name or a file opened in binary mode
+                 chunkSize is the number of bytes read at a time
+        returns: a generator of Frame tuples, one per frame in file
+        raises:  ValueError if the file is not in .xyz format
+    """
+    if hasattr(source, "read"):
+        yield from _readFrames(source, chunkSize)
+    else:
+        with open(source, "rb") as f:
+            yield from _readFrames(f, chunkSize)
+
+def readMolecule(source, chunkSize=CHUNK_SIZE):
+    """
+        readMolecule(source, chunkSize=CHUNK_SIZE)
+
+        args:    source is a file name or a file opened in binary mode
+        returns: (molecule, title) for the first frame in file
+        raises:  ValueError if the file holds no frame or is not
+                 in .xyz format
+    """
+    frame, end = readFirstFrame(source, chunkSize)
+    molecule = Molecule.Molecule.fromArrays(frame.atomicNumbers, frame.coordinates)
+    return molecule, frame.title
+
+def readFirstFrame(source, chunkSize=CHUNK_SIZE):
+    """
+        readFirstFrame(source, chunkSize=CHUNK_SIZE)
+
+        args:    source is a file name or a file opened in binary mode
+        returns: (frame, end), the first Frame in file and the file
+                 offset just past its last atom line, so the frame
+                 was read from bytes [0, end) of a file
+        raises:  ValueError if the file holds no frame or is not
+                 in .xyz format
+    """
+    if hasattr(source, "read"):
+        return _readFirstFrame(source, chunkSize)
+    with open(source, "rb") as f:
+        return _readFirstFrame(f, chunkSize)
+
+def _readFirstFrame(f, chunkSize):
+    lines = _ChunkedLines(f, chunkSize)
+    for frameNumber, start, title, natoms, block in _frameBlocks(lines):
+        return _frame(frameNumber, title, natoms, block), lines.tell()
+    raise ValueError("No coordinates found in file")
+
+def _readFrames(f, chunkSize):
+    lines = _ChunkedLines(f, chunkSize)
+    for frameNumber, start, title, natoms, block in _frameBlocks(lines):
+        yield _frame(frameNumber, title, natoms, block)
+
+def _frame(frameNumber, title, natoms, block):
+    atomicNumbers, coordinates = _parseAtoms(block, natoms, frameNumber)
+    return Frame(title.decode("utf-8", "replace").strip(), atomicNumbers, coordinates)
+
+def _frameBlocks(lines):
+    """
+        Yield (frameNumber, start, title, natoms, block) for each frame,
+        where start is the file offset of the frame's title line and
+        block holds its unparsed atom lines.
+    """
+    frameNumber = 0
+    while lines.moreText():
+        frameNumber += 1
+        start = lines.tell()
+        title = lines.take(1)
+        countLine = lines.take(1)
+        if countLine is None:
+            raise ValueError("Frame %d: missing number of atoms" % frameNumber)
+        try:
+            natoms = int(countLine.split()[0])
+        except (IndexError, ValueError):
+            raise ValueError("Frame %d: bad number of atoms: %r" % (frameNumber, countLine))
+        block = lines.take(natoms) if natoms > 0 else b""
+        if block is None:
+            raise ValueError("Frame %d: fewer than %d atom lines" % (frameNumber, natoms))
+        yield frameNumber, start, title, natoms, block
+
+def _parseAtoms(block, natoms, frameNumber):
+    """
+        Parse N atom lines at once. Lines with element symbols or
+        extra columns are parsed line by line instead.
+    """
+    #
+    # fromstring stops at text that is not a number, e.g., a symbol,
+    #   with a warning or, in newer NumPy versions, a ValueError
+    #
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            values = np.fromstring(block.decode("ascii", "replace"), sep=" ")
+    except ValueError:
+        values = np.zeros(0)
+    if values.size == 4*natoms:
+        values = values.reshape(natoms, 4)
+        atomicNumbers = values[:, 0].astype(np.int64)
+        if np.array_equal(atomicNumbers, values[:, 0]):
+            return atomicNumbers, np.ascontiguousarray(values[:, 1:4])
+
+    atomicNumbers = np.empty(natoms, dtype=np.int64)
+    coordinates = np.empty( (natoms, 3) )
+    for i, line in enumerate(block.splitlines()):
+        data = line.split()
+        try:
+            atom = data[0].decode("ascii")
+            atomicNumbers[i] = int(atom) if atom.isdigit() else Elements.AtomicNumber[atom]
+            coordinates[i] = [float(x) for x in data[1:4]]
+            if len(data) < 4:
+                raise ValueError
+        except (IndexError, KeyError, ValueError, UnicodeDecodeError):
+            raise ValueError("Frame %d: bad atom line: %r" % (frameNumber, line))
+    return atomicNumbers, coordinates
+
+
+class Trajectory(object):
+    """
+       Random access to the frames of a multi-frame .xyz file (e.g.,
+       a molecular dynamics trajectory). The file is scanned once to
+       find the byte offset at which each frame starts; frame k is
+       then read with a single seek and read, without parsing any
+       other frame. The offsets are saved in a sidecar index file,
+       fileName + ".idx", and reused while the .xyz file keeps the
+       same size and modification time.
+
+       Usage:
+
+           with Trajectory("run.xyz") as trajectory:
+               print(len(trajectory))
+               frame = trajectory[1000]
+               for frame in trajectory:
+                   ...
+    """
+    def __init__(self, fileName, chunkSize=CHUNK_SIZE, useIndexFile=True):
+        """
+           fileName == name of .xyz file
+           chunkSize == number of bytes read at a time when scanning
+           useIndexFile == read and write sidecar index file?
+        """
+        self.fileName = fileName
+        self.chunkSize = chunkSize
+        self.indexFileName = fileName + ".idx"
+        self.file = open(fileName, "rb")
+
+        #
+        # offsets[k] is file offset of frame k; last element is end
+        #   of last frame, so frame k spans offsets[k]:offsets[k+1].
+        #
+        self.offsets = None
+        if useIndexFile:
+            self.offsets = self._loadIndex()
+        if self.offsets is None:
+            self.offsets = self._scan()
+            if useIndexFile:
+                self._saveIndex()
+
+    def _fileStamp(self):
+        """
+           Size and modification time identifying file contents.
+        """
+        status = os.stat(self.file.fileno())
+        return status.st_size, status.st_mtime_ns
+
+    def _scan(self):
+        """
+           Read through whole file once, recording where frames start.
+        """
+        self.file.seek(0)
+        lines = _ChunkedLines(self.file, self.chunkSize)
+        offsets = [ start for frameNumber, start, title, natoms, block
+                    in _frameBlocks(lines) ]
+        offsets.append( min(lines.tell(), self._fileStamp()[0]) )
+        return np.array(offsets, dtype=np.int64)
+
+    def _loadIndex(self):
+        """
+           Return offsets from index file, or None if there is no
+           usable index file for the current contents of .xyz file.
+        """
+        try:
+            with open(self.indexFileName, "rb") as f:
+                index = np.load(f)
+                if (int(index["size"]), int(index["mtime"])) != self._fileStamp():
+                    return None
+                return index["offsets"].astype(np.int64)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _saveIndex(self):
+        """
+           Write offsets to index file; a directory which cannot be
+           written to only means that the file is scanned again.
+        """
+        size, mtime = self._fileStamp()
+        try:
+            with open(self.indexFileName, "wb") as f:
+                np.savez(f, offsets=self.offsets, size=size, mtime=mtime)
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, k):
+        """
+           Return Frame k; negative k counts back from last frame.
+        """
+        nframes = len(self)
+        if k < 0:
+            k += nframes
+        if not 0 <= k < nframes:
+            raise IndexError("Frame %d of %d-frame trajectory" % (k, nframes))
+        start, end = self.offsets[k], self.offsets[k+1]
+        self.file.seek(start)
+        data = self.file.read(end - start)
+        return next( _readFrames(io.BytesIO(data), len(data) + 1) )
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+class MappedTrajectory(Trajectory):
+    """
+       Trajectory whose frames are parsed straight out of a memory
+       map of the .xyz file. Numbers are converted from the mapped
+       bytes with array operations (see _parseNumbers), a block of
+       lines at a time, so no string is made per line and no frame
+       is copied into a Python bytes object. Coordinates are written
+       into a preallocated (N,3) array which is reused from frame to
+       frame, and pages of the file are released once a frame has
+       been read, so memory use stays flat during playback.
+
+       Usage:
+
+           with MappedTrajectory("run.xyz") as trajectory:
+               for k in range(len(trajectory)):
+                   molecule.coordinates = trajectory.read(k)
+    """
+    # Number of bytes of atom lines parsed at a time
+    blockSize = 1 << 20
+
+    def __init__(self, fileName, chunkSize=CHUNK_SIZE, useIndexFile=True):
+        super().__init__(fileName, chunkSize, useIndexFile)
+
+        self.map = None
+        self.bytes = np.zeros(0, dtype=np.uint8)
+        if self._fileStamp()[0] > 0:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.bytes = np.frombuffer(self.map, dtype=np.uint8)
+
+        # Arrays reused from frame to frame
+        self.coordinates = np.empty( (0, 3) )
+        self.atomicNumbers = np.empty(0, dtype=np.int64)
+
+    def _header(self, k):
+        """
+           Return title, number of atoms, and file offsets of the
+           atom lines of frame k.
+        """
+        nframes = len(self)
+        if k < 0:
+            k += nframes
+        if not 0 <= k < nframes:
+            raise IndexError("Frame %d of %d-frame trajectory" % (k, nframes))
+        start, end = int(self.offsets[k]), int(self.offsets[k+1])
+        titleEnd = self.map.find(b"\n", start, end)
+        countEnd = self.map.find(b"\n", titleEnd + 1, end) if titleEnd >= 0 else -1
+        if countEnd < 0:
+            countEnd = end
+        try:
+            natoms = int(self.map[titleEnd+1:countEnd].split()[0])
+        except (IndexError, ValueError):
+            raise ValueError("Frame %d: bad number of atoms" % (k + 1))
+        title = self.map[start:titleEnd].decode("utf-8", "replace").strip()
+        return k, title, natoms, countEnd + 1, end
+
+    def read(self, k, out=None):
+        """
+           read(k, out=None)
+
+           args:    k is the frame number
+                    out is an optional (N,3) float array to fill
+           returns: (N,3) coordinates of frame k, in out if given,
+                    otherwise in an array reused by the next call;
+                    atomic numbers are left in self.atomicNumbers
+        """
+        k, title, natoms, blockStart, blockEnd = self._header(k)
+        if len(self.coordinates) < natoms:
+            self.coordinates = np.empty( (natoms, 3) )
+            self.atomicNumbers = np.empty(natoms, dtype=np.int64)
+        if out is None:
+            out = self.coordinates[:natoms]
+        elif out.shape != (natoms, 3):
+            raise ValueError("Frame %d has %d atoms; out has shape %s" % (k + 1, natoms, out.shape))
+        atomicNumbers = self.atomicNumbers[:natoms]
+
+        #
+        # Parse atom lines a block at a time; each block ends
+        #   at a line end, so holds whole lines.
+        #
+        row = 0
+        position = blockStart
+        while position < blockEnd:
+            stop = blockEnd
+            if position + self.blockSize < blockEnd:
+                stop = self.map.find(b"\n", position + self.blockSize, blockEnd) + 1 or blockEnd
+            numbers, coordinates = _parseAtomBlock(self.bytes[position:stop], k + 1)
+            rows = len(numbers)
+            if row + rows > natoms:
+                raise ValueError("Frame %d: more than %d atom lines" % (k + 1, natoms))
+            out[row:row+rows] = coordinates
+            atomicNumbers[row:row+rows] = numbers
+            row += rows
+            position = stop
+        if row != natoms:
+            raise ValueError("Frame %d: fewer than %d atom lines" % (k + 1, natoms))
+
+        self._releasePages(int(self.offsets[k]), blockEnd)
+        return out
+
+    def _releasePages(self, start, end):
+        """
+           Tell operating system that pages of a frame already read
+           are not needed; they are read from file again if needed.
+        """
+        if hasattr(self.map, "madvise") and hasattr(mmap, "MADV_DONTNEED"):
+            start -= start % mmap.PAGESIZE
+            try:
+                self.map.madvise(mmap.MADV_DONTNEED, start, end - start)
+            except (OSError, ValueError):
+                pass
+
+    def __getitem__(self, k):
+        """
+           Return Frame k as a tuple of new arrays.
+        """
+        coordinates = self.read(k).copy()
+        k, title, natoms, blockStart, blockEnd = self._header(k)
+        return Frame(title, self.atomicNumbers[:natoms].copy(), coordinates)
+
+    def close(self):
+        self.bytes = None
+        try:
+            if self.map is not None:
+                self.map.close()
+        except BufferError:
+            # Views of the map are still held, e.g., by the traceback
+            #   of a parse error; the map is closed once they are freed
+            pass
+        finally:
+            self.map = None
+            super().close()
+
+
+def _parseAtomBlock(text, frameNumber):
+    """
+        Parse atom lines held in uint8 array text, without copying
+        them, into atomic numbers and an (n,3) array of coordinates.
+        Lines with element symbols, extra columns, or blank lines
+        between them are parsed line by line instead.
+    """
+    # Drop blank lines at end, e.g., between frames
+    end = len(text)
+    while end > 0 and text[end-1] <= 32:
+        end -= 1
+    if end == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros( (0, 3) )
+    text = text[:end]
+    nlines = np.count_nonzero(text == 10) + 1
+
+    values = _parseNumbers(text)
+    if values is not None and values.size == 4 * nlines:
+        values = values.reshape(nlines, 4)
+        atomicNumbers = values[:, 0].astype(np.int64)
+        if np.array_equal(atomicNumbers, values[:, 0]):
+            return atomicNumbers, values[:, 1:4]
+
+    lines = [line for line in text.tobytes().splitlines() if line.strip()]
+    return _parseAtoms(b"\n".join(lines), len(lines), frameNumber)
+
+
+# Exact powers of ten, 10**0 ... 10**22, as floats
+_powersOfTen = np.array( [float(10**n) for n in range(23)] )
+
+def _parseNumbers(text):
+    """
+        _parseNumbers(text)
+
+        args:    text is a uint8 array of ASCII text holding decimal
+                 numbers separated by white space, e.g., 1 -0.25 3.5e-2
+        returns: float array of the numbers, or None if text holds
+                 anything else or numbers with more than 15 digits
+
+        Numbers are grouped by layout: length, and where the sign,
+        decimal point, and exponent are. Numbers written by a program
+        have only a few layouts, and all numbers of one layout are
+        converted together by multiplying a matrix of their digits by
+        the place value of each column, so no Python object is made
+        per number. Mantissa digits are summed as an exact integer and
+        divided by an exact power of ten, giving the same result as
+        float() for numbers without an exponent.
+    """
+    # Start and end of each run of non-space characters
+    nonspace = np.zeros(len(text) + 2, dtype=np.int8)
+    np.greater(text, 32, out=nonspace[1:-1].view(np.bool_))
+    edges = np.flatnonzero(np.diff(nonspace))
+    starts, lengths = edges[0::2], edges[1::2] - edges[0::2]
+    count = len(starts)
+    if count == 0:
+        return np.zeros(0)
+    if lengths.max() > 24:
+        return None
+
+    #
+    # Offset within its number of each decimal point and exponent
+    #   (-1 if none), and whether number and exponent have a sign
+    #
+    def offsets(positions):
+        number = np.searchsorted(starts, positions, side='right') - 1
+        if len(number) > 1 and np.any(number[1:] == number[:-1]):
+            return None, None
+        offset = np.full(count, -1)
+        offset[number] = positions - starts[number]
+        return number, offset
+    pointNumber, pointAt = offsets(np.flatnonzero(text == 46))
+    exponentNumber, exponentAt = offsets(np.flatnonzero((text | 32) == 101))
+    if pointAt is None or exponentAt is None:
+        return None
+    signed = (text[starts] == 45) | (text[starts] == 43)
+    exponentSigned = np.zeros(count, dtype=bool)
+    if len(exponentNumber):
+        after = np.minimum(starts[exponentNumber] + exponentAt[exponentNumber] + 1, len(text) - 1)
+        exponentSigned[exponentNumber] = (text[after] == 45) | (text[after] == 43)
+
+    layout = (((lengths*32 + pointAt + 1)*32 + exponentAt + 1)*2 + signed)*2 + exponentSigned
+
+    numbers = np.empty(count)
+    for key in np.flatnonzero(np.bincount(layout)):
+        rows = np.flatnonzero(layout == key)
+        key, hasExponentSign = divmod(int(key), 2)
+        key, hasSign = divmod(key, 2)
+        key, exponentColumn = divmod(key, 32)
+        length, pointColumn = divmod(key, 32)
+        pointColumn, exponentColumn = pointColumn - 1, exponentColumn - 1
+
+        # Columns of mantissa digits and of exponent digits
+        mantissaEnd = exponentColumn if exponentColumn >= 0 else length
+        mantissa = [c for c in range(hasSign, mantissaEnd) if c != pointColumn]
+        exponent = list(range(exponentColumn + 1 + hasExponentSign, length)) if exponentColumn >= 0 else []
+        if ( not mantissa or len(mantissa) > 15 or pointColumn >= mantissaEnd
+             or (exponentColumn >= 0 and not exponent) ):
+            return None
+
+        chars = text[ starts[rows, None] + np.arange(length) ]
+        digits = chars - np.uint8(48)
+        if np.any(digits[:, mantissa + exponent] > 9):
+            return None
+
+        weights = np.zeros(length)
+        weights[mantissa] = _powersOfTen[len(mantissa) - 1 - np.arange(len(mantissa))]
+        value = digits.astype(float) @ weights
+        fractionDigits = mantissaEnd - 1 - pointColumn if pointColumn >= 0 else 0
+        value /= _powersOfTen[fractionDigits]
+        if hasSign:
+            value[chars[:, 0] == 45] *= -1
+        if exponent:
+            weights = np.zeros(length)
+            weights[exponent] = _powersOfTen[len(exponent) - 1 - np.arange(len(exponent))]
+            power = digits.astype(float) @ weights
+            if hasExponentSign:
+                power[chars[:, exponentColumn + 1] == 45] *= -1
+            with np.errstate(over='ignore'):
+                value *= np.power(10.0, power)
+        numbers[rows] = value
+    return numbers
+
+
+class _ChunkedLines(object):
+    """
+       Hand out lines of a binary file, in groups, while reading the
+       file in chunks. Only the unread part of the current chunk and
+       any chunks needed to complete a group are kept in memory.
+    """
+    def __init__(self, f, chunkSize):
+        self.f = f
+        self.chunkSize = chunkSize
+        self.buffer = b""    # text read from file but not yet handed out
+        self.position = 0    # start of unread text in buffer
+        try:
+            self.bufferStart = f.tell() # file offset of buffer[0]
+        except (AttributeError, OSError):
+            self.bufferStart = 0
+        self.lastByte = b""  # last byte read from file
+        self.eof = False
+
+    def _read(self):
+        chunk = self.f.read(self.chunkSize)
+        if chunk:
+            self.lastByte = chunk[-1:]
+        else:
+            self.eof = True
+            # Last line of file may lack a newline
+            if self.lastByte not in (b"", b"\n"):
+                self.lastByte = b"\n"
+                return b"\n"
+        return chunk
+
+    def tell(self):
+        """
+           Return file offset of next line to be handed out.
+        """
+        return self.bufferStart + self.position
+
+    def moreText(self):
+        """
+           Return True unless only white space is left in file. No
+           line is handed out, so a blank line which follows is
+           still the next line, e.g., the empty title of a frame.
+        """
+        match = _nonblank.search(self.buffer, self.position)
+        while match is None:
+            if self.eof:
+                return False
+            # Keep unread text, which may begin with blank lines
+            self.bufferStart += self.position
+            self.buffer = self.buffer[self.position:] + self._read()
+            self.position = 0
+            match = _nonblank.search(self.buffer)
+        return True
+
+    def _lineEnd(self, n):
+        """
+           Return position in buffer just past the n-th line from
+           current position, or None if buffer holds fewer lines.
+        """
+        if n <= 16:
+            end = self.position
+            for i in range(n):
+                end = self.buffer.find(b"\n", end)
+                if end < 0:
+                    return None
+                end += 1
+            return end
+
+        # Search a growing window, not the whole buffer, for newlines
+        window = 64*n
+        while True:
+            size = min(window, len(self.buffer) - self.position)
+            if size <= 0:
+                return None
+            text = np.frombuffer(self.buffer, dtype=np.uint8, count=size, offset=self.position)
+            newlines = np.flatnonzero(text == 10)
+            if len(newlines) >= n:
+                return self.position + int(newlines[n-1]) + 1
+            if size == len(self.buffer) - self.position:
+                return None
+            window *= 2
+
+    def take(self, n):
+        """
+           Return the next n lines as one bytes object, or None if
+           the file ends first.
+        """
+        end = self._lineEnd(n)
+        if end is None:
+            # Read chunks until they hold n lines, counting only new text
+            count = self.buffer.count(b"\n", self.position)
+            pieces = [ self.buffer[self.position:] ]
+            while count < n and not self.eof:
+                chunk = self._read()
+                pieces.append(chunk)
+                count += chunk.count(b"\n")
+            self.bufferStart += self.position
+            self.buffer = b"".join(pieces)
+            self.position = 0
+            if count < n:
+                return None
+            end = self._lineEnd(n)
+        lines = self.buffer[self.position:end]
+        self.position = end
+        return lines